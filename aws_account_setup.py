@@ -1,15 +1,40 @@
-from dreamchaser.aws_init import AWSOrg, AWSRam, AWSSsm
+import sys
+import argparse
+from dreamchaser.aws_bootstrap import organization_bootstrap
 
 
-# create aws organization with featureset 'ALL' enabled
-org_client = AWSOrg('ap-southeast-2')
-org_client.create_org()
-ou_id = org_client.get_ou_arn()
+parser = argparse.ArgumentParser(description='Bootstrap the DreamChaser AWS Organization')
+parser.add_argument('--region', default='ap-southeast-2')
+parser.add_argument('--targets', nargs='*', default=[],
+                    help='the account:region pairs of member accounts to bootstrap')
+parser.add_argument('--role-name', default='OrganizationAccountAccessRole',
+                    help='the IAM role to assume in the member accounts')
+parser.add_argument('--journal', help='the JSON journal of the completed steps')
+parser.add_argument('--reset', action='store_true', help='run every step again')
+parser.add_argument('--workers', type=int, default=4)
+args = parser.parse_args()
 
-# enable resource sharing with AWS organizations
-ram_client = AWSRam('ap-southeast-2')
-ram_client.enable_resource_sharing()
+# create aws organization with featureset 'ALL' enabled, enable resource
+# sharing with AWS organizations and save the 'dreamchaser' OU arn in
+# parameter store, skipping the steps completed by a previous run
+bootstrap = organization_bootstrap(
+    region_name=args.region,
+    targets=[tuple(target.split(':', 1)) for target in args.targets],
+    role_name=args.role_name,
+    journal_path=args.journal,
+    max_workers=args.workers
+)
+if args.reset:
+    bootstrap.reset()
 
-# save 'dreamchaser' org_id in parameter store
-ssm_client = AWSSsm('ap-southeast-2')
-ssm_client.put_str_para(name='DC_ONE_OU_ID', value=ou_id)
\ No newline at end of file
+report = bootstrap.run()
+exit_code = 0
+for name, result in report['tasks'].items():
+    if result['status'] == 'SUCCEEDED' and result['result']['journal']:
+        print(f"{name}: COMPLETE (journal)")
+    elif result['status'] == 'FAILED':
+        print(f"{name}: FAILED {result['error']}")
+        exit_code = exit_code or getattr(result['error'], 'exit_code', 1)
+    else:
+        print(f"{name}: {result['status']} in {result['elapsed']:.1f}s")
+sys.exit(exit_code)
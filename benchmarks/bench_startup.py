@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check of cdk_app.py
+
+Runs a full offline synth of cdk_app.py under `python -X importtime`, and
+fails when the total import time exceeds the budget, or when a module which
+the synth path must not load, e.g. boto3, is imported.
+
+    python3 benchmarks/bench_startup.py --budget-ms 1000
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACCOUNT = '111111111111'
+REGION = 'ap-southeast-2'
+
+FORBIDDEN = ['boto3', 'botocore', 'aws_cdk.aws_s3', 'aws_cdk.aws_iam']
+
+
+def profile(context: dict) -> dict:
+    """
+    Synthesize cdk_app.py with the given context and return the cumulative
+    import time in microseconds of every module imported at top level
+    """
+    context = dict(context)
+    context[f"availability-zones:account={ACCOUNT}:region={REGION}"] = [
+        f"{REGION}a", f"{REGION}b", f"{REGION}c"
+    ]
+    with tempfile.TemporaryDirectory(prefix='dc-startup-') as outdir:
+        env = dict(os.environ,
+            CDK_CONTEXT_JSON=json.dumps(context),
+            CDK_OUTDIR=outdir,
+            CDK_DEFAULT_ACCOUNT=ACCOUNT,
+            CDK_DEFAULT_REGION=REGION
+        )
+        res = subprocess.run(
+            [sys.executable, '-X', 'importtime', os.path.join(ROOT, 'cdk_app.py')],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+    if res.returncode:
+        sys.exit(res.stderr)
+
+    modules = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name[1:].rstrip()] = int(cumulative)
+    return modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Check the import-time budget of cdk_app.py')
+    parser.add_argument('--budget-ms', type=float, default=1000,
+                        help='the maximum total import time in milliseconds')
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'cdk.json')) as fcdk:
+        context = json.load(fcdk)['context']
+    context['EASY_VPC'] = True
+
+    modules = profile(context)
+    top_level = {name: us for name, us in modules.items() if not name.startswith(' ')}
+    total_ms = sum(top_level.values()) / 1000
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"{us / 1000:8.1f}ms {name}")
+    print(f"{total_ms:8.1f}ms in total, budget {args.budget_ms:.0f}ms")
+
+    failed = False
+    imported = {name.strip() for name in modules}
+    for name in FORBIDDEN:
+        if name in imported:
+            print(f"FAIL {name} is imported on the synth path")
+            failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL import time {total_ms:.1f}ms exceeds the budget of {args.budget_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of the AWS retry policy under throttling
+
+A local stub answers the SSM GetParameter calls of many threads and returns a
+Throttling error whenever the calls exceed the stubbed service limit, the way
+AWS throttles an account. The run is measured once with the shared rate
+limiter and retry policy of dreamchaser.aws_client, and once with the default
+botocore retries. No AWS access is needed.
+
+    python3 benchmarks/bench_throttling.py --limit 40 --threads 16 --calls 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REGION = 'ap-southeast-2'
+
+
+class ThrottlingStub():
+    def __init__(self, limit: float, burst: float=None) -> None:
+        """
+        A stubbed SSM endpoint serving limit requests per second
+        """
+        self.lock = threading.Lock()
+        self.limit = limit
+        self.burst = burst or limit
+        self.tokens = self.burst
+        self.refilled = time.monotonic()
+        self.stats = {'requests': 0, 'throttled': 0}
+
+    def __call__(self, request, **kwargs):
+        from botocore.awsrequest import AWSResponse
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.limit)
+            self.refilled = now
+            self.stats['requests'] += 1
+            if self.tokens >= 1:
+                self.tokens -= 1
+                status, body = 200, {'Parameter': {'Name': 'DC_ONE_OU_ID', 'Type': 'String', 'Value': 'ou-1'}}
+            else:
+                self.stats['throttled'] += 1
+                status, body = 400, {'__type': 'ThrottlingException', 'message': 'Rate exceeded'}
+        return AWSResponse(request.url, status, {'Content-Type': 'application/x-amz-json-1.1'},
+                            _RawResponse(json.dumps(body).encode()))
+
+
+class _RawResponse():
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def run(client, stub: ThrottlingStub, threads: int, calls: int) -> dict:
+    from botocore.exceptions import ClientError
+
+    client.meta.events.register_last('before-send.ssm', stub)
+    results = {'succeeded': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def _call(_):
+        try:
+            client.get_parameter(Name='DC_ONE_OU_ID')
+            outcome = 'succeeded'
+        except ClientError:
+            outcome = 'failed'
+        with lock:
+            results[outcome] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(_call, range(threads * calls)))
+    elapsed = time.perf_counter() - started
+    return dict(results, **stub.stats,
+        seconds=elapsed,
+        throughput=results['succeeded'] / elapsed
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the AWS retry policy under throttling')
+    parser.add_argument('--limit', type=float, default=40, help='the stubbed requests per second')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--calls', type=int, default=50, help='the calls per thread')
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'stub')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'stub')
+
+    import boto3
+    from botocore.config import Config
+    from dreamchaser.aws_client import ClientRegistry
+
+    report = {
+        'policy': run(ClientRegistry().client('ssm', REGION), ThrottlingStub(args.limit),
+                        args.threads, args.calls),
+        'botocore': run(boto3.session.Session().client(
+                            'ssm', region_name=REGION,
+                            config=Config(max_pool_connections=args.threads)
+                        ), ThrottlingStub(args.limit), args.threads, args.calls)
+    }
+    for name, result in report.items():
+        print(f"{name:9} {result['succeeded']:5} succeeded {result['failed']:5} failed "
+              f"{result['throttled']:6} throttled of {result['requests']:6} requests "
+              f"{result['throughput']:6.1f}/s in {result['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
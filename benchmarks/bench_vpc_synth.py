@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Synthesis benchmark of DreamChaser VPC topologies
+
+Each case of the matrix builds MainStack/VPCStack in a fresh worker process,
+which also starts a fresh JSII runtime, and records the synth wall time, the
+peak RSS of the worker and of its JSII runtime, and the number of resources in
+the generated templates. No AWS access is needed.
+
+    python3 benchmarks/bench_vpc_synth.py --output bench.json
+    python3 benchmarks/bench_vpc_synth.py --quick --baseline bench.json
+"""
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import platform
+import itertools
+import resource
+import subprocess
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ACCOUNT = '111111111111'
+REGION = 'ap-southeast-2'
+
+MATRIX = {
+    'azs': [2, 3, 4],
+    'tiers': [1, 2, 3],
+    'vpc_ha': [False, True],
+    'routes': [1, 16, 64],
+    'vpcs': [1, 4]
+}
+
+QUICK_MATRIX = {
+    'azs': [2, 3],
+    'tiers': [3],
+    'vpc_ha': [False, True],
+    'routes': [1, 16],
+    'vpcs': [1]
+}
+
+
+def build(app, case: dict) -> None:
+    from aws_cdk import Environment
+    from vpc.vpc_core import VPCStack, MainStack
+
+    dest_cidrs = [f"172.{16 + i // 128}.{(i % 128) * 2}.0/24" for i in range(case['routes'])]
+    for index in range(case['vpcs']):
+        main_stack = MainStack(app, f"BENCH-MAIN-{index}",
+                        env=Environment(account=ACCOUNT, region=REGION))
+        vpc_stack = VPCStack(main_stack, f"BENCH-VPC-{index}")
+        vpc_stack.add_vpc(
+            vpc_cidr=f"10.{index}.0.0/16",
+            enable_internet=True,
+            enable_nat=True,
+            vpc_ha=case['vpc_ha'],
+            vpc_endpoint=True
+        )
+        vpc_stack.add_public_subnets(scope_id='DCPublicSubnets', mask=24)
+        route_tables = []
+        if case['tiers'] >= 2:
+            route_tables.extend(
+                isubnet.route_table.route_table_id for isubnet in
+                vpc_stack.add_private_subnets(scope_id='DCPrivateSubnets', mask=24)
+            )
+        if case['tiers'] >= 3:
+            route_tables.extend(
+                isubnet.route_table.route_table_id for isubnet in
+                vpc_stack.add_isolated_subnets(scope_id='DCIsolatedSubnets', mask=24)
+            )
+        vpc_stack.create_tgw(scope_id='TGW')
+        vpc_stack.create_tgw_attach(
+            scope_id='TGWAttach',
+            vpc_id=vpc_stack.vpc.vpc_id,
+            tgw_id=vpc_stack.tgw.ref,
+            mask=28
+        )
+        vpc_stack.add_tgw_route(
+            scope_id='tgwroute',
+            route_tables=route_tables,
+            tgw_id=vpc_stack.tgw.ref,
+            tgw_attach=vpc_stack.tgw_attach,
+            dest_cidr=dest_cidrs
+        )
+
+
+def _peak_rss_kb() -> dict:
+    # the JSII runtime is a node child process which is still running, hence
+    # its high water mark is read from /proc where available
+    peak = {'python': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'jsii': None}
+    try:
+        children = []
+        for task in glob.glob(f"/proc/{os.getpid()}/task/*/children"):
+            with open(task) as fchildren:
+                children.extend(fchildren.read().split())
+        for pid in children:
+            with open(f"/proc/{pid}/status") as fstatus:
+                for line in fstatus:
+                    if line.startswith('VmHWM:'):
+                        peak['jsii'] = (peak['jsii'] or 0) + int(line.split()[1])
+    except OSError:
+        pass
+    return peak
+
+
+def run_case(case: dict) -> dict:
+    outdir = tempfile.mkdtemp(prefix='dc-bench-')
+    try:
+        started = time.perf_counter()
+        from aws_cdk import App
+        imported = time.perf_counter()
+
+        app = App(outdir=outdir, context={
+            f"availability-zones:account={ACCOUNT}:region={REGION}":
+                [f"{REGION}{chr(ord('a') + i)}" for i in range(case['azs'])]
+        })
+        build(app, case)
+        built = time.perf_counter()
+        app.synth()
+        synthesized = time.perf_counter()
+
+        resources = 0
+        for template in glob.glob(os.path.join(outdir, '*.template.json')):
+            with open(template) as ftemplate:
+                resources += len(json.load(ftemplate).get('Resources', {}))
+
+        return dict(case,
+            import_seconds=imported - started,
+            build_seconds=built - imported,
+            synth_seconds=synthesized - imported,
+            peak_rss_kb=_peak_rss_kb(),
+            resources=resources
+        )
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+
+
+def cases(matrix: dict) -> list:
+    keys = list(matrix)
+    return [dict(zip(keys, values)) for values in itertools.product(*matrix.values())]
+
+
+def case_id(case: dict) -> str:
+    return ','.join(f"{key}={case[key]}" for key in MATRIX)
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """
+    Return the cases whose synth time or resource count regressed beyond the
+    tolerance, relative to the baseline
+    """
+    previous = {case_id(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(case_id(result))
+        if not before:
+            continue
+        if result['synth_seconds'] > before['synth_seconds'] * (1 + tolerance):
+            regressions.append(
+                f"{case_id(result)}: synth {before['synth_seconds']:.2f}s -> {result['synth_seconds']:.2f}s"
+            )
+        if result['resources'] > before['resources']:
+            regressions.append(
+                f"{case_id(result)}: resources {before['resources']} -> {result['resources']}"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the synthesis of VPCStack topologies')
+    parser.add_argument('--quick', action='store_true', help='run a reduced matrix')
+    parser.add_argument('--output', help='the JSON file to write the results to')
+    parser.add_argument('--baseline', help='a previous JSON result to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='the relative synth time increase allowed against the baseline')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='the number of cases run concurrently; keep 1 for stable timings')
+    args = parser.parse_args()
+
+    matrix = QUICK_MATRIX if args.quick else MATRIX
+    context = multiprocessing.get_context('spawn')
+    results = []
+    with context.Pool(processes=args.workers, maxtasksperchild=1) as pool:
+        for result in pool.imap(run_case, cases(matrix)):
+            print(f"{case_id(result)}: {result['synth_seconds']:.2f}s "
+                  f"{result['resources']} resources", file=sys.stderr)
+            results.append(result)
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as foutput:
+            json.dump(report, foutput, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as fbaseline:
+            regressions = compare(results, json.load(fbaseline)['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,91 +1,189 @@
 #!/usr/bin/env python3
 import os
-import time
-from constructs import Construct
-from aws_cdk import App, Stack, Environment
-from aws_cdk import aws_s3 as s3
+import sys
+from aws_cdk import App, Environment, Tags
 from vpc.vpc_core import VPCStack, MainStack
-from dreamchaser.aws_init import AWSSsm
+from vpc.vpc_tgw import RouteDomains
 
 #cdk bootstrap yourAWSAccountId/desiredAWSRegion --profile yourAwsProfile
 #cdk deploy -c EASY_VPC=True DREAMCHASER-VPC-STACK-MAIN
 
-app_vpc = App()
-ssm_client = AWSSsm('ap-southeast-2')
-aws_account = app_vpc.node.try_get_context("AWS_ACCOUNT") or os.getenv("CDK_DEFAULT_ACCOUNT")
-aws_region = app_vpc.node.try_get_context("AWS_REGION") or os.getenv("CDK_DEFAULT_REGION")
-
-main_stack = MainStack(app_vpc, "DREAMCHASER-VPC-STACK-MAIN",
-                     env=Environment(
-                        account=aws_account,
-                        region=aws_region
-                     )
-            )
-
-vpc_stack = VPCStack(main_stack, "DREAMCHASER-VPC-STACK-VPC")
-
-# assume you don not have AWS Organization set up, and there is one AWS account only,
-if app_vpc.node.try_get_context("EASY_VPC"):
-        vpc_stack.easy_vpc()
-else:
-        # the purpose of the lines of code below is to show how DreamChaser
-        # construct can be used flexibibly you can make changes per your project
-        # requirements
-        ou_id = app_vpc.node.try_get_context("OU_ID") or ssm_client.get_para(name='DC_ONE_OU_ID')
-        vpc_stack.add_vpc(
-                vpc_cidr=app_vpc.node.try_get_context('DC_VPC_CIDR'),
-                enable_internet=True,
-                enable_nat=True,
-                vpc_ha=app_vpc.node.try_get_context('DC_VPC_HA'),
-                vpc_endpoint=True
-        )
-        res_pub_isubnets = vpc_stack.add_public_subnets(
-                scope_id='DCPublicSubnets', subnet_oct3=16, mask=24
-        )
-        res_pri_isubnets = vpc_stack.add_private_subnets(
-                scope_id='DCPrivateSubnets', subnet_oct3=128, mask=24
-        )
-        res_iso_isubnets = vpc_stack.add_isolated_subnets(
-                scope_id='DCIsolatedSubnets', subnet_oct3=192, mask=24
-        )
-        vpc_stack.create_tgw(scope_id="TGW")
-        time.sleep(5)
-        vpc_stack.share_tgw(ou_id=ou_id)
-        res_tgw_isubnets = vpc_stack.create_tgw_attach(
-                scope_id="TGWAttach",
-                vpc_id=app_vpc.node.try_get_context("VPC_ID") or vpc_stack.vpc.vpc_id,
-                tgw_id=app_vpc.node.try_get_context("TGW_ID") or vpc_stack.tgw.ref,
-                subnet_oct3=240,
-                mask=24
-        )
-        vpc_stack.tgw_route_table( 
-                tgw_id=app_vpc.node.try_get_context("TGW_ID") or vpc_stack.tgw.ref,
-                asso_tgw_attach_id=app_vpc.node.try_get_context("ASSO_TGW_ATTACH_ID") or vpc_stack.tgw_attach.ref,
-                dest_tgw_attach_id=app_vpc.node.try_get_context("DEST_TGW_ATTACH_ID") or vpc_stack.tgw_attach.ref,
-                # specify your own destination CIDR.
-                dest_cidr=app_vpc.node.try_get_context("DC_DEST_CIDR")
-        )
-        vpc_stack.add_tgw_route(
-                scope_id='pritgwroute',
-                route_tables=[isubnet.route_table.route_table_id for isubnet in res_pri_isubnets], 
-                tgw_id=vpc_stack.tgw.ref,
-                tgw_attach=vpc_stack.tgw_attach,
-                dest_cidr=app_vpc.node.try_get_context('DC_DEST_CIDR'),
-        )
-        vpc_stack.add_tgw_route(
-                scope_id='isotgwroute',
-                route_tables=[isubnet.route_table.route_table_id for isubnet in res_iso_isubnets],
-                tgw_id=vpc_stack.tgw.ref,
-                tgw_attach=vpc_stack.tgw_attach,
-                dest_cidr=app_vpc.node.try_get_context('DC_DEST_CIDR')
-        )
-
-        vpc_stack.add_tgw_route(
-                scope_id='tgwroute',
-                route_tables=[isubnet.route_table.route_table_id for isubnet in res_tgw_isubnets], 
-                tgw_id=vpc_stack.tgw.ref,
-                tgw_attach=vpc_stack.tgw_attach,
-                dest_cidr=vpc_stack.node.try_get_context('DC_DEST_CIDR')
-        )
-
-app_vpc.synth()
\ No newline at end of file
+
+def build(app_vpc: App) -> VPCStack:
+        """
+        Build the DreamChaser topology of one environment into a CDK app
+
+        Notes:
+            The account, region and topology are read from the app context,
+            hence the same topology can be built for many environments, e.g. by
+            synth_matrix.py.
+        """
+        aws_account = app_vpc.node.try_get_context("AWS_ACCOUNT") or os.getenv("CDK_DEFAULT_ACCOUNT")
+        aws_region = app_vpc.node.try_get_context("AWS_REGION") or os.getenv("CDK_DEFAULT_REGION")
+
+        main_stack = MainStack(app_vpc, "DREAMCHASER-VPC-STACK-MAIN",
+                             env=Environment(
+                                account=aws_account,
+                                region=aws_region
+                             )
+                    )
+
+        # opt the stacks of ephemeral environments in to teardown, see
+        # dreamchaser/aws_teardown.py
+        if app_vpc.node.try_get_context("DC_EPHEMERAL"):
+                Tags.of(main_stack).add("dreamchaser:teardown", "true")
+
+        vpc_stack = VPCStack(main_stack, "DREAMCHASER-VPC-STACK-VPC")
+
+        # assume you don not have AWS Organization set up, and there is one AWS account only,
+        if app_vpc.node.try_get_context("EASY_VPC"):
+                vpc_stack.easy_vpc()
+        else:
+                # the purpose of the lines of code below is to show how DreamChaser
+                # construct can be used flexibibly you can make changes per your project
+                # requirements
+                ou_id = app_vpc.node.try_get_context("OU_ID")
+                if not ou_id:
+                        # boto3 and the SSM client are only loaded when the OU id is
+                        # not given as context
+                        from dreamchaser.aws_init import AWSSsm
+                        from dreamchaser.errors import DreamChaserError
+                        try:
+                                ou_id = AWSSsm('ap-southeast-2').get_para(name='DC_ONE_OU_ID')
+                        except DreamChaserError as e:
+                                print(e, file=sys.stderr)
+                                sys.exit(e.exit_code)
+                vpc_stack.add_vpc(
+                        vpc_cidr=app_vpc.node.try_get_context('DC_VPC_CIDR'),
+                        enable_internet=True,
+                        enable_nat=True,
+                        vpc_ha=app_vpc.node.try_get_context('DC_VPC_HA'),
+                        vpc_endpoint=True,
+                        gateway_endpoints=app_vpc.node.try_get_context('DC_GATEWAY_ENDPOINTS'),
+                        nat_per_az=int(app_vpc.node.try_get_context('DC_NAT_PER_AZ') or 1),
+                        flow_logs=app_vpc.node.try_get_context('DC_FLOW_LOGS_BUCKET')
+                )
+                res_pub_isubnets = vpc_stack.add_public_subnets(
+                        scope_id='DCPublicSubnets', subnet_oct3=16, mask=24
+                )
+                res_pri_isubnets = vpc_stack.add_private_subnets(
+                        scope_id='DCPrivateSubnets', subnet_oct3=128, mask=24
+                )
+                res_iso_isubnets = vpc_stack.add_isolated_subnets(
+                        scope_id='DCIsolatedSubnets', subnet_oct3=192, mask=24
+                )
+                # keep the AWS API traffic off the Nat Gateways via interface
+                # endpoints, e.g. with the context "DC_INTERFACE_ENDPOINTS" set
+                # to ["ssm", "ecr.api", "ecr.dkr", "logs"], or to true for the
+                # default services
+                interface_endpoints = app_vpc.node.try_get_context('DC_INTERFACE_ENDPOINTS')
+                if interface_endpoints:
+                        vpc_stack.add_interface_endpoints(
+                                scope_id='DCEndpoints',
+                                isubnets=res_pri_isubnets,
+                                services=interface_endpoints if isinstance(interface_endpoints, list) else None
+                        )
+                vpc_stack.create_tgw(scope_id="TGW")
+                vpc_stack.share_tgw(ou_id=ou_id)
+                res_tgw_isubnets = vpc_stack.create_tgw_attach(
+                        scope_id="TGWAttach",
+                        vpc_id=app_vpc.node.try_get_context("VPC_ID") or vpc_stack.vpc.vpc_id,
+                        tgw_id=app_vpc.node.try_get_context("TGW_ID") or vpc_stack.tgw.ref,
+                        subnet_oct3=240,
+                        mask=24
+                )
+                # the context "DC_ROUTE_DOMAINS", a route domain specification or
+                # the path of a JSON file holding it, replaces the single
+                # transit gateway route table by hub-spoke route domains, where
+                # the attachment of this VPC is named "TGWAttach"
+                route_domains = app_vpc.node.try_get_context("DC_ROUTE_DOMAINS")
+                if route_domains:
+                        tgw_route_tables = vpc_stack.add_route_domains(
+                                scope_id="TGWDomains",
+                                tgw_id=app_vpc.node.try_get_context("TGW_ID") or vpc_stack.tgw.ref,
+                                route_domains=RouteDomains.load(route_domains),
+                                attachment_ids={"TGWAttach": vpc_stack.tgw_attach.ref}
+                        )
+                else:
+                        vpc_stack.tgw_route_table( 
+                                tgw_id=app_vpc.node.try_get_context("TGW_ID") or vpc_stack.tgw.ref,
+                                asso_tgw_attach_id=app_vpc.node.try_get_context("ASSO_TGW_ATTACH_ID") or vpc_stack.tgw_attach.ref,
+                                dest_tgw_attach_id=app_vpc.node.try_get_context("DEST_TGW_ATTACH_ID") or vpc_stack.tgw_attach.ref,
+                                # specify your own destination CIDR.
+                                dest_cidr=app_vpc.node.try_get_context("DC_DEST_CIDR")
+                        )
+                        tgw_route_tables = {}
+
+                # the context "DC_VPN_CONNECTIONS" lists the site-to-site VPN
+                # connections to the transit gateway, associated with the route
+                # table of tgw_route_table or of the route domain "DC_VPN_DOMAIN"
+                vpn_connections = app_vpc.node.try_get_context("DC_VPN_CONNECTIONS")
+                if vpn_connections:
+                        vpc_stack.add_vpn_attachments(
+                                scope_id="TGWVpn",
+                                connections=vpn_connections,
+                                route_table=tgw_route_tables.get(app_vpc.node.try_get_context("DC_VPN_DOMAIN"))
+                        )
+                vpc_stack.add_tgw_route(
+                        scope_id='pritgwroute',
+                        route_tables=[isubnet.route_table.route_table_id for isubnet in res_pri_isubnets], 
+                        tgw_id=vpc_stack.tgw.ref,
+                        tgw_attach=vpc_stack.tgw_attach,
+                        dest_cidr=app_vpc.node.try_get_context('DC_DEST_CIDR'),
+                )
+                vpc_stack.add_tgw_route(
+                        scope_id='isotgwroute',
+                        route_tables=[isubnet.route_table.route_table_id for isubnet in res_iso_isubnets],
+                        tgw_id=vpc_stack.tgw.ref,
+                        tgw_attach=vpc_stack.tgw_attach,
+                        dest_cidr=app_vpc.node.try_get_context('DC_DEST_CIDR')
+                )
+
+                vpc_stack.add_tgw_route(
+                        scope_id='tgwroute',
+                        route_tables=[isubnet.route_table.route_table_id for isubnet in res_tgw_isubnets], 
+                        tgw_id=vpc_stack.tgw.ref,
+                        tgw_attach=vpc_stack.tgw_attach,
+                        dest_cidr=vpc_stack.node.try_get_context('DC_DEST_CIDR')
+                )
+
+        # report the number of resources per nested stack when sharding is enabled
+        # with the context "DC_VPC_SHARD"
+        if vpc_stack.sharded:
+                for shard, count in vpc_stack.shard_report().items():
+                        print(f"{shard}: {count} resources", file=sys.stderr)
+
+        # report the expected load of each Nat Gateway when the context
+        # "DC_NAT_PER_AZ" sets more than one Nat Gateway per zone
+        if any(len(pool) > 1 for pool in vpc_stack.nat_pools.values()):
+                for nat, load in vpc_stack.nat_report().items():
+                        print("{}: {} weight {:g} ({:.0%} of zone {}) {}".format(
+                                nat, len(load['subnets']), load['weight'], load['share'],
+                                load['zone'], ', '.join(load['subnets'])
+                        ), file=sys.stderr)
+
+        # report the aggregate capacity of the VPN tunnels
+        if vpc_stack.vpn_connections:
+                report = vpc_stack.vpn_report()
+                print("VPN: {} connections, {} tunnels, {} ECMP, {:g} Gbps".format(
+                        report['connections'], report['tunnels'], report['ecmp_tunnels'], report['gbps']
+                ), file=sys.stderr)
+
+        # report the zones of the next hops of each route table with the context
+        # "DC_ROUTING_REPORT", cross-AZ hops being marked with '*'
+        if app_vpc.node.try_get_context('DC_ROUTING_REPORT'):
+                for route_table, hops in vpc_stack.routing.matrix().items():
+                        print("{} ({}): {}".format(route_table, hops['zone'], ', '.join(
+                                "{}={}".format(kind, ','.join(
+                                        zone + ('' if zone == hops['zone'] else '*') for zone in zones
+                                ))
+                                for kind, zones in hops.items() if kind != 'zone'
+                        ) or '-'), file=sys.stderr)
+
+        return vpc_stack
+
+
+if __name__ == '__main__':
+        app_vpc = App()
+        build(app_vpc)
+        app_vpc.synth()
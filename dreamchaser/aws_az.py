@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dreamchaser.aws_cache import JsonCache, CACHE_DIR
+
+AZ_CACHE_MAX_AGE = int(os.getenv('DC_AZ_CACHE_MAX_AGE', str(7 * 24 * 3600)))
+
+
+class AzCache():
+    def __init__(self, path: str=None, max_age: int=AZ_CACHE_MAX_AGE) -> None:
+        """
+        A local cache of the availability zones of AWS accounts and regions
+
+        Notes:
+            The zones of every targeted account and region are fetched in one
+            concurrent pass by refresh, and served offline afterwards. The
+            cache file is rewritten atomically, hence parallel CI jobs can
+            share one warm cache by pointing DC_CACHE_DIR at the same
+            directory.
+
+        Args:
+            path (str): the JSON file of the cache, defaults to
+            .dreamchaser/az_cache.json.
+            max_age (int): the age in seconds after which an entry is stale.
+        """
+        self.cache = JsonCache(path or os.path.join(CACHE_DIR, 'az_cache.json'))
+        self.max_age = max_age
+
+    @staticmethod
+    def key(account: str, region: str) -> str:
+        return f"{account}:{region}"
+
+    def get(self, account: str, region: str) -> dict:
+        return self.cache.get(self.key(account, region))
+
+    def names(self, account: str, region: str) -> list:
+        entry = self.get(account, region)
+        return entry['names'] if entry else None
+
+    def ids(self, account: str, region: str) -> list:
+        entry = self.get(account, region)
+        return entry['ids'] if entry else None
+
+    def age(self, account: str, region: str) -> float:
+        entry = self.get(account, region)
+        return time.time() - entry['fetched'] if entry else None
+
+    def is_stale(self, account: str, region: str) -> bool:
+        age = self.age(account, region)
+        return age is None or age > self.max_age
+
+    def stale(self) -> list:
+        """
+        Return the keys of the entries older than max_age
+        """
+        now = time.time()
+        return sorted(
+            key for key, entry in self.cache.load().items()
+            if now - entry['fetched'] > self.max_age
+        )
+
+    def _fetch(self, account: str, region: str, role_arn: str=None, **kwargs) -> dict:
+        from dreamchaser.aws_client import get_client
+
+        client = get_client('ec2', region, role_arn=role_arn, **kwargs)
+        zones = client.describe_availability_zones(
+            Filters=[{'Name': 'zone-type', 'Values': ['availability-zone']}]
+        )['AvailabilityZones']
+        zones = sorted(
+            (zone for zone in zones if zone['State'] == 'available'),
+            key=lambda zone: zone['ZoneName']
+        )
+        return {
+            'names': [zone['ZoneName'] for zone in zones],
+            'ids': [zone['ZoneId'] for zone in zones],
+            'fetched': time.time()
+        }
+
+    def refresh(self, targets: list, role_name: str=None, force: bool=False,
+                max_workers: int=8, **kwargs) -> list:
+        """
+        Fetch the availability zones of many accounts and regions
+
+        Args:
+            targets (list): a list of (account, region) tuples.
+            role_name (str): the name of the IAM role to assume in each
+            account, e.g. 'OrganizationAccountAccessRole'. Defaults to the
+            current credentials.
+            force (bool): set to True to fetch the entries which are not
+            stale as well.
+            max_workers (int): the number of concurrent lookups.
+
+        Returns:
+            the keys of the refreshed entries.
+        """
+        targets = [
+            (account, region) for account, region in dict.fromkeys(targets)
+            if force or self.is_stale(account, region)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            entries = list(executor.map(
+                lambda target: self._fetch(
+                    *target,
+                    role_arn=f"arn:aws:iam::{target[0]}:role/{role_name}" if role_name else None,
+                    **kwargs
+                ),
+                targets
+            ))
+        self.cache.update({
+            self.key(account, region): entry
+            for (account, region), entry in zip(targets, entries)
+        })
+        return [self.key(account, region) for account, region in targets]
+
+    def context(self) -> dict:
+        """
+        Return the cached zones as CDK context values, keyed like the context
+        of the availability zones lookup of CDK
+        """
+        contexts = {}
+        for key, entry in self.cache.load().items():
+            account, region = key.split(':', 1)
+            contexts[f"availability-zones:account={account}:region={region}"] = entry['names']
+        return contexts
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the availability zone cache')
+    parser.add_argument('command', choices=['refresh', 'report'])
+    parser.add_argument('--targets', nargs='*', default=[],
+                        help='the account:region pairs to refresh')
+    parser.add_argument('--role-name', help='the IAM role to assume in each account')
+    parser.add_argument('--force', action='store_true',
+                        help='refresh the entries which are not stale as well')
+    args = parser.parse_args()
+
+    az_cache = AzCache()
+    if args.command == 'refresh':
+        refreshed = az_cache.refresh(
+            [tuple(target.split(':', 1)) for target in args.targets],
+            role_name=args.role_name,
+            force=args.force
+        )
+        print(f"Refreshed {len(refreshed)} of {len(args.targets)} targets")
+    else:
+        stale = set(az_cache.stale())
+        for key, entry in sorted(az_cache.cache.load().items()):
+            age = (time.time() - entry['fetched']) / 3600
+            print(f"{key}: {', '.join(entry['names'])} ({age:.1f}h old{', STALE' if key in stale else ''})")
+        sys.exit(1 if stale else 0)
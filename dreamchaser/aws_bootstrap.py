@@ -0,0 +1,157 @@
+import os
+import time
+from botocore.client import ClientError
+from dreamchaser.aws_cache import JsonCache, CACHE_DIR
+from dreamchaser.aws_client import get_account_id
+from dreamchaser.aws_deploy import TaskGraph
+from dreamchaser.errors import OrganizationError, OrganizationalUnitLookupError
+
+
+class Bootstrap():
+    def __init__(self, journal_path: str=None, max_workers: int=4, namespace: str=None) -> None:
+        """
+        A resumable engine of idempotent bootstrap steps
+
+        Notes:
+            Steps run on a TaskGraph, hence the steps which do not depend on
+            each other run concurrently. Each completed step is recorded with
+            its result in a local JSON journal. A later run skips the steps
+            the journal holds as complete, serves their results from the
+            journal, and resumes from the steps which failed or were skipped
+            because a dependency failed. The steps are journaled under a
+            namespace, e.g. the management account and region, hence
+            bootstraps of several organizations share a journal.
+
+        Args:
+            journal_path (str): the JSON journal, defaults to
+            .dreamchaser/bootstrap_journal.json.
+            max_workers (int): the number of steps run concurrently.
+            namespace (str): the prefix of the journal entries of the steps.
+        """
+        self.journal = JsonCache(journal_path or os.path.join(CACHE_DIR, 'bootstrap_journal.json'))
+        self.max_workers = max_workers
+        self.namespace = namespace
+        self.steps = {}
+
+    def _key(self, name: str) -> str:
+        return f"{self.namespace}/{name}" if self.namespace else name
+
+    def add_step(self, name: str, func, depends_on: list=None) -> None:
+        """
+        Add a step to the bootstrap
+
+        Args:
+            name (str): a unique name of the step.
+            func (callable): called with the results of the steps it depends
+            on, by name, and returning a JSON serializable result.
+            depends_on (list): names of the steps which have to complete
+            beforehand.
+        """
+        if name in self.steps:
+            raise ValueError(f"Duplicate step: {name}")
+        self.steps[name] = {'func': func, 'depends_on': list(depends_on or [])}
+
+    def result(self, name: str):
+        entry = self.journal.get(self._key(name))
+        return entry['result'] if entry else None
+
+    def is_complete(self, name: str) -> bool:
+        entry = self.journal.get(self._key(name))
+        return bool(entry) and entry['status'] == 'COMPLETE'
+
+    def reset(self, names: list=None) -> None:
+        """
+        Forget the given steps, or every step of the namespace, so that they
+        run again
+        """
+        prefix = self._key('')
+
+        def forget(data):
+            keys = [key for key in data if key.startswith(prefix)] if names is None else map(self._key, names)
+            for key in list(keys):
+                data.pop(key, None)
+        self.journal.modify(forget)
+
+    def _run_step(self, name: str) -> dict:
+        if self.is_complete(name):
+            return {'journal': True, 'result': self.result(name)}
+        step = self.steps[name]
+        result = step['func']({dep: self.result(dep) for dep in step['depends_on']})
+        self.journal.put(self._key(name), {'status': 'COMPLETE', 'result': result, 'completed': time.time()})
+        return {'journal': False, 'result': result}
+
+    def run(self) -> dict:
+        """
+        Run the steps which are not complete yet
+
+        Returns:
+            the report of TaskGraph.run, with one task per step.
+        """
+        graph = TaskGraph(max_workers=self.max_workers)
+        for name, step in self.steps.items():
+            graph.add_task(name, lambda name=name: self._run_step(name), depends_on=step['depends_on'])
+        return graph.run()
+
+
+def role_arn(account: str, role_name: str=None) -> str:
+    return f"arn:aws:iam::{account}:role/{role_name}" if account and role_name else None
+
+
+def organization_bootstrap(region_name: str='ap-southeast-2', targets: list=None,
+                            role_name: str='OrganizationAccountAccessRole',
+                            org_unit: str='dreamchaser', journal_path: str=None,
+                            max_workers: int=4) -> Bootstrap:
+    """
+    Return the bootstrap of the DreamChaser AWS Organization
+
+    Notes:
+        The organization, its SCP policy type, the DreamChaser OU and the RAM
+        sharing are set up once with the current credentials of the management
+        account. The arn of the OU is then saved as the DC_ONE_OU_ID parameter
+        in region_name and in every target account and region, through the
+        role_name role of the member accounts. The steps are journaled per
+        management account and region, and the parameter writes share one
+        SSM cache.
+
+    Args:
+        region_name (str): the AWS region of the management account.
+        targets (list): a list of (account, region) tuples of member accounts.
+        role_name (str): the IAM role to assume in the member accounts.
+        org_unit (str): the name of the DreamChaser OU.
+    """
+    from dreamchaser.aws_init import AWSOrg, AWSRam, AWSSsm
+
+    try:
+        management = get_account_id(region_name)
+    except ClientError as e:
+        raise OrganizationError.from_client_error(e) from e
+    org = AWSOrg(region_name, org_unit=org_unit)
+    ssm_cache = JsonCache(os.path.join(CACHE_DIR, 'ssm_cache.json'))
+    bootstrap = Bootstrap(journal_path=journal_path, max_workers=max_workers,
+                            namespace=f"{management}:{region_name}")
+
+    def _get_ou_arn(results):
+        ou_arn = org.get_ou_arn()
+        if not ou_arn:
+            raise OrganizationalUnitLookupError(f"Organizational unit not found: {org_unit}")
+        return ou_arn
+
+    bootstrap.add_step('create-org', lambda results: org.create_organization())
+    bootstrap.add_step('enable-policy', lambda results: org.enable_policy(), depends_on=['create-org'])
+    bootstrap.add_step('create-ou', lambda results: org.create_ou(), depends_on=['create-org'])
+    bootstrap.add_step('get-ou-arn', _get_ou_arn, depends_on=['create-ou'])
+    bootstrap.add_step(
+        'enable-resource-sharing',
+        lambda results: AWSRam(region_name).enable_resource_sharing(),
+        depends_on=['create-org']
+    )
+
+    for account, region in [(None, region_name)] + list(dict.fromkeys(targets or [])):
+        bootstrap.add_step(
+            f"put-ou-id:{account or 'management'}:{region}",
+            lambda results, account=account, region=region: AWSSsm(
+                region, cache=ssm_cache, role_arn=role_arn(account, role_name)
+            ).put_str_para(name='DC_ONE_OU_ID', value=results['get-ou-arn']),
+            depends_on=['get-ou-arn']
+        )
+    return bootstrap
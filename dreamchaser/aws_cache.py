@@ -0,0 +1,169 @@
+import os
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    # no file locking on Windows, where only one process uses a cache
+    fcntl = None
+
+CACHE_DIR = os.getenv('DC_CACHE_DIR', '.dreamchaser')
+
+
+class JsonCache():
+    def __init__(self, path: str) -> None:
+        """
+        A dict persisted as a JSON file
+
+        Notes:
+            The file is rewritten atomically via a temporary file, hence a
+            concurrent reader, e.g. a parallel CI job, sees either the previous
+            or the new content but never a partial one. Each change re-reads
+            the file and applies itself under an exclusive lock of the file,
+            hence concurrent processes sharing the file never lose each
+            other's entries. The content is re-read whenever another process
+            rewrote the file.
+        """
+        self.path = path
+        self.lock = threading.RLock()
+        self.data = None
+        self.stat = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as fcache:
+                return json.load(fcache)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self) -> dict:
+        with self.lock:
+            stat = self._stat()
+            if self.data is None or stat != self.stat:
+                self.data = self._read()
+                self.stat = stat
+            return self.data
+
+    @contextmanager
+    def _file_lock(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as flock:
+            if fcntl:
+                fcntl.flock(flock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(flock, fcntl.LOCK_UN)
+
+    def modify(self, func) -> None:
+        """
+        Apply a change to the latest content of the file and save it
+
+        Args:
+            func (callable): called with the dict of the entries, which it
+            changes in place.
+        """
+        with self.lock, self._file_lock():
+            data = self._read()
+            func(data)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as fcache:
+                json.dump(data, fcache, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self.data = data
+            self.stat = self._stat()
+
+    def get(self, key: str, default=None):
+        with self.lock:
+            return self.load().get(key, default)
+
+    def put(self, key: str, value) -> None:
+        self.modify(lambda data: data.update({key: value}))
+
+    def update(self, entries: dict) -> None:
+        self.modify(lambda data: data.update(entries))
+
+    def delete(self, key: str=None) -> None:
+        """
+        Delete one entry, or every entry when key is not given
+        """
+        if key is None:
+            self.modify(lambda data: data.clear())
+        else:
+            self.modify(lambda data: data.pop(key, None))
+
+
+class DeployCache():
+    def __init__(self, path: str=None) -> None:
+        """
+        Content-addressed record of the last successful stack deployments
+
+        Notes:
+            A deployment is identified by the digest of its template, its
+            parameters and its capabilities. When the template is a local file
+            its content is hashed, otherwise its url is hashed along with the
+            version of the object, e.g. its S3 ETag, given by the caller, see
+            CfnStack.template_version. A content-addressed url, e.g. one
+            embedding the hash of the template, needs no version. The
+            content-addressed keys of the uploaded assets are hashed as well,
+            if any. Deployments are recorded per account, region and stack.
+        """
+        self.cache = JsonCache(path or os.path.join(CACHE_DIR, 'deploy_cache.json'))
+
+    @staticmethod
+    def digest(template: str, parameters: list=None, capabilities: list=None,
+                assets: dict=None, template_version: str=None) -> str:
+        sha = hashlib.sha256()
+        if template and os.path.isfile(template):
+            with open(template, 'rb') as ftemplate:
+                for chunk in iter(lambda: ftemplate.read(1024 * 1024), b''):
+                    sha.update(chunk)
+        else:
+            sha.update((template or '').encode())
+            if template_version:
+                sha.update(template_version.encode())
+        inputs = {
+            'parameters': sorted(
+                (parameters or []), key=lambda p: p.get('ParameterKey', '')
+            ),
+            'capabilities': sorted(capabilities or [])
+        }
+        if assets:
+            inputs['assets'] = assets
+        sha.update(json.dumps(inputs, sort_keys=True).encode())
+        return sha.hexdigest()
+
+    @staticmethod
+    def key(account_id: str, region_name: str, stack_name: str) -> str:
+        return f"{account_id}/{region_name}/{stack_name}"
+
+    def is_current(self, account_id: str, region_name: str, stack_name: str,
+                    digest: str) -> bool:
+        return self.cache.get(self.key(account_id, region_name, stack_name)) == digest
+
+    def record(self, account_id: str, region_name: str, stack_name: str,
+                digest: str) -> None:
+        self.cache.put(self.key(account_id, region_name, stack_name), digest)
+
+    def invalidate(self, account_id: str=None, region_name: str=None,
+                    stack_name: str=None) -> None:
+        """
+        Forget the deployment of one stack, or of every stack when stack_name
+        is not given
+        """
+        if stack_name:
+            self.cache.delete(self.key(account_id, region_name, stack_name))
+        else:
+            self.cache.delete()
@@ -0,0 +1,158 @@
+import os
+import threading
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import AssumeRoleCredentialFetcher, DeferredRefreshableCredentials
+from dreamchaser.aws_retry import RetryPolicy
+
+MAX_POOL_CONNECTIONS = int(os.getenv('DC_MAX_POOL_CONNECTIONS', '50'))
+
+
+class ClientRegistry():
+    def __init__(self, max_pool_connections: int=MAX_POOL_CONNECTIONS,
+                    config: Config=None, retry_policy: RetryPolicy=None) -> None:
+        """
+        A thread safe registry of boto3 clients
+
+        Notes:
+            Clients are keyed by (service, region, profile, role) and built only
+            once. Every session shares the service model loader of a single
+            botocore session, hence the service models and the endpoint data
+            are read from disk once per process. boto3 clients are thread safe
+            whereas their construction is not, hence construction is
+            serialized by a lock.
+
+        Args:
+            max_pool_connections (int): the size of the HTTP connection pool of
+            each client. Raise it when a client is shared by many threads.
+            config (Config): an extra botocore config merged into the config of
+            every client.
+            retry_policy (RetryPolicy): the rate limiting and retry policy of
+            every client.
+        """
+        self.lock = threading.RLock()
+        self.botocore_session = botocore.session.get_session()
+        self.config = Config(
+            max_pool_connections=max_pool_connections,
+            retries={'mode': 'standard', 'total_max_attempts': 1}
+        )
+        if config:
+            self.config = self.config.merge(config)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.sessions = {}
+        self.clients = {}
+        self.accounts = {}
+        self.account_locks = {}
+
+    def _new_botocore_session(self, profile_name: str=None):
+        bc_session = botocore.session.Session(profile=profile_name)
+        bc_session.register_component(
+            'data_loader', self.botocore_session.get_component('data_loader')
+        )
+        return bc_session
+
+    def session(self, profile_name: str=None, role_arn: str=None) -> boto3.session.Session:
+        """
+        Return the boto3 session of a credentials profile or an IAM role
+
+        Notes:
+            The credentials of a role are assumed from the credentials of the
+            profile, and refreshed before they expire.
+        """
+        key = (profile_name, role_arn)
+        with self.lock:
+            if key not in self.sessions:
+                if role_arn:
+                    source = self.session(profile_name=profile_name)._session
+                    fetcher = AssumeRoleCredentialFetcher(
+                        client_creator=source.create_client,
+                        source_credentials=source.get_credentials(),
+                        role_arn=role_arn,
+                        extra_args={'RoleSessionName': 'dreamchaser'}
+                    )
+                    bc_session = self._new_botocore_session(profile_name)
+                    bc_session._credentials = DeferredRefreshableCredentials(
+                        method='assume-role',
+                        refresh_using=fetcher.fetch_credentials
+                    )
+                elif profile_name:
+                    bc_session = self._new_botocore_session(profile_name)
+                else:
+                    bc_session = self.botocore_session
+                self.sessions[key] = boto3.session.Session(botocore_session=bc_session)
+            return self.sessions[key]
+
+    def client(self, service_name: str, region_name: str=None,
+                profile_name: str=None, role_arn: str=None):
+        key = (service_name, region_name, profile_name, role_arn)
+        with self.lock:
+            if key not in self.clients:
+                client = self.session(profile_name, role_arn).client(
+                    service_name, region_name=region_name, config=self.config
+                )
+                self.retry_policy.attach(client)
+                self.clients[key] = client
+            return self.clients[key]
+
+    def account_id(self, region_name: str=None, profile_name: str=None,
+                    role_arn: str=None) -> str:
+        """
+        Return the AWS account of a credentials profile or an IAM role
+
+        Notes:
+            The account of a role is read from its arn. The account of a
+            profile is resolved via STS GetCallerIdentity once per process,
+            under a lock of the profile, hence the lookup never blocks the
+            other clients of the registry.
+        """
+        if role_arn:
+            return role_arn.split(':')[4]
+        with self.lock:
+            account_lock = self.account_locks.setdefault(profile_name, threading.Lock())
+        with account_lock:
+            with self.lock:
+                account_id = self.accounts.get(profile_name)
+            if account_id is None:
+                client = self.client('sts', region_name=region_name, profile_name=profile_name)
+                account_id = client.get_caller_identity()['Account']
+                with self.lock:
+                    self.accounts[profile_name] = account_id
+            return account_id
+
+    def clear(self) -> None:
+        with self.lock:
+            self.clients = {}
+            self.sessions = {}
+            self.accounts = {}
+            self.account_locks = {}
+
+
+registry = ClientRegistry()
+
+
+def get_client(service_name: str, region_name: str=None, profile_name: str=None,
+                role_arn: str=None, **kwargs):
+    """
+    Return the shared client of an AWS service
+
+    Args:
+        service_name (str): the name of the AWS service, e.g. 'ssm'.
+        region_name (str): the AWS region of the client.
+        profile_name (str): the AWS credentials profile, defaults to the
+        default credentials chain.
+        role_arn (str): the arn of an IAM role to assume, e.g. on a member
+        account.
+    """
+    return registry.client(service_name, region_name=region_name,
+                            profile_name=profile_name, role_arn=role_arn)
+
+
+def get_account_id(region_name: str=None, profile_name: str=None, role_arn: str=None,
+                    **kwargs) -> str:
+    """
+    Return the AWS account of the credentials of get_client, see
+    ClientRegistry.account_id
+    """
+    return registry.account_id(region_name=region_name, profile_name=profile_name,
+                                role_arn=role_arn)
@@ -0,0 +1,263 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dreamchaser.aws_stack import CfnStack
+
+
+class TaskGraph():
+    def __init__(self, max_workers: int=4) -> None:
+        self.max_workers = max_workers
+        self.tasks = {}
+        self.depends_on = {}
+
+    def add_task(self, name: str, func, depends_on: list=None) -> None:
+        """
+        Add a unit of work to the graph
+
+        Args:
+            name (str): a unique name of the task.
+            func (callable): a callable without arguments which runs the task.
+            depends_on (list): names of the tasks which have to complete
+            successfully before this task starts.
+        """
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        self.tasks[name] = func
+        self.depends_on[name] = set(depends_on or [])
+
+    def order(self) -> list:
+        """
+        Return the task names in topological order
+
+        Raises ValueError when a dependency is unknown or when the graph has a
+        cycle.
+        """
+        indegree = {}
+        dependents = {name: [] for name in self.tasks}
+        for name, deps in self.depends_on.items():
+            for dep in deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task {name} depends on unknown task {dep}")
+                dependents[dep].append(name)
+            indegree[name] = len(deps)
+
+        ready = [name for name in self.tasks if indegree[name] == 0]
+        ordered = []
+        while ready:
+            name = ready.pop()
+            ordered.append(name)
+            for dependent in dependents[name]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(ordered) != len(self.tasks):
+            cycle = sorted(name for name in self.tasks if indegree[name] > 0)
+            raise ValueError(f"Dependency cycle between tasks: {', '.join(cycle)}")
+        return ordered
+
+    def run(self) -> dict:
+        """
+        Run every task on a bounded thread pool
+
+        Notes:
+            A task is submitted as soon as all of its dependencies have
+            completed, hence independent tasks run concurrently and the caller
+            only blocks where a dependency requires it. When a task fails, the
+            tasks depending on it are skipped while the independent ones carry
+            on.
+
+        Returns:
+            a report with the per-task status and wall-clock time, the overall
+            elapsed time and the critical path.
+        """
+        self.order()
+        dependents = {name: [] for name in self.tasks}
+        pending = {}
+        for name, deps in self.depends_on.items():
+            for dep in deps:
+                dependents[dep].append(name)
+            pending[name] = len(deps)
+
+        results = {}
+        started = time.monotonic()
+
+        def _run(name):
+            start = time.monotonic()
+            try:
+                value = self.tasks[name]()
+                status, error = 'SUCCEEDED', None
+            except BaseException as e:
+                value, status, error = None, 'FAILED', e
+            end = time.monotonic()
+            return {
+                'status': status,
+                'result': value,
+                'error': error,
+                'start': start - started,
+                'end': end - started,
+                'elapsed': end - start
+            }
+
+        def _skip(name):
+            for dependent in dependents[name]:
+                if dependent not in results:
+                    results[dependent] = {
+                        'status': 'SKIPPED',
+                        'result': None,
+                        'error': None,
+                        'start': None,
+                        'end': None,
+                        'elapsed': 0.0
+                    }
+                    _skip(dependent)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {
+                executor.submit(_run, name): name
+                for name in self.tasks if pending[name] == 0
+            }
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if results[name]['status'] != 'SUCCEEDED':
+                        _skip(name)
+                        continue
+                    for dependent in dependents[name]:
+                        pending[dependent] -= 1
+                        if pending[dependent] == 0 and dependent not in results:
+                            running[executor.submit(_run, dependent)] = dependent
+
+        return {
+            'tasks': results,
+            'elapsed': time.monotonic() - started,
+            'critical_path': self.critical_path(results)
+        }
+
+    def critical_path(self, results: dict) -> list:
+        """
+        Return the chain of tasks which gated the overall completion time
+
+        Notes:
+            Starting from the task which finished last, walk back through the
+            dependency which finished last until a task without dependencies is
+            reached.
+        """
+        finished = {
+            name: result for name, result in results.items()
+            if result['end'] is not None
+        }
+        if not finished:
+            return []
+
+        name = max(finished, key=lambda n: finished[n]['end'])
+        path = [name]
+        while True:
+            deps = [dep for dep in self.depends_on[name] if dep in finished]
+            if not deps:
+                break
+            name = max(deps, key=lambda n: finished[n]['end'])
+            path.append(name)
+        return path[::-1]
+
+
+class StackDeployer():
+    def __init__(self, region_name: str, max_workers: int=4, **kwargs) -> None:
+        self.cfn = CfnStack(region_name, **kwargs)
+        self.max_workers = max_workers
+        self.stacks = {}
+
+    def add_stack(self, stack_name: str, template: str, parameters: list=None,
+                    output: str=None, timeout: int=30, depends_on: list=None,
+                    exports: list=None, imports: list=None, assets: str=None) -> None:
+        """
+        Add a CloudFormation stack to deploy
+
+        Args:
+            stack_name (str): the name of the CloudFormation stack.
+            template (str): the template url or the local template file of
+            the stack. A local template is uploaded to the asset bucket.
+            parameters (list): the CloudFormation parameters of the stack.
+            output (str): the file path to write the stack outputs to.
+            timeout (int): the stack creation timeout in minutes.
+            depends_on (list): names of the stacks to deploy beforehand.
+            exports (list): names of the CloudFormation exports the stack
+            provides.
+            imports (list): names of the CloudFormation exports the stack
+            consumes via Fn::ImportValue.
+            assets (str): a directory of assets to upload to the asset bucket
+            along with the template.
+        """
+        self.stacks[stack_name] = {
+            'template': template,
+            'parameters': parameters or [],
+            'output': output,
+            'timeout': timeout,
+            'depends_on': set(depends_on or []),
+            'exports': set(exports or []),
+            'imports': set(imports or []),
+            'assets': assets
+        }
+
+    def dependencies(self) -> dict:
+        """
+        Return the dependencies of every stack
+
+        Notes:
+            Dependencies are the explicitly declared ones plus the ones derived
+            from exports/imports. An import which no stack in the deployment
+            exports is assumed to be provided by an existing stack.
+        """
+        exporters = {}
+        for stack_name, stack in self.stacks.items():
+            for export in stack['exports']:
+                if export in exporters:
+                    raise ValueError(
+                        f"Export {export} is declared by both {exporters[export]} and {stack_name}"
+                    )
+                exporters[export] = stack_name
+
+        deps = {}
+        for stack_name, stack in self.stacks.items():
+            deps[stack_name] = set(stack['depends_on'])
+            deps[stack_name].update(
+                exporters[name] for name in stack['imports'] if name in exporters
+            )
+            deps[stack_name].discard(stack_name)
+        return deps
+
+    def deploy(self, force: bool=False) -> dict:
+        """
+        Deploy all the stacks concurrently following their dependencies
+
+        Args:
+            force (bool): set to True to deploy the stacks which are unchanged
+            since their last successful deployment.
+
+        Returns:
+            the report of TaskGraph.run, with one task per stack.
+        """
+        graph = TaskGraph(max_workers=self.max_workers)
+        for stack_name, deps in self.dependencies().items():
+            stack = self.stacks[stack_name]
+            graph.add_task(
+                stack_name,
+                lambda stack_name=stack_name, stack=stack: self.cfn.create_update_stack(
+                    stack_name=stack_name,
+                    template=stack['template'],
+                    parameters=stack['parameters'],
+                    output=stack['output'],
+                    timeout=stack['timeout'],
+                    force=force,
+                    assets=stack['assets']
+                ),
+                depends_on=deps
+            )
+
+        report = graph.run()
+        for stack_name, result in report['tasks'].items():
+            print("{}: {} in {:.1f}s".format(stack_name, result['status'], result['elapsed']))
+        print("Critical path: {} ({:.1f}s in total)".format(
+            ' -> '.join(report['critical_path']), report['elapsed']))
+        return report
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import threading
+from dreamchaser.aws_cache import CACHE_DIR
+
+TERMINAL_STATUSES = {
+    'CREATE_COMPLETE', 'CREATE_FAILED',
+    'ROLLBACK_COMPLETE', 'ROLLBACK_FAILED',
+    'UPDATE_COMPLETE', 'UPDATE_FAILED',
+    'UPDATE_ROLLBACK_COMPLETE', 'UPDATE_ROLLBACK_FAILED',
+    'DELETE_COMPLETE', 'DELETE_FAILED',
+    'IMPORT_COMPLETE', 'IMPORT_ROLLBACK_COMPLETE', 'IMPORT_ROLLBACK_FAILED'
+}
+SUCCESS_STATUSES = {'CREATE_COMPLETE', 'UPDATE_COMPLETE', 'DELETE_COMPLETE', 'IMPORT_COMPLETE'}
+STACK_TYPE = 'AWS::CloudFormation::Stack'
+TIMING_LOG = os.path.join(CACHE_DIR, 'stack_timings.jsonl')
+
+
+class TimingLog():
+    def __init__(self, path: str=TIMING_LOG) -> None:
+        """
+        An append-only JSON Lines log of the time each resource operation took
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, records: list) -> None:
+        if not records:
+            return
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as flog:
+                for record in records:
+                    flog.write(json.dumps(record) + '\n')
+
+    def slowest(self, count: int=10, resource_type: str=None) -> list:
+        """
+        Return the slowest resource operations recorded
+        """
+        records = []
+        try:
+            with open(self.path) as flog:
+                for line in flog:
+                    record = json.loads(line)
+                    if not resource_type or record['ResourceType'] == resource_type:
+                        records.append(record)
+        except OSError:
+            return []
+        return sorted(records, key=lambda record: -record['Seconds'])[:count]
+
+
+class StackEventTailer():
+    def __init__(self, client, stack_name: str, min_delay: float=2, max_delay: float=20,
+                timing_log: TimingLog=None) -> None:
+        """
+        Tail the events of a stack and of its nested stacks
+
+        Notes:
+            Events are read incrementally via describe_stack_events, newest
+            first, down to the last event already seen. The poll interval is
+            reset to min_delay whenever new events arrive and doubles up to
+            max_delay otherwise. Nested stacks, e.g. DREAMCHASER-VPC-STACK-VPC,
+            are tailed as soon as their events show up in their parent stack.
+
+        Args:
+            client: the boto3 cloudformation client.
+            stack_name (str): the name of the stack to tail.
+            timing_log (TimingLog): the log to write the duration of each
+            resource operation to.
+        """
+        self.client = client
+        self.stack_name = stack_name
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.timing_log = timing_log
+        self.stack_id = None
+        self.last_event = {}
+        self.since = None
+        self.started = {}
+        self.status = None
+
+    def _events(self, stack_id: str):
+        # newest first
+        paginator = self.client.get_paginator('describe_stack_events')
+        for page in paginator.paginate(StackName=stack_id):
+            yield from page['StackEvents']
+
+    def mark(self) -> None:
+        """
+        Skip the events which already exist, e.g. before updating a stack
+        """
+        try:
+            for event in self._events(self.stack_name):
+                self.stack_id = event['StackId']
+                self.last_event[self.stack_id] = event['EventId']
+                break
+        except self.client.exceptions.ClientError:
+            pass
+
+    def _new_events(self, stack_id: str) -> list:
+        events = []
+        for event in self._events(stack_id):
+            if event['EventId'] == self.last_event.get(stack_id):
+                break
+            if self.since and stack_id != self.stack_id and event['Timestamp'] < self.since:
+                break
+            events.append(event)
+        events.reverse()
+        if events:
+            self.last_event[stack_id] = events[-1]['EventId']
+        return events
+
+    def _time(self, event: dict) -> dict:
+        key = (event['StackId'], event['LogicalResourceId'])
+        status = event['ResourceStatus']
+        if status.endswith('_IN_PROGRESS') and key not in self.started:
+            self.started[key] = event
+        elif not status.endswith('_IN_PROGRESS') and key in self.started:
+            start = self.started.pop(key)
+            return {
+                'StackName': event['StackName'],
+                'LogicalResourceId': event['LogicalResourceId'],
+                'ResourceType': event['ResourceType'],
+                'ResourceStatus': status,
+                'Started': start['Timestamp'].isoformat(),
+                'Seconds': (event['Timestamp'] - start['Timestamp']).total_seconds()
+            }
+        return None
+
+    def tail(self):
+        """
+        Yield the new events of the stack and its nested stacks, oldest first,
+        until the stack reaches a terminal status
+
+        Notes:
+            The terminal status of the stack is kept in the status attribute.
+        """
+        stacks = [self.stack_id or self.stack_name]
+        delay = self.min_delay
+        while True:
+            records = []
+            found = False
+            for stack_id in list(stacks):
+                for event in self._new_events(stack_id):
+                    found = True
+                    if self.stack_id is None or stack_id == self.stack_name:
+                        self.stack_id = event['StackId']
+                    if self.since is None:
+                        self.since = event['Timestamp']
+                    record = self._time(event)
+                    if record:
+                        records.append(record)
+                    yield event
+
+                    if event['ResourceType'] != STACK_TYPE:
+                        continue
+                    if event['PhysicalResourceId'] == self.stack_id:
+                        if event['ResourceStatus'] in TERMINAL_STATUSES:
+                            self.status = event['ResourceStatus']
+                            if self.timing_log:
+                                self.timing_log.write(records)
+                            return
+                    elif event['PhysicalResourceId'] and event['PhysicalResourceId'] not in stacks:
+                        stacks.append(event['PhysicalResourceId'])
+
+            if self.timing_log:
+                self.timing_log.write(records)
+            delay = self.min_delay if found else min(delay * 2, self.max_delay)
+            time.sleep(delay)
+
+    def wait(self, verbose: bool=True) -> str:
+        """
+        Tail the stack until it reaches a terminal status and return it
+        """
+        for event in self.tail():
+            if verbose:
+                print("{} {} {} {} {}".format(
+                    event['Timestamp'].strftime('%H:%M:%S'),
+                    event['StackName'],
+                    event['LogicalResourceId'],
+                    event['ResourceStatus'],
+                    event.get('ResourceStatusReason', '')
+                ).rstrip())
+        return self.status
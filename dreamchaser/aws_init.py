@@ -1,83 +1,374 @@
-import boto3
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from botocore.client import ClientError
+from dreamchaser.aws_cache import JsonCache, CACHE_DIR
+from dreamchaser.aws_client import get_client, get_account_id
+from dreamchaser.errors import (
+    OrganizationError, OrganizationalUnitError, OrganizationalUnitLookupError,
+    ParameterError, PolicyTypeError, ResourceSharingError
+)
+
+SSM_BATCH_SIZE = 10
+SSM_CACHE_TTL = int(os.getenv('DC_SSM_CACHE_TTL', '300'))
+# the node types of an organization, in the order lookups by name prefer them
+NODE_TYPES = ('ROOT', 'ORGANIZATIONAL_UNIT', 'ACCOUNT')
+
+class OrgIndex():
+    def __init__(self, client, max_workers: int=4) -> None:
+        """
+        A lazily built index of the roots, organizational units and accounts of
+        an AWS Organization
+
+        Notes:
+            The organization is walked once via paginated list calls, sibling
+            subtrees being listed concurrently. Afterwards, nodes are looked up
+            by id, by name, by path (e.g. '/Root/dreamchaser') or by parent and
+            name in O(1). An account and an organizational unit may share a
+            name under the same parent, hence paths and children are keyed by
+            node type and name.
+
+        Args:
+            client: the boto3 organizations client.
+            max_workers (int): the number of parents listed concurrently.
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.built = False
+            self.roots = []
+            self.nodes = {}
+            self.by_name = {}
+            self.by_path = {}
+            self.children = {}
+
+    def _pages(self, operation: str, key: str, **kwargs):
+        paginator = self.client.get_paginator(operation)
+        for page in paginator.paginate(**kwargs):
+            yield from page[key]
+
+    def add(self, item: dict, node_type: str, parent_id: str=None) -> dict:
+        with self.lock:
+            parent_path = self.nodes[parent_id]['Path'] if parent_id else ''
+            node = {
+                'Id': item['Id'],
+                'Arn': item['Arn'],
+                'Name': item['Name'],
+                'Type': node_type,
+                'ParentId': parent_id,
+                'Path': f"{parent_path}/{item['Name']}"
+            }
+            self.nodes[node['Id']] = node
+            self.by_name.setdefault(node['Name'], []).append(node['Id'])
+            self.by_path[(node_type, node['Path'])] = node['Id']
+            self.children.setdefault(node['Id'], {})
+            if parent_id:
+                self.children[parent_id][(node_type, node['Name'])] = node['Id']
+            else:
+                self.roots.append(node['Id'])
+            return node
+
+    def _list_children(self, parent_id: str) -> list:
+        nodes = [
+            self.add(ou, 'ORGANIZATIONAL_UNIT', parent_id) for ou in self._pages(
+                'list_organizational_units_for_parent', 'OrganizationalUnits', ParentId=parent_id
+            )
+        ]
+        nodes.extend(
+            self.add(account, 'ACCOUNT', parent_id) for account in self._pages(
+                'list_accounts_for_parent', 'Accounts', ParentId=parent_id
+            )
+        )
+        return nodes
+
+    def walk(self):
+        """
+        Walk the whole organization and yield each node as it is listed
+
+        Notes:
+            Only the children of the parents being listed are held in memory
+            by the walk itself, besides the index.
+        """
+        self.reset()
+        roots = [self.add(root, 'ROOT') for root in self._pages('list_roots', 'Roots')]
+        yield from roots
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {executor.submit(self._list_children, root['Id']) for root in roots}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for node in future.result():
+                        yield node
+                        if node['Type'] == 'ORGANIZATIONAL_UNIT':
+                            running.add(executor.submit(self._list_children, node['Id']))
+
+        self.built = True
+
+    def build(self) -> None:
+        with self.build_lock:
+            if not self.built:
+                for _ in self.walk():
+                    pass
+
+    def root_id(self) -> str:
+        self.build()
+        return self.roots[0]
+
+    def get(self, node_id: str) -> dict:
+        self.build()
+        return self.nodes.get(node_id)
+
+    def find(self, name: str, node_type: str=None) -> list:
+        self.build()
+        return [
+            self.nodes[node_id] for node_id in self.by_name.get(name, [])
+            if not node_type or self.nodes[node_id]['Type'] == node_type
+        ]
+
+    def _lookup(self, index: dict, name: str, node_type: str=None) -> dict:
+        for candidate in ([node_type] if node_type else NODE_TYPES):
+            node_id = index.get((candidate, name))
+            if node_id:
+                return self.nodes[node_id]
+        return None
+
+    def find_path(self, path: str, node_type: str=None) -> dict:
+        """
+        Return the node of a path, of the given type, or else the root or
+        organizational unit of the path before an account of the same path
+        """
+        self.build()
+        return self._lookup(self.by_path, path, node_type)
+
+    def child(self, parent_id: str, name: str, node_type: str=None) -> dict:
+        """
+        Return the child of a parent by name, of the given type, or else the
+        organizational unit before an account of the same name
+        """
+        self.build()
+        return self._lookup(self.children.get(parent_id, {}), name, node_type)
+
 
 class AWSOrg():
     def __init__(self, region_name: str, policy_type: str='SERVICE_CONTROL_POLICY',
                 org_unit: str='dreamchaser', **kwargs) -> None:
-        self.client = boto3.client('organizations', region_name = 'ap-southeast-2')
+        self.client = get_client('organizations', region_name, **kwargs)
         self.policy_type = policy_type
         self.org_unit = org_unit
-    
-    def create_org(self, feature_set: str='ALL'):
+        self.index = OrgIndex(self.client)
+        self._root_id = None
+
+    def root_id(self) -> str:
+        if not self._root_id:
+            if self.index.built:
+                self._root_id = self.index.root_id()
+            else:
+                self._root_id = self.client.list_roots()['Roots'][0]['Id']
+        return self._root_id
+
+    def create_organization(self, feature_set: str='ALL') -> None:
         try:
             self.client.create_organization(FeatureSet=feature_set)
         except ClientError as e:
             if e.response['Error']['Code'] != 'AlreadyInOrganizationException':
-                print(e.response['Error']['Message'], "Error Code:", e.response['Error']['Code'])
-                exit(127)
-        
+                raise OrganizationError.from_client_error(e) from e
+
+    def create_org(self, feature_set: str='ALL'):
+        self.create_organization(feature_set=feature_set)
         self.enable_policy(policy_type='SERVICE_CONTROL_POLICY')
         self.create_ou()
 
     def enable_policy(self, root_id: str=None, policy_type: str='SERVICE_CONTROL_POLICY') -> None:
         try:
             if not root_id:
-                root_id = self.client.list_roots()['Roots'][0]['Id']
+                root_id = self.root_id()
 
             self.client.enable_policy_type(RootId=root_id, PolicyType=policy_type)
         except ClientError as e:
             if e.response['Error']['Code'] != 'PolicyTypeAlreadyEnabledException':
-                print(e.response['Error']['Message'], "Error Code:", e.response['Error']['Code'])
-                exit(157)
+                raise PolicyTypeError.from_client_error(e) from e
 
     def create_ou(self, parent_id: str=None, org_unit: str=None) -> None:
         try:
             if not parent_id:
-                parent_id = self.client.list_roots()['Roots'][0]['Id']
+                parent_id = self.root_id()
 
-            self.client.create_organizational_unit(ParentId=parent_id, Name=(org_unit or self.org_unit))
+            res_ou = self.client.create_organizational_unit(ParentId=parent_id, Name=(org_unit or self.org_unit))
+            if self.index.built:
+                self.index.add(res_ou['OrganizationalUnit'], 'ORGANIZATIONAL_UNIT', parent_id)
         except ClientError as e:
             if e.response['Error']['Code'] != 'DuplicateOrganizationalUnitException':
-                print(e.response['Error']['Message'], "Error Code:", e.response['Error']['Code'])
-                exit(137)
+                raise OrganizationalUnitError.from_client_error(e) from e
 
     def get_ou_arn(self, parent_id: str=None, org_unit: str=None) -> str:
         try:
             if not parent_id:
-                    parent_id = self.client.list_roots()['Roots'][0]['Id']
-            res_list_ou = self.client.list_organizational_units_for_parent(ParentId=parent_id)
-            
-            for ou in res_list_ou['OrganizationalUnits']:
-                if ou['Name'] == (org_unit or self.org_unit):
-                    return ou['Arn']
+                parent_id = self.root_id()
+            ou = self.index.child(parent_id, org_unit or self.org_unit, 'ORGANIZATIONAL_UNIT')
+            if ou:
+                return ou['Arn']
 
         except ClientError as e:
-            print(e.response['Error']['Message'], "Error Code:", e.response['Error']['Code'])
-            exit(177)
+            raise OrganizationalUnitLookupError.from_client_error(e) from e
 
 
 class AWSRam():
     def __init__(self, region_name: str='ap-southeast-2', **kwargs) -> None:
-        self.client = boto3.client('ram', region_name = 'ap-southeast-2')
+        self.client = get_client('ram', region_name, **kwargs)
 
     def enable_resource_sharing(self):
-        self.client.enable_sharing_with_aws_organization()
+        try:
+            self.client.enable_sharing_with_aws_organization()
+        except ClientError as e:
+            raise ResourceSharingError.from_client_error(e) from e
 
 
 class AWSSsm():
-    def __init__(self, region_name: str='ap-southeast-2', **kwargs) -> None:
-        self.client = boto3.client('ssm', region_name = 'ap-southeast-2')
+    def __init__(self, region_name: str='ap-southeast-2', ttl: int=SSM_CACHE_TTL,
+                cache_path: str=None, cache: JsonCache=None, **kwargs) -> None:
+        """
+        An SSM parameter store client with a local cache of the values
+
+        Notes:
+            The cache file is shared by every account and region, hence the
+            values are cached by account, region and name. The account is
+            resolved on first use, see get_account_id.
+
+        Args:
+            cache (JsonCache): the cache to share with other clients, e.g. of
+            other accounts, defaults to the one at cache_path.
+        """
+        self.client = get_client('ssm', region_name, **kwargs)
+        self.region_name = region_name
+        self.credentials = kwargs
+        self.ttl = ttl
+        self.cache = cache or JsonCache(cache_path or os.path.join(CACHE_DIR, 'ssm_cache.json'))
+        self.prefix = None
+
+    def _key(self, name: str) -> str:
+        if self.prefix is None:
+            try:
+                account_id = get_account_id(self.region_name, **self.credentials)
+            except ClientError as e:
+                raise ParameterError.from_client_error(e) from e
+            self.prefix = f"{account_id}:{self.region_name}:"
+        return self.prefix + name
+
+    def _cached(self, key: str):
+        entry = self.cache.get(key)
+        if entry and entry['expires'] > time.time():
+            return entry
+        return None
 
     def get_para(self, name: str):
+        values = self.get_paras(names=[name])
+        if name not in values:
+            raise ParameterError(f"Parameter not found: {name}", error_code='ParameterNotFound')
+        return values[name]
+
+    def get_paras(self, names: list) -> dict:
+        """
+        Get the values of many parameters
+
+        Notes:
+            Values are served from the local cache until their TTL expires.
+            The others are read via GetParameters in batches of 10 names.
+            Parameters which do not exist are left out of the result.
+        """
+        values = {}
+        missing = []
+        for name in dict.fromkeys(names):
+            entry = self._cached(self._key(name))
+            if entry:
+                values[name] = entry['value']
+            else:
+                missing.append(name)
+
+        entries = {}
+        expires = time.time() + self.ttl
         try:
-            return self.client.get_parameter(Name=name, WithDecryption=False)['Parameter']['Value']
+            for i in range(0, len(missing), SSM_BATCH_SIZE):
+                res = self.client.get_parameters(
+                    Names=missing[i:i + SSM_BATCH_SIZE], WithDecryption=False
+                )
+                for para in res['Parameters']:
+                    values[para['Name']] = para['Value']
+                    entries[self._key(para['Name'])] = {'value': para['Value'], 'expires': expires}
         except ClientError as e:
-            print(e.response['Error']['Message'], "Error Code:", e.response['Error']['Code'])
-            exit(197)
+            raise ParameterError.from_client_error(e) from e
+
+        if entries:
+            self.cache.update(entries)
+        return values
+
+    def get_paras_by_path(self, path: str, recursive: bool=True) -> dict:
+        """
+        Get the values of every parameter under a path, e.g. '/dreamchaser/'
+        """
+        path_key = self._key(f"path:{path}:{recursive}")
+        entry = self._cached(path_key)
+        if entry:
+            values = {}
+            for name in entry['value']:
+                para = self._cached(self._key(name))
+                if not para:
+                    break
+                values[name] = para['value']
+            else:
+                return values
+
+        values = {}
+        expires = time.time() + self.ttl
+        try:
+            paginator = self.client.get_paginator('get_parameters_by_path')
+            for page in paginator.paginate(Path=path, Recursive=recursive, WithDecryption=False):
+                for para in page['Parameters']:
+                    values[para['Name']] = para['Value']
+        except ClientError as e:
+            raise ParameterError.from_client_error(e) from e
+
+        entries = {
+            self._key(name): {'value': value, 'expires': expires}
+            for name, value in values.items()
+        }
+        entries[path_key] = {'value': list(values), 'expires': expires}
+        self.cache.update(entries)
+        return values
+
+    def invalidate(self, names: list=None) -> None:
+        """
+        Drop the given parameters, or every cached parameter of the account
+        and region, from the cache
+        """
+        if names is None:
+            prefix = self._key('')
+            keys = lambda data: [key for key in data if key.startswith(prefix)]
+        else:
+            keys = lambda data: [self._key(name) for name in names]
+
+        def drop(data):
+            for key in keys(data):
+                data.pop(key, None)
+        self.cache.modify(drop)
 
     def put_str_para(self, name: str, value: str):
         try:
             self.client.put_parameter(Name=name, Value=value, Type='String', Overwrite=True)
         except ClientError as e:
-            print(e.response['Error']['Message'], "Error Code:", e.response['Error']['Code'])
-            exit(197)
\ No newline at end of file
+            raise ParameterError.from_client_error(e) from e
+        self.cache.put(self._key(name), {'value': value, 'expires': time.time() + self.ttl})
+
+    def delete_para(self, name: str):
+        try:
+            self.client.delete_parameter(Name=name)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ParameterNotFound':
+                raise ParameterError.from_client_error(e) from e
+        self.cache.delete(self._key(name))
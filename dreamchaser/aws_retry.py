@@ -0,0 +1,194 @@
+import os
+import time
+import random
+import threading
+from dreamchaser.errors import THROTTLING_CODES
+
+RATE_LIMIT = float(os.getenv('DC_RATE_LIMIT', '20'))
+MAX_ATTEMPTS = int(os.getenv('DC_RETRY_MAX_ATTEMPTS', '8'))
+RETRY_BUDGET = int(os.getenv('DC_RETRY_BUDGET', '500'))
+
+TRANSIENT_CODES = {
+    'RequestTimeout', 'RequestTimeoutException', 'PriorRequestNotComplete',
+    'InternalError', 'InternalFailure', 'ServiceUnavailable'
+}
+TRANSIENT_STATUS_CODES = {500, 502, 503, 504}
+
+
+class TokenBucket():
+    def __init__(self, rate: float=RATE_LIMIT, min_rate: float=0.5, max_rate: float=None,
+                increase: float=0.2, decrease: float=0.5) -> None:
+        """
+        A token bucket whose rate adapts to throttling (AIMD)
+
+        Notes:
+            Each request takes a token, and waits for one when the bucket is
+            empty. The rate grows by increase per successful request up to
+            max_rate, and is multiplied by decrease when a request is
+            throttled, at most once per refill interval so that a burst of
+            throttled responses to concurrent requests counts once.
+
+        Args:
+            rate (float): the initial number of requests per second.
+            min_rate (float): the floor of the rate.
+            max_rate (float): the ceiling of the rate, defaults to 5 times the
+            initial rate.
+        """
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 5
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = 1.0
+        self.refilled = time.monotonic()
+        self.decreased = 0.0
+        self.stats = {'requests': 0, 'throttled': 0, 'waited': 0.0}
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def acquire(self) -> float:
+        """
+        Take a token, waiting until one is available, and return the wait
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.stats['requests'] += 1
+                    self.stats['waited'] += waited
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self) -> None:
+        with self.lock:
+            self.stats['throttled'] += 1
+            now = time.monotonic()
+            if now - self.decreased >= 1 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.tokens = min(self.tokens, 0.0)
+                self.decreased = now
+
+    def succeeded(self) -> None:
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class RetryBudget():
+    def __init__(self, capacity: int=RETRY_BUDGET, retry_cost: int=5, timeout_cost: int=10,
+                refund: int=1) -> None:
+        """
+        A budget of retries shared by every client
+
+        Notes:
+            Each retry withdraws its cost and each successful request refunds
+            a little, hence retries stop when most requests fail, e.g. during
+            an outage, instead of multiplying the load.
+        """
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.available = capacity
+        self.retry_cost = retry_cost
+        self.timeout_cost = timeout_cost
+        self.refund = refund
+
+    def withdraw(self, timeout: bool=False) -> bool:
+        cost = self.timeout_cost if timeout else self.retry_cost
+        with self.lock:
+            if self.available < cost:
+                return False
+            self.available -= cost
+            return True
+
+    def deposit(self) -> None:
+        with self.lock:
+            self.available = min(self.capacity, self.available + self.refund)
+
+
+class RetryPolicy():
+    def __init__(self, rate: float=RATE_LIMIT, max_attempts: int=MAX_ATTEMPTS,
+                base_delay: float=0.2, max_delay: float=20, budget: RetryBudget=None) -> None:
+        """
+        The rate limiting and retry policy of every AWS client
+
+        Notes:
+            Requests are rate limited by one TokenBucket per service and region,
+            shared by the clients of every profile and role since AWS throttles
+            per account, service and region and most runs use one account at a
+            time. Throttled, transient and connection errors are retried up
+            to max_attempts with full jitter exponential backoff, as long as
+            the shared RetryBudget allows it. The built-in botocore retries are
+            disabled on the clients this policy is attached to.
+
+        Args:
+            rate (float): the initial requests per second of each bucket.
+            max_attempts (int): the maximum attempts of a request, including
+            the first one.
+            base_delay (float): the backoff delay of the first retry in
+            seconds.
+            max_delay (float): the maximum backoff delay in seconds.
+        """
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.buckets = {}
+
+    def bucket(self, service_name: str, region_name: str) -> TokenBucket:
+        key = (service_name, region_name)
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(rate=self.rate)
+            return self.buckets[key]
+
+    def delay(self, attempts: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def attach(self, client) -> None:
+        """
+        Rate limit and retry the requests of a boto3 client
+        """
+        service_name = client.meta.service_model.service_name
+        service_id = client.meta.service_model.service_id.hyphenize()
+        bucket = self.bucket(service_name, client.meta.region_name)
+
+        def _acquire(**kwargs):
+            bucket.acquire()
+
+        def _needs_retry(response=None, attempts=1, caught_exception=None, **kwargs):
+            if caught_exception is not None:
+                retryable, timeout = True, True
+            else:
+                status_code = response[0].status_code
+                error_code = response[1].get('Error', {}).get('Code')
+                if error_code in THROTTLING_CODES:
+                    bucket.throttled()
+                    retryable, timeout = True, False
+                elif status_code < 300:
+                    bucket.succeeded()
+                    self.budget.deposit()
+                    return None
+                else:
+                    retryable = error_code in TRANSIENT_CODES or status_code in TRANSIENT_STATUS_CODES
+                    timeout = False
+            if retryable and attempts < self.max_attempts and self.budget.withdraw(timeout):
+                return self.delay(attempts)
+            return None
+
+        client.meta.events.register(f"before-send.{service_id}", _acquire)
+        client.meta.events.register(f"needs-retry.{service_id}", _needs_retry)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                f"{service_name}:{region_name}": dict(bucket.stats, rate=bucket.rate)
+                for (service_name, region_name), bucket in self.buckets.items()
+            }
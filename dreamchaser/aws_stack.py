@@ -1,31 +1,116 @@
+import os
 import sys
-import boto3
 import json
 from botocore.client import ClientError
+from dreamchaser.aws_cache import DeployCache, JsonCache
+from dreamchaser.aws_client import get_client, get_account_id
+from dreamchaser.aws_events import StackEventTailer, TimingLog, SUCCESS_STATUSES
+from dreamchaser.errors import DreamChaserError, StackError
+
+CAPABILITIES = [
+    'CAPABILITY_NAMED_IAM',
+    'CAPABILITY_AUTO_EXPAND'
+]
 
 class CfnStack():
-    def __init__(self, region_name: str, **kwargs) -> None:
-        self.client = boto3.client('cloudformation', region_name = 'ap-southeast-2')
+    def __init__(self, region_name: str, deploy_cache: DeployCache=None, timing_log: TimingLog=None,
+                    asset_bucket: str=None, uploader=None, **kwargs) -> None:
+        self.client = get_client('cloudformation', region_name, **kwargs)
+        self.region_name = region_name
+        self.credentials = kwargs
+        self.deploy_cache = deploy_cache or DeployCache()
+        self.timing_log = timing_log or TimingLog()
+        self.outputs = {}
+        self.uploader = uploader
+        if asset_bucket and not uploader:
+            from dreamchaser.aws_upload import AssetUploader
+            self.uploader = AssetUploader(asset_bucket, region_name, **kwargs)
+
+    @property
+    def account_id(self) -> str:
+        return get_account_id(self.region_name, **self.credentials)
+
+    @staticmethod
+    def _output_map(stack: dict) -> dict:
+        return {output['OutputKey']: output['OutputValue'] for output in stack.get('Outputs', [])}
 
     def describe_stack(self, stack_name: str=None):
-        cfn_outputs = self.client.describe_stacks(StackName = stack_name)['Stacks'][0]['Outputs']
-        output_len = len(cfn_outputs)
-        i=0
-        output_map = {}
-        while i<output_len:
-            output_map[cfn_outputs[i]['OutputKey']]  = cfn_outputs[i]['OutputValue']
-            i = i + 1
+        output_map = self._output_map(self.client.describe_stacks(StackName = stack_name)['Stacks'][0])
+        self.outputs[stack_name] = output_map
         return output_map
 
+    def describe_stacks(self, prefix: str=None):
+        """
+        Yield the name and the outputs of every stack, or of the stacks whose
+        name starts with prefix, via paginated describe_stacks calls
+        """
+        listed = set()
+        paginator = self.client.get_paginator('describe_stacks')
+        for page in paginator.paginate():
+            for stack in page['Stacks']:
+                if prefix and not stack['StackName'].startswith(prefix):
+                    continue
+                output_map = self._output_map(stack)
+                self.outputs[stack['StackName']] = output_map
+                listed.add(stack['StackName'])
+                yield stack['StackName'], output_map
+
+        for stack_name in list(self.outputs):
+            if stack_name.startswith(prefix or '') and stack_name not in listed:
+                del self.outputs[stack_name]
+
+    def get_output(self, stack_name: str, output_key: str=None):
+        """
+        Return an output, or all the outputs, of a stack
+
+        Notes:
+            Outputs are served from the in-memory index filled by
+            describe_stack and describe_stacks, and only described on a miss.
+        """
+        if stack_name not in self.outputs:
+            self.describe_stack(stack_name=stack_name)
+        if output_key is None:
+            return self.outputs[stack_name]
+        return self.outputs[stack_name].get(output_key)
+
+    def export_outputs(self, path: str, prefix: str=None) -> dict:
+        """
+        Export the outputs of every stack, or of the stacks matching prefix,
+        into one JSON map keyed by region and stack name
+
+        Notes:
+            Only the entries which changed are rewritten, and the entries of
+            the stacks which no longer exist are removed.
+
+        Returns:
+            the number of exported, changed and removed stacks.
+        """
+        cache = JsonCache(path)
+        current = cache.load()
+        key_prefix = f"{self.region_name}:"
+        exported = {
+            f"{key_prefix}{stack_name}": output_map
+            for stack_name, output_map in self.describe_stacks(prefix=prefix)
+        }
+        changed = {key: value for key, value in exported.items() if current.get(key) != value}
+        removed = [
+            key for key in current
+            if key.startswith(key_prefix + (prefix or '')) and key not in exported
+        ]
+        if changed or removed:
+            def apply(data):
+                data.update(changed)
+                for key in removed:
+                    data.pop(key, None)
+            cache.modify(apply)
+        return {'stacks': len(exported), 'changed': len(changed), 'removed': len(removed)}
+
     def update_stack(self, stack_name: str=None, template: str=None, parameters: list=None):
         stack_response = self.client.update_stack(
             StackName = stack_name,
             TemplateURL = template,
             Parameters = parameters,
-            Capabilities = [
-                'CAPABILITY_NAMED_IAM',
-                'CAPABILITY_AUTO_EXPAND'
-            ]
+            Capabilities = CAPABILITIES
         )
 
     def create_stack(self, stack_name: str=None, template: str=None, parameters: list=None, timeout=30):
@@ -34,50 +119,239 @@ class CfnStack():
         TemplateURL = template,
         Parameters = parameters,
         TimeoutInMinutes=timeout,
-        Capabilities=[
-            'CAPABILITY_NAMED_IAM',
-            'CAPABILITY_AUTO_EXPAND'
-        ],
+        Capabilities=CAPABILITIES,
         OnFailure='ROLLBACK',
         EnableTerminationProtection = True
         )
 
-    def write_output(self, stack_name: str=None, output=None):
-        cfn_outputs = self.describe_stack(stack_name=stack_name)
+    def delete_stack(self, stack_name: str, disable_protection: bool=False) -> str:
+        """
+        Delete a stack, and its nested stacks, and wait for the deletion
+
+        Args:
+            stack_name (str): the name or the id of the stack.
+            disable_protection (bool): set to True to turn off the termination
+            protection of the stack beforehand.
+        """
+        tailer = self.tailer(stack_name)
+        if not tailer.stack_id:
+            print("Stack does not exist, nothing to delete: " + stack_name)
+            return 'DELETE_COMPLETE'
+        try:
+            if disable_protection:
+                self.client.update_termination_protection(
+                    EnableTerminationProtection=False, StackName=stack_name
+                )
+            self.client.delete_stack(StackName=tailer.stack_id)
+        except ClientError as e:
+            raise StackError.from_client_error(e) from e
+        status = self.wait_stack(tailer)
+        self.outputs.pop(stack_name, None)
+        print("Deleted stack: " + stack_name)
+        return status
+
+    def asset_keys(self, template: str=None, assets: str=None):
+        """
+        Hash a local template and the files of an asset directory, without
+        uploading them
+
+        Returns:
+            the template url and the object key of every asset, by path
+            relative to the asset directory, as upload would return them.
+        """
+        if not self.uploader:
+            raise StackError("An asset bucket is required to upload a local template or assets")
+        asset_keys = self.uploader.dir_keys(assets) if assets else {}
+        if template and os.path.isfile(template):
+            template = self.uploader.url(self.uploader.keys([template])[template])
+        return template, asset_keys
+
+    def upload(self, template: str=None, assets: str=None):
+        """
+        Upload a local template and the files of an asset directory under
+        their content hash
+
+        Returns:
+            the template url and the object key of every asset, by path
+            relative to the asset directory.
+        """
+        if not self.uploader:
+            raise StackError("An asset bucket is required to upload a local template or assets")
+        asset_keys = self.uploader.upload_dir(assets) if assets else {}
+        if template and os.path.isfile(template):
+            template = self.uploader.url(self.uploader.upload([template])[template])
+        return template, asset_keys
+
+    def template_version(self, template: str) -> str:
+        """
+        Return the ETag of a template url, or None when its url identifies
+        its content, i.e. for a local template or a content-addressed url
+
+        Notes:
+            The ETag is read via a HeadObject request, the body is never
+            fetched.
+
+        Raises:
+            StackError: when the template cannot be read from S3.
+        """
+        from dreamchaser.aws_upload import parse_s3_url, is_content_addressed
+
+        if not template or os.path.isfile(template) or is_content_addressed(template):
+            return None
+        bucket, key = parse_s3_url(template)
+        s3 = get_client('s3', self.region_name, **self.credentials)
+        try:
+            return s3.head_object(Bucket=bucket, Key=key)['ETag']
+        except ClientError as e:
+            raise StackError.from_client_error(e) from e
+
+    def tailer(self, stack_name: str) -> StackEventTailer:
+        """
+        Return an event tailer of the stack which skips its past events
+        """
+        tailer = StackEventTailer(self.client, stack_name, timing_log=self.timing_log)
+        tailer.mark()
+        return tailer
+
+    def wait_stack(self, tailer: StackEventTailer) -> str:
+        """
+        Stream the stack events until the stack reaches a terminal status
+        """
+        status = tailer.wait()
+        if status not in SUCCESS_STATUSES:
+            raise StackError("Stack {} ended in {}".format(tailer.stack_name, status))
+        return status
+
+    def write_output(self, stack_name: str=None, output=None, refresh: bool=True):
+        if refresh:
+            cfn_outputs = self.describe_stack(stack_name=stack_name)
+        else:
+            cfn_outputs = self.get_output(stack_name=stack_name)
         with open(output, 'w+') as foutput:
             json.dump(cfn_outputs, foutput, indent = 4)
 
-    def create_update_stack(self, stack_name: str=None, template=None, parameters=None, output=None, timeout=30):
+    def create_update_stack(self, stack_name: str=None, template=None, parameters=None, output=None,
+                            timeout=30, force: bool=False, assets: str=None):
+        """
+        Create or update a stack, unless it is unchanged since its last
+        successful deployment
+
+        Notes:
+            A local template and the assets are hashed locally, and are only
+            uploaded when the stack is deployed. Skipping an unchanged stack
+            makes no CloudFormation request and no upload. It still costs a
+            HeadObject request for a template url which is not
+            content-addressed, see template_version, and a GetCallerIdentity
+            request once per process when the credentials are not those of a
+            role, see get_account_id.
+        """
+        local_template = template
+        asset_keys = None
+        has_uploads = bool(assets or (template and os.path.isfile(template)))
+        if has_uploads:
+            template, asset_keys = self.asset_keys(template=template, assets=assets)
+        digest = DeployCache.digest(template, parameters, CAPABILITIES, assets=asset_keys,
+                                    template_version=self.template_version(template))
+        if (not force and (not output or os.path.exists(output))
+                and self.deploy_cache.is_current(self.account_id, self.region_name, stack_name, digest)):
+            print("Unchanged since last deployment, skipping stack: " + stack_name)
+            return 0
+        if has_uploads:
+            self.upload(template=local_template, assets=assets)
+
         try:
             self.describe_stack(stack_name=stack_name)
-            try:
-                print("Updating stack: " + stack_name)
-                self.update_stack(stack_name=stack_name, template=template, parameters=parameters)
-                stack_waiter = self.client.get_waiter('stack_update_complete')
-                stack_waiter.wait(StackName=stack_name)
-                if output:
-                    print("Config ouput written to: {}".format(output))
-                    self.write_output(stack_name=stack_name, output=output)
-                print("Successfully updated stack: " + stack_name)
-                return 0
-            except ClientError as e:
-                error_code = int(e.response['ResponseMetadata']['HTTPStatusCode'])
-                if error_code == 400:
-                    print("Nothing to be updated on stack: " + stack_name)
-                    return 0
-                print("Error Occured.")
-                sys.exit(error_code)
         except ClientError as e:
             error_code = int(e.response['ResponseMetadata']['HTTPStatusCode'])
             if error_code == 403:
-                sys.exit("Private Cloudformation stack. Access denied!")
-            elif error_code == 400:
+                raise StackError("Private Cloudformation stack. Access denied!",
+                                error_code=e.response['Error']['Code']) from e
+            elif error_code == 400 and 'does not exist' in e.response['Error']['Message']:
                 print("Stack does not exist! Creating stack: " + stack_name)
-                self.create_stack(stack_name=stack_name, template=template, parameters=parameters, timeout=timeout)
-                stack_waiter = self.client.get_waiter('stack_create_complete')
-                stack_waiter.wait(StackName=stack_name)
+                tailer = self.tailer(stack_name)
+                try:
+                    self.create_stack(stack_name=stack_name, template=template, parameters=parameters, timeout=timeout)
+                except ClientError as create_error:
+                    raise StackError.from_client_error(
+                        create_error,
+                        exit_code=int(create_error.response['ResponseMetadata']['HTTPStatusCode'])
+                    ) from create_error
+                self.wait_stack(tailer)
                 if output:
                     print("Config ouput written to: {}".format(output))
                     self.write_output(stack_name=stack_name, output=output)
+                self.deploy_cache.record(self.account_id, self.region_name, stack_name, digest)
                 print("Created new stack: " + stack_name)
                 return 0
+            raise StackError.from_client_error(e, exit_code=error_code) from e
+
+        try:
+            print("Updating stack: " + stack_name)
+            tailer = self.tailer(stack_name)
+            self.update_stack(stack_name=stack_name, template=template, parameters=parameters)
+            self.wait_stack(tailer)
+            if output:
+                print("Config ouput written to: {}".format(output))
+                self.write_output(stack_name=stack_name, output=output)
+            self.deploy_cache.record(self.account_id, self.region_name, stack_name, digest)
+            print("Successfully updated stack: " + stack_name)
+            return 0
+        except ClientError as e:
+            error_code = int(e.response['ResponseMetadata']['HTTPStatusCode'])
+            if error_code == 400 and 'No updates are to be performed' in e.response['Error']['Message']:
+                if output:
+                    self.write_output(stack_name=stack_name, output=output, refresh=False)
+                self.deploy_cache.record(self.account_id, self.region_name, stack_name, digest)
+                print("Nothing to be updated on stack: " + stack_name)
+                return 0
+            raise StackError.from_client_error(e, exit_code=error_code) from e
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Create or update a CloudFormation stack')
+    parser.add_argument('--region', default='ap-southeast-2')
+    parser.add_argument('--stack-name')
+    parser.add_argument('--template', help='the template url or the local template file of the stack')
+    parser.add_argument('--assets', help='a directory of assets to upload along with the template')
+    parser.add_argument('--asset-bucket', help='the S3 bucket to upload a local template and assets to')
+    parser.add_argument('--parameters', help='a JSON file with the CloudFormation parameters')
+    parser.add_argument('--output', help='the file to write the stack outputs to')
+    parser.add_argument('--force', action='store_true',
+                        help='deploy even when nothing changed since the last deployment')
+    parser.add_argument('--invalidate', action='store_true',
+                        help='forget the last deployment of the stack and exit')
+    parser.add_argument('--export-outputs', metavar='PATH',
+                        help='export the outputs of every stack into one JSON file and exit')
+    parser.add_argument('--prefix', help='only export the stacks whose name starts with prefix')
+    args = parser.parse_args()
+
+    if args.export_outputs:
+        stats = CfnStack(args.region).export_outputs(args.export_outputs, prefix=args.prefix)
+        print("Exported {stacks} stacks, {changed} changed, {removed} removed".format(**stats))
+        sys.exit(0)
+    if not args.stack_name:
+        parser.error('--stack-name is required')
+
+    if args.invalidate:
+        DeployCache().invalidate(account_id=get_account_id(args.region), region_name=args.region,
+                                    stack_name=args.stack_name)
+        sys.exit(0)
+
+    parameters = []
+    if args.parameters:
+        with open(args.parameters) as fparameters:
+            parameters = json.load(fparameters)
+    try:
+        sys.exit(CfnStack(args.region, asset_bucket=args.asset_bucket).create_update_stack(
+            stack_name=args.stack_name,
+            template=args.template,
+            parameters=parameters,
+            output=args.output,
+            force=args.force,
+            assets=args.assets
+        ))
+    except DreamChaserError as e:
+        print(e)
+        sys.exit(e.exit_code)
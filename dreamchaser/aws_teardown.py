@@ -0,0 +1,202 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dreamchaser.aws_client import get_client
+from dreamchaser.aws_deploy import TaskGraph
+from dreamchaser.aws_stack import CfnStack
+from dreamchaser.errors import DreamChaserError, StackError
+
+TEARDOWN_TAG = 'dreamchaser:teardown'
+STACK_TYPE = 'AWS::CloudFormation::Stack'
+
+
+class Teardown():
+    def __init__(self, region_name: str, prefix: str, max_workers: int=4,
+                opt_in_tag: str=TEARDOWN_TAG, **kwargs) -> None:
+        """
+        Delete the stacks of an environment in reverse dependency order
+
+        Notes:
+            The environment is every root stack whose name starts with prefix,
+            along with its nested stacks, e.g. DREAMCHASER-VPC-STACK-VPC, which
+            are deleted with their root stack. A stack is deleted after the
+            stacks which import one of its exports, or which attach a VPC to
+            one of its transit gateways. Stacks which do not depend on each
+            other are deleted concurrently, and each deletion completes as
+            soon as the event tailer sees its terminal status.
+
+            Termination protection is only turned off on the stacks tagged
+            with opt_in_tag set to 'true'. The deletion of any other protected
+            stack fails, and the stacks it depends on are kept.
+
+        Args:
+            region_name (str): the AWS region of the stacks.
+            prefix (str): the name prefix of the stacks of the environment.
+            max_workers (int): the number of stacks deleted concurrently.
+            opt_in_tag (str): the tag opting a stack in to teardown.
+        """
+        self.cfn = CfnStack(region_name, **kwargs)
+        self.ec2 = get_client('ec2', region_name, **kwargs)
+        self.prefix = prefix
+        self.max_workers = max_workers
+        self.opt_in_tag = opt_in_tag
+        self.stacks = {}
+        self.roots = {}
+
+    def _resources(self, stack_id: str) -> list:
+        resources = []
+        paginator = self.cfn.client.get_paginator('list_stack_resources')
+        for page in paginator.paginate(StackName=stack_id):
+            resources.extend(page['StackResourceSummaries'])
+        return resources
+
+    def discover(self) -> dict:
+        """
+        Find the root stacks of the environment and their nested stacks
+
+        Returns:
+            the root stacks by name.
+        """
+        self.stacks = {}
+        self.roots = {}
+        paginator = self.cfn.client.get_paginator('describe_stacks')
+        for page in paginator.paginate():
+            for stack in page['Stacks']:
+                if stack['StackName'].startswith(self.prefix) and not stack.get('ParentId'):
+                    self.stacks[stack['StackName']] = stack
+                    self.roots[stack['StackId']] = stack['StackName']
+
+        pending = list(self.roots)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending:
+                batch, pending = pending, []
+                for stack_id, resources in zip(batch, executor.map(self._resources, batch)):
+                    root = self.stacks[self.roots[stack_id]]
+                    root.setdefault('Resources', []).extend(resources)
+                    for resource in resources:
+                        if resource['ResourceType'] == STACK_TYPE and resource.get('PhysicalResourceId'):
+                            self.roots[resource['PhysicalResourceId']] = root['StackName']
+                            pending.append(resource['PhysicalResourceId'])
+        return self.stacks
+
+    def _owners(self, resource_type: str) -> dict:
+        return {
+            resource['PhysicalResourceId']: stack_name
+            for stack_name, stack in self.stacks.items()
+            for resource in stack.get('Resources', [])
+            if resource['ResourceType'] == resource_type and resource.get('PhysicalResourceId')
+        }
+
+    def dependencies(self) -> dict:
+        """
+        Return the stacks which have to be deleted before each stack
+
+        Notes:
+            Dependencies are derived from the exports of the stacks and their
+            imports, and from the transit gateway attachments of the stacks to
+            the transit gateways of other stacks.
+        """
+        deps = {stack_name: set() for stack_name in self.stacks}
+
+        paginator = self.cfn.client.get_paginator('list_exports')
+        exports = [
+            export for page in paginator.paginate() for export in page['Exports']
+            if export['ExportingStackId'] in self.roots
+        ]
+        for export in exports:
+            exporter = self.roots[export['ExportingStackId']]
+            try:
+                importers = [
+                    name for page in self.cfn.client.get_paginator('list_imports').paginate(
+                        ExportName=export['Name']
+                    ) for name in page['Imports']
+                ]
+            except self.cfn.client.exceptions.ClientError as e:
+                if 'is not imported by any stack' not in e.response['Error']['Message']:
+                    raise
+                importers = []
+            for importer in importers:
+                importer = importer if importer in self.stacks else self._root_of(importer)
+                if importer and importer != exporter:
+                    deps[exporter].add(importer)
+
+        tgw_owners = self._owners('AWS::EC2::TransitGateway')
+        attachments = self._owners('AWS::EC2::TransitGatewayAttachment')
+        if tgw_owners and attachments:
+            paginator = self.ec2.get_paginator('describe_transit_gateway_attachments')
+            for page in paginator.paginate(TransitGatewayAttachmentIds=list(attachments)):
+                for attachment in page['TransitGatewayAttachments']:
+                    owner = tgw_owners.get(attachment['TransitGatewayId'])
+                    attacher = attachments[attachment['TransitGatewayAttachmentId']]
+                    if owner and owner != attacher:
+                        deps[owner].add(attacher)
+        return deps
+
+    def _root_of(self, stack_name: str) -> str:
+        # imports are listed by stack name, nested stacks are keyed by id
+        for stack_id, root in self.roots.items():
+            if stack_id.split('/')[1:2] == [stack_name]:
+                return root
+        return None
+
+    def opted_in(self, stack_name: str) -> bool:
+        return any(
+            tag['Key'] == self.opt_in_tag and tag['Value'].lower() == 'true'
+            for tag in self.stacks[stack_name].get('Tags', [])
+        )
+
+    def _delete(self, stack_name: str) -> str:
+        stack = self.stacks[stack_name]
+        opted_in = self.opted_in(stack_name)
+        if stack.get('EnableTerminationProtection') and not opted_in:
+            raise StackError(
+                f"Stack {stack_name} is protected and not tagged {self.opt_in_tag}=true"
+            )
+        return self.cfn.delete_stack(stack_name, disable_protection=opted_in)
+
+    def run(self, dry_run: bool=False) -> dict:
+        """
+        Delete the stacks of the environment
+
+        Args:
+            dry_run (bool): set to True to only return the deletion order.
+
+        Returns:
+            the report of TaskGraph.run, with one task per root stack, or the
+            deletion order on a dry run.
+        """
+        self.discover()
+        graph = TaskGraph(max_workers=self.max_workers)
+        for stack_name, deps in self.dependencies().items():
+            graph.add_task(stack_name, lambda stack_name=stack_name: self._delete(stack_name),
+                            depends_on=deps)
+        if dry_run:
+            return {'order': graph.order()}
+
+        report = graph.run()
+        for stack_name, result in report['tasks'].items():
+            print("{}: {} in {:.1f}s{}".format(
+                stack_name, result['status'], result['elapsed'],
+                f" ({result['error']})" if result['error'] else ''
+            ))
+        return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Delete the stacks of an environment')
+    parser.add_argument('--region', default='ap-southeast-2')
+    parser.add_argument('--prefix', required=True, help='the name prefix of the stacks')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--dry-run', action='store_true', help='only print the deletion order')
+    args = parser.parse_args()
+
+    try:
+        report = Teardown(args.region, args.prefix, max_workers=args.workers).run(dry_run=args.dry_run)
+    except DreamChaserError as e:
+        print(e)
+        sys.exit(e.exit_code)
+    if args.dry_run:
+        print('\n'.join(report['order']))
+        sys.exit(0)
+    sys.exit(1 if any(result['status'] != 'SUCCEEDED' for result in report['tasks'].values()) else 0)
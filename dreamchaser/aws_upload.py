@@ -0,0 +1,187 @@
+import os
+import hashlib
+import threading
+from urllib.parse import quote, unquote, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
+from dreamchaser.aws_client import get_client
+
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+
+
+class AssetUploader():
+    def __init__(self, bucket: str, region_name: str, prefix: str='dreamchaser/assets',
+                max_workers: int=8, multipart_threshold: int=MULTIPART_THRESHOLD, **kwargs) -> None:
+        """
+        Upload templates and assets to S3 under their content hash
+
+        Notes:
+            Each file is stored as '<prefix>/<sha256><extension>', hence an
+            object which already exists holds the same content and is never
+            uploaded again. The existing objects are listed once per
+            uploader, the files are hashed and uploaded concurrently, and the
+            files larger than multipart_threshold are sent as multipart
+            uploads. The keys can be computed without any request to S3, see
+            keys, and each file is hashed once per uploader unless it changes.
+
+        Args:
+            bucket (str): the name of the S3 bucket.
+            region_name (str): the AWS region of the bucket.
+            prefix (str): the key prefix of the uploaded objects.
+            max_workers (int): the number of files hashed and uploaded
+            concurrently.
+            multipart_threshold (int): the size in bytes from which a file is
+            uploaded in parts.
+        """
+        self.client = get_client('s3', region_name, **kwargs)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.max_workers = max_workers
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold,
+            max_concurrency=4
+        )
+        self.lock = threading.Lock()
+        self.existing = None
+        self.hashed = {}
+        self.stats = {'uploaded': 0, 'skipped': 0, 'bytes': 0}
+
+    @staticmethod
+    def digest(path: str) -> str:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as fasset:
+            for chunk in iter(lambda: fasset.read(1024 * 1024), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def key(self, path: str, digest: str) -> str:
+        key = digest + os.path.splitext(path)[1]
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def url(self, key: str) -> str:
+        return f"{self.client.meta.endpoint_url}/{self.bucket}/{quote(key)}"
+
+    def list_existing(self) -> set:
+        with self.lock:
+            if self.existing is None:
+                existing = set()
+                paginator = self.client.get_paginator('list_objects_v2')
+                for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+                    existing.update(item['Key'] for item in page.get('Contents', []))
+                self.existing = existing
+            return self.existing
+
+    def _key(self, path: str) -> str:
+        stat = os.stat(path)
+        signature = (path, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            key = self.hashed.get(signature)
+        if key is None:
+            key = self.key(path, self.digest(path))
+            with self.lock:
+                self.hashed[signature] = key
+        return key
+
+    def keys(self, paths: list) -> dict:
+        """
+        Hash files without uploading them
+
+        Returns:
+            the object key of every file, by path.
+        """
+        paths = list(dict.fromkeys(paths))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(paths, executor.map(self._key, paths)))
+
+    @staticmethod
+    def dir_paths(directory: str) -> list:
+        return [
+            os.path.join(root, name)
+            for root, _, names in os.walk(directory)
+            for name in sorted(names)
+        ]
+
+    def dir_keys(self, directory: str) -> dict:
+        """
+        Hash every file of a directory without uploading them
+
+        Returns:
+            the object key of every file, by path relative to the directory.
+        """
+        return {
+            os.path.relpath(path, directory): key
+            for path, key in self.keys(self.dir_paths(directory)).items()
+        }
+
+    def _upload(self, path: str, key: str) -> str:
+        with self.lock:
+            skip = key in self.existing
+        if skip:
+            with self.lock:
+                self.stats['skipped'] += 1
+            return key
+
+        self.client.upload_file(path, self.bucket, key, Config=self.transfer_config)
+        with self.lock:
+            self.existing.add(key)
+            self.stats['uploaded'] += 1
+            self.stats['bytes'] += os.path.getsize(path)
+        return key
+
+    def upload(self, paths: list) -> dict:
+        """
+        Upload the files which are not in the bucket yet
+
+        Notes:
+            Files of the same content share their key, hence only one of them
+            is uploaded.
+
+        Returns:
+            the object key of every file, by path.
+        """
+        keys = self.keys(paths)
+        unique = {key: path for path, key in keys.items()}
+        self.list_existing()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(self._upload, unique.values(), unique))
+        return keys
+
+    def upload_dir(self, directory: str) -> dict:
+        """
+        Upload every file of a directory, e.g. a cdk.out cloud assembly
+
+        Returns:
+            the object key of every file, by path relative to the directory.
+        """
+        return {
+            os.path.relpath(path, directory): key
+            for path, key in self.upload(self.dir_paths(directory)).items()
+        }
+
+def parse_s3_url(url: str) -> tuple:
+    """
+    Return the bucket and the key of an S3 object url, either path style,
+    e.g. https://s3.ap-southeast-2.amazonaws.com/bucket/key, virtual hosted
+    style, e.g. https://bucket.s3.amazonaws.com/key, or s3://bucket/key
+    """
+    parsed = urlparse(url)
+    path = unquote(parsed.path).lstrip('/')
+    host = parsed.netloc.split(':')[0]
+    if parsed.scheme == 's3':
+        return host, path
+    if not host.startswith(('s3.', 's3-')):
+        for marker in ('.s3.', '.s3-'):
+            if marker in host:
+                return host.split(marker)[0], path
+    bucket, _, key = path.partition('/')
+    return bucket, key
+
+
+def is_content_addressed(url: str) -> bool:
+    """
+    Return True when the object of a url is named after the sha256 of its
+    content, as uploaded by AssetUploader, hence the url changes with it
+    """
+    name = os.path.basename(urlparse(url).path).split('.')[0]
+    return len(name) == 64 and all(char in '0123456789abcdef' for char in name)
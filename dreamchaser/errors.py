@@ -0,0 +1,70 @@
+THROTTLING_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException',
+    'TransactionInProgressException', 'RequestLimitExceeded', 'BandwidthLimitExceeded',
+    'RequestThrottled', 'SlowDown', 'EC2ThrottledException'
+}
+
+
+class DreamChaserError(Exception):
+    exit_code = 1
+
+    def __init__(self, message: str, error_code: str=None, exit_code: int=None) -> None:
+        """
+        The base error of the DreamChaser helpers
+
+        Notes:
+            Scripts exit with exit_code, whereas a caller running many units
+            of work concurrently can retry or skip the one which failed, e.g.
+            when throttled is set.
+
+        Args:
+            message (str): the error message.
+            error_code (str): the AWS error code, e.g. 'ThrottlingException'.
+            exit_code (int): the process exit code, overriding the one of the
+            error class.
+        """
+        super().__init__(message)
+        self.error_code = error_code
+        if exit_code is not None:
+            self.exit_code = exit_code
+
+    @classmethod
+    def from_client_error(cls, error, **kwargs):
+        return cls(
+            "{} Error Code: {}".format(error.response['Error']['Message'], error.response['Error']['Code']),
+            error_code=error.response['Error']['Code'],
+            **kwargs
+        )
+
+    @property
+    def throttled(self) -> bool:
+        return self.error_code in THROTTLING_CODES
+
+
+class OrganizationError(DreamChaserError):
+    exit_code = 127
+
+
+class OrganizationalUnitError(DreamChaserError):
+    exit_code = 137
+
+
+class PolicyTypeError(DreamChaserError):
+    exit_code = 157
+
+
+class OrganizationalUnitLookupError(DreamChaserError):
+    exit_code = 177
+
+
+class ParameterError(DreamChaserError):
+    exit_code = 197
+
+
+class ResourceSharingError(DreamChaserError):
+    exit_code = 217
+
+
+class StackError(DreamChaserError):
+    exit_code = 1
@@ -0,0 +1,327 @@
+import os
+import sys
+import gzip
+import heapq
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from vpc.vpc_cidr import CidrIndex
+
+# the fields of the flow logs of add_vpc, in order
+FLOW_LOG_FIELDS = [
+    'version', 'account-id', 'interface-id', 'srcaddr', 'dstaddr', 'srcport', 'dstport',
+    'protocol', 'packets', 'bytes', 'start', 'end', 'action', 'log-status',
+    'vpc-id', 'subnet-id', 'az-id', 'flow-direction', 'pkt-srcaddr', 'pkt-dstaddr'
+]
+# the fields of the default flow log format
+DEFAULT_FIELDS = FLOW_LOG_FIELDS[:14]
+# the fields read by the analyzer, as named in the Parquet files
+COLUMNS = ['srcaddr', 'dstaddr', 'bytes', 'subnet_id', 'az_id', 'pkt_srcaddr', 'pkt_dstaddr']
+
+DEST_CIDRS = [
+    '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '100.64.0.0/10', '0.0.0.0/0', '::/0'
+]
+CHUNK_SIZE = 8 * 1024 * 1024
+BATCH_SIZE = 64 * 1024
+DEST_CACHE_SIZE = 64 * 1024
+
+
+def log_format() -> str:
+    return ' '.join(f"${{{field}}}" for field in FLOW_LOG_FIELDS)
+
+
+def read_text(path: str, chunk_size: int=CHUNK_SIZE):
+    """
+    Read a plain text flow log file, gzipped or not, by chunks of lines
+
+    Notes:
+        The fields are taken from the header line of the file, or are the
+        fields of the default format for a file without header.
+
+    Yields:
+        lists of records, each a tuple of the COLUMNS values, None for the
+        fields which are missing or '-'.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as flog:
+        first = flog.readline()
+        header = first.split()
+        pending = []
+        if header and header[0].isdigit():
+            header, pending = DEFAULT_FIELDS, [first]
+        index = {field.replace('-', '_'): position for position, field in enumerate(header)}
+        # the missing fields point to a trailing '-' appended to every line
+        getter = itemgetter(*(index.get(column, len(header)) for column in COLUMNS))
+        width = len(header)
+
+        def records(lines):
+            rows = []
+            for line in lines:
+                values = line.split()
+                if len(values) != width:
+                    continue
+                values.append('-')
+                rows.append(tuple(None if value == '-' else value for value in getter(values)))
+            return rows
+
+        if pending:
+            yield records(pending)
+        while True:
+            lines = flog.readlines(chunk_size)
+            if not lines:
+                break
+            yield records(lines)
+
+
+def read_parquet(path: str, batch_size: int=BATCH_SIZE):
+    """
+    Read a Parquet flow log file by batches of rows
+
+    Notes:
+        Only the COLUMNS are read. Requires pyarrow.
+
+    Yields:
+        lists of records, each a tuple of the COLUMNS values.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('pyarrow is required to read Parquet flow logs')
+
+    parquet_file = pq.ParquetFile(path)
+    names = set(parquet_file.schema_arrow.names)
+    columns = [column for column in COLUMNS if column in names]
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        data = batch.to_pydict()
+        missing = [None] * batch.num_rows
+        yield list(zip(*(data.get(column, missing) for column in COLUMNS)))
+
+
+def read(path: str):
+    return read_parquet(path) if path.endswith('.parquet') else read_text(path)
+
+
+class HeavyHitters():
+    def __init__(self, capacity: int=1000) -> None:
+        """
+        The keys of the largest total weight of a stream, in bounded memory
+
+        Notes:
+            At most 2 * capacity keys are counted. Beyond that, the keys are
+            pruned down to the capacity largest ones, and the largest count
+            dropped is added to error. The count of any key is thus exact when
+            error is 0, or else undercounted by at most error, hence every key
+            whose total exceeds error is still counted.
+        """
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def add(self, key, weight: int) -> None:
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + weight
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self) -> None:
+        kept = heapq.nlargest(self.capacity + 1, self.counts.items(), key=lambda item: item[1])
+        self.error += kept[-1][1]
+        self.counts = dict(kept[:-1])
+
+    def merge(self, other) -> None:
+        self.error += other.error
+        for key, count in other.counts.items():
+            self.add(key, count)
+
+    def top(self, count: int=10) -> list:
+        return heapq.nlargest(count, self.counts.items(), key=lambda item: item[1])
+
+
+class TopTalkers():
+    def __init__(self, dest_cidrs: list=None, capacity: int=1000) -> None:
+        """
+        Aggregate the bytes of flow log records per subnet, availability zone
+        and destination CIDR, along with their top talkers
+
+        Notes:
+            A talker is a pair of source and destination addresses, taken from
+            the packet level fields when present, e.g. the instance behind a
+            Nat Gateway. Destinations are mapped to the most specific of
+            dest_cidrs. The totals are exact, the talkers are tracked by a
+            HeavyHitters per group, hence the memory is bounded by the number
+            of groups times capacity whatever the size of the input.
+
+        Args:
+            dest_cidrs (list): the destination CIDRs to aggregate, e.g. the VPC
+            CIDRs and the on-premises ranges. Defaults to the private ranges
+            and the internet.
+            capacity (int): the number of talkers tracked per group.
+        """
+        self.dest_cidrs = list(dest_cidrs or DEST_CIDRS)
+        self.capacity = capacity
+        self.groups = {}
+        self.records = 0
+        self.bytes = 0
+        self.index = CidrIndex()
+        for cidr in self.dest_cidrs:
+            self.index.add(cidr)
+        self.destinations = {}
+
+    def destination(self, address: str) -> str:
+        """
+        Return the most specific of dest_cidrs containing an address
+
+        Notes:
+            The lookups are cached, and the cache is reset once it holds
+            DEST_CACHE_SIZE addresses to bound its memory.
+        """
+        cidr = self.destinations.get(address)
+        if cidr is None:
+            try:
+                net = self.index.longest_match(address)
+                cidr = str(net) if net is not None else 'other'
+            except ValueError:
+                cidr = 'unknown'
+            if len(self.destinations) >= DEST_CACHE_SIZE:
+                self.destinations.clear()
+            self.destinations[address] = cidr
+        return cidr
+
+    def _group(self, kind: str, name: str) -> dict:
+        key = (kind, name or 'unknown')
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {'bytes': 0, 'talkers': HeavyHitters(self.capacity)}
+        return group
+
+    def add(self, records: list) -> None:
+        """
+        Aggregate a batch of records, see read
+
+        Notes:
+            The records of the batch are summed per subnet, zone and talker
+            first, hence the groups are updated once per distinct flow of the
+            batch rather than once per record.
+        """
+        flows = {}
+        for srcaddr, dstaddr, nbytes, subnet, zone, pkt_srcaddr, pkt_dstaddr in records:
+            if nbytes is None or dstaddr is None:
+                continue
+            key = (subnet, zone, pkt_srcaddr or srcaddr, pkt_dstaddr or dstaddr)
+            flows[key] = flows.get(key, 0) + int(nbytes)
+            self.records += 1
+
+        for (subnet, zone, source, destination), nbytes in flows.items():
+            talker = (source, destination)
+            for group in (
+                self._group('subnet', subnet),
+                self._group('az', zone),
+                self._group('dest', self.destination(destination))
+            ):
+                group['bytes'] += nbytes
+                group['talkers'].add(talker, nbytes)
+            self.bytes += nbytes
+
+    def add_file(self, path: str) -> None:
+        for records in read(path):
+            self.add(records)
+
+    def merge(self, other) -> None:
+        for key, other_group in other.groups.items():
+            group = self._group(*key)
+            group['bytes'] += other_group['bytes']
+            group['talkers'].merge(other_group['talkers'])
+        self.records += other.records
+        self.bytes += other.bytes
+
+    def report(self, top: int=10) -> dict:
+        """
+        Return the groups by kind, the largest first
+
+        Returns:
+            the bytes, the share of the total bytes, the top talkers and the
+            error bound of their bytes of each group, by group name, by kind
+            among 'subnet', 'az' and 'dest'.
+        """
+        report = {'subnet': {}, 'az': {}, 'dest': {}}
+        for (kind, name), group in sorted(self.groups.items(), key=lambda item: -item[1]['bytes']):
+            report[kind][name] = {
+                'bytes': group['bytes'],
+                'share': group['bytes'] / self.bytes if self.bytes else 0.0,
+                'talkers': group['talkers'].top(top),
+                'error': group['talkers'].error
+            }
+        return report
+
+
+def flow_log_files(paths: list) -> list:
+    """
+    Return the flow log files of files and directories, e.g. a local copy of
+    the partitions of the flow log bucket
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(root, name)
+                for root, _, names in sorted(os.walk(path))
+                for name in sorted(names)
+                if name.endswith(('.parquet', '.log', '.log.gz', '.txt', '.gz'))
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def _analyze(path: str, dest_cidrs: list, capacity: int) -> TopTalkers:
+    talkers = TopTalkers(dest_cidrs, capacity)
+    talkers.add_file(path)
+    talkers.destinations.clear()
+    return talkers
+
+
+def analyze(paths: list, dest_cidrs: list=None, capacity: int=1000, max_workers: int=1) -> TopTalkers:
+    """
+    Aggregate the top talkers of flow log files in a single pass
+
+    Notes:
+        With max_workers above 1, the files are aggregated by concurrent
+        processes and the results merged.
+    """
+    talkers = TopTalkers(dest_cidrs, capacity)
+    files = flow_log_files(paths)
+    if max_workers <= 1:
+        for path in files:
+            talkers.add_file(path)
+        return talkers
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for result in executor.map(_analyze, files, [dest_cidrs] * len(files), [capacity] * len(files)):
+            talkers.merge(result)
+    return talkers
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Report the top talkers of VPC flow logs')
+    parser.add_argument('paths', nargs='+', help='flow log files or directories')
+    parser.add_argument('--dest-cidr', action='append', dest='dest_cidrs',
+                        help='a destination CIDR to aggregate, repeat for several')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--capacity', type=int, default=1000,
+                        help='the number of talkers tracked per group')
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        talkers = analyze(args.paths, args.dest_cidrs, args.capacity, args.workers)
+    except ImportError as e:
+        print(e)
+        sys.exit(1)
+    print(f"{talkers.records} records, {talkers.bytes} bytes")
+    for kind, groups in talkers.report(args.top).items():
+        print(f"\nper {kind}:")
+        for name, group in groups.items():
+            print(f"  {name}: {group['bytes']} bytes ({group['share']:.1%})"
+                  + (f", error <= {group['error']}" if group['error'] else ''))
+            for (source, destination), nbytes in group['talkers']:
+                print(f"    {source} -> {destination}: {nbytes}")
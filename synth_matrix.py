@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Synthesize the DreamChaser topology for many environments in parallel
+
+Each environment of the matrix is synthesized by cdk_app.build in its own
+worker process, hence with its own JSII runtime, into a nested cloud assembly
+of the output directory. The top level manifest references every nested
+assembly, the way CDK stages do, so the CDK CLI can work on the merged output:
+
+    python3 synth_matrix.py --matrix environments.json --outdir cdk.out.matrix
+    cdk --app cdk.out.matrix list
+
+The matrix is a JSON list of environments, e.g.
+    [
+        {"name": "prod-syd", "account": "111111111111", "region": "ap-southeast-2",
+         "context": {"DC_VPC_CIDR": "10.10.0.0/16", "DC_VPC_HA": true, "OU_ID": "..."}}
+    ]
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def synth_environment(environment: dict, outdir: str) -> dict:
+    started = time.perf_counter()
+    from aws_cdk import App
+    from cdk_app import build
+
+    with open(os.path.join(ROOT, 'cdk.json')) as fcdk:
+        context = json.load(fcdk).get('context', {})
+    context.update(environment.get('context', {}))
+    context['AWS_ACCOUNT'] = environment['account']
+    context['AWS_REGION'] = environment['region']
+
+    app = App(outdir=outdir, context=context)
+    build(app)
+    assembly = app.synth()
+    return {
+        'name': environment['name'],
+        'account': environment['account'],
+        'region': environment['region'],
+        'stacks': [stack.stack_name for stack in assembly.stacks],
+        'seconds': time.perf_counter() - started
+    }
+
+
+def synth_matrix(environments: list, outdir: str, workers: int=None) -> dict:
+    """
+    Synthesize every environment into a nested assembly of outdir
+
+    Returns:
+        the per-environment results, the elapsed wall time and the speedup
+        over synthesizing the environments one after another.
+    """
+    names = [environment['name'] for environment in environments]
+    if len(set(names)) != len(names):
+        raise ValueError('Environment names must be unique')
+
+    shutil.rmtree(outdir, ignore_errors=True)
+    os.makedirs(outdir)
+
+    started = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context) as executor:
+        results = list(executor.map(
+            synth_environment,
+            environments,
+            [os.path.join(outdir, f"assembly-{name}") for name in names]
+        ))
+    elapsed = time.perf_counter() - started
+
+    with open(os.path.join(outdir, f"assembly-{names[0]}", 'manifest.json')) as fmanifest:
+        version = json.load(fmanifest)['version']
+    manifest = {
+        'version': version,
+        'artifacts': {
+            f"assembly-{name}": {
+                'type': 'cdk:cloud-assembly',
+                'properties': {
+                    'directoryName': f"assembly-{name}",
+                    'displayName': name
+                }
+            }
+            for name in names
+        }
+    }
+    with open(os.path.join(outdir, 'manifest.json'), 'w') as fmanifest:
+        json.dump(manifest, fmanifest, indent=2)
+    with open(os.path.join(outdir, 'cdk.out'), 'w') as fversion:
+        json.dump({'version': version}, fversion)
+
+    return {
+        'environments': results,
+        'seconds': elapsed,
+        'speedup': sum(result['seconds'] for result in results) / elapsed
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthesize many environments in parallel')
+    parser.add_argument('--matrix', required=True, help='the JSON file of the environments')
+    parser.add_argument('--outdir', default='cdk.out.matrix')
+    parser.add_argument('--workers', type=int, help='defaults to the number of CPUs')
+    args = parser.parse_args()
+
+    with open(args.matrix) as fmatrix:
+        report = synth_matrix(json.load(fmatrix), args.outdir, args.workers)
+    for result in report['environments']:
+        print(f"{result['name']}: {', '.join(result['stacks'])} in {result['seconds']:.1f}s")
+    print(f"Synthesized {len(report['environments'])} environments in {report['seconds']:.1f}s, "
+          f"{report['speedup']:.1f}x speedup")
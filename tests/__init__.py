@@ -0,0 +1,3 @@
+# moto hooks into the botocore sessions created after it is imported, hence
+# before the shared session of dreamchaser.aws_client
+import moto  # noqa: F401
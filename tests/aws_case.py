@@ -0,0 +1,29 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from moto import mock_aws
+
+REGION = 'ap-southeast-2'
+
+
+class AwsTestCase(unittest.TestCase):
+    """
+    A test case running against moto, with a scratch directory for the local
+    caches and logs
+    """
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        env = mock.patch.dict(os.environ, {
+            'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing', 'AWS_DEFAULT_REGION': REGION
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
@@ -0,0 +1,105 @@
+import unittest
+from unittest import mock
+from dreamchaser.aws_bootstrap import Bootstrap, organization_bootstrap
+from dreamchaser.aws_client import get_client
+from dreamchaser.aws_init import AWSOrg, AWSRam
+from dreamchaser.errors import ResourceSharingError
+from tests.aws_case import AwsTestCase, REGION
+
+
+def statuses(report: dict) -> dict:
+    return {name: task['status'] for name, task in report['tasks'].items()}
+
+
+class BootstrapTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.calls = []
+        self.failing = {'b'}
+
+    def bootstrap(self, namespace: str='111111111111:ap-southeast-2') -> Bootstrap:
+        bootstrap = Bootstrap(journal_path=self.path('journal.json'), namespace=namespace)
+        bootstrap.add_step('a', lambda results: self.step('a', results))
+        bootstrap.add_step('b', lambda results: self.step('b', results), depends_on=['a'])
+        bootstrap.add_step('c', lambda results: self.step('c', results), depends_on=['b'])
+        bootstrap.add_step('d', lambda results: self.step('d', results))
+        return bootstrap
+
+    def step(self, name: str, results: dict) -> str:
+        self.calls.append(name)
+        if name in self.failing:
+            raise RuntimeError(f"{name} failed")
+        return name + ''.join(results[dep] for dep in sorted(results))
+
+    def test_run_resumes_from_the_failed_step(self):
+        report = self.bootstrap().run()
+        self.assertEqual(statuses(report), {'a': 'SUCCEEDED', 'b': 'FAILED', 'c': 'SKIPPED', 'd': 'SUCCEEDED'})
+
+        self.failing.clear()
+        self.calls.clear()
+        bootstrap = self.bootstrap()
+        report = bootstrap.run()
+
+        self.assertEqual(set(statuses(report).values()), {'SUCCEEDED'})
+        self.assertEqual(sorted(self.calls), ['b', 'c'])
+        self.assertTrue(report['tasks']['a']['result']['journal'])
+        self.assertFalse(report['tasks']['b']['result']['journal'])
+        # the results of the journaled steps are passed on
+        self.assertEqual(bootstrap.result('c'), 'cba')
+
+    def test_reset(self):
+        self.failing.clear()
+        self.bootstrap().run()
+        self.bootstrap('222222222222:ap-southeast-2').run()
+
+        bootstrap = self.bootstrap()
+        bootstrap.reset(['b'])
+        self.calls.clear()
+        bootstrap.run()
+        self.assertEqual(self.calls, ['b'])
+
+        bootstrap.reset()
+        self.assertFalse(any(bootstrap.is_complete(name) for name in 'abcd'))
+        other = self.bootstrap('222222222222:ap-southeast-2')
+        self.assertTrue(all(other.is_complete(name) for name in 'abcd'))
+        self.calls.clear()
+        bootstrap.run()
+        self.assertEqual(sorted(self.calls), ['a', 'b', 'c', 'd'])
+
+    def test_duplicate_step(self):
+        with self.assertRaises(ValueError):
+            self.bootstrap().add_step('a', lambda results: None)
+
+
+class OrganizationBootstrapTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = mock.patch('dreamchaser.aws_bootstrap.CACHE_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bootstrap(self):
+        return organization_bootstrap(REGION, journal_path=self.path('journal.json'))
+
+    def test_resume_after_a_failed_step(self):
+        error = ResourceSharingError('Access denied', error_code='AccessDeniedException')
+        with mock.patch.object(AWSRam, 'enable_resource_sharing', side_effect=error):
+            report = self.bootstrap().run()
+        self.assertEqual(report['tasks']['enable-resource-sharing']['status'], 'FAILED')
+        self.assertEqual(report['tasks'][f"put-ou-id:management:{REGION}"]['status'], 'SUCCEEDED')
+
+        with mock.patch.object(AWSOrg, 'create_organization') as create_organization, \
+                mock.patch.object(AWSRam, 'enable_resource_sharing', return_value=True) as enable:
+            report = self.bootstrap().run()
+        self.assertEqual(set(statuses(report).values()), {'SUCCEEDED'})
+        create_organization.assert_not_called()
+        enable.assert_called_once()
+
+        ou_arn = report['tasks']['get-ou-arn']['result']['result']
+        self.assertIn(':ou/', ou_arn)
+        parameter = get_client('ssm', REGION).get_parameter(Name='DC_ONE_OU_ID')['Parameter']
+        self.assertEqual(parameter['Value'], ou_arn)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import multiprocessing
+import unittest
+from dreamchaser.aws_cache import DeployCache, JsonCache
+from dreamchaser.aws_client import get_client
+from dreamchaser.aws_events import TimingLog
+from dreamchaser.aws_stack import CfnStack
+from tests.aws_case import AwsTestCase, REGION
+
+BUCKET = 'dreamchaser-templates'
+TEMPLATE_URL = f"https://{BUCKET}.s3.{REGION}.amazonaws.com/vpc.json"
+
+
+def _put_entries(path: str, worker: int, count: int) -> None:
+    cache = JsonCache(path)
+    for i in range(count):
+        cache.put(f"{worker}-{i}", i)
+
+
+def _template(*names) -> str:
+    return json.dumps({'Resources': {name: {'Type': 'AWS::SNS::Topic'} for name in names}})
+
+
+class JsonCacheTest(AwsTestCase):
+    def test_concurrent_processes_keep_each_other_entries(self):
+        workers = [
+            multiprocessing.Process(target=_put_entries, args=(self.path('cache.json'), worker, 20))
+            for worker in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(len(JsonCache(self.path('cache.json')).load()), 80)
+
+    def test_load_sees_the_writes_of_another_cache(self):
+        cache = JsonCache(self.path('cache.json'))
+        self.assertIsNone(cache.get('key'))
+        JsonCache(self.path('cache.json')).put('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+
+
+class DeployCacheTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.s3 = get_client('s3', REGION)
+        self.s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': REGION})
+        self.s3.put_object(Bucket=BUCKET, Key='vpc.json', Body=_template('Topic'))
+        self.deploy_cache = DeployCache(self.path('deploy_cache.json'))
+        self.stack = CfnStack(REGION, deploy_cache=self.deploy_cache,
+                                timing_log=TimingLog(self.path('timings.jsonl')))
+
+    def deploy(self):
+        calls = []
+        handler = lambda model, **kwargs: calls.append(model.name)
+        self.stack.client.meta.events.register('before-call.cloudformation', handler)
+        self.s3.meta.events.register('before-call.s3', handler)
+        try:
+            self.stack.create_update_stack('vpc', template=TEMPLATE_URL, parameters=[])
+        finally:
+            self.stack.client.meta.events.unregister('before-call.cloudformation', handler)
+            self.s3.meta.events.unregister('before-call.s3', handler)
+        return calls
+
+    def test_unchanged_stack_is_skipped(self):
+        self.assertIn('CreateStack', self.deploy())
+        self.assertEqual(self.deploy(), ['HeadObject'])
+
+    def test_invalidate_deploys_again(self):
+        self.deploy()
+        self.deploy_cache.invalidate(account_id=self.stack.account_id, region_name=REGION, stack_name='vpc')
+        self.assertIn('DescribeStacks', self.deploy())
+
+    def test_changed_template_at_the_same_url_is_deployed(self):
+        self.deploy()
+        self.s3.put_object(Bucket=BUCKET, Key='vpc.json', Body=_template('Topic', 'Other'))
+        self.assertIn('UpdateStack', self.deploy())
+
+    def test_deployments_are_recorded_per_account(self):
+        self.deploy()
+        digest = self.deploy_cache.cache.get(DeployCache.key(self.stack.account_id, REGION, 'vpc'))
+        self.assertIsNotNone(digest)
+        self.assertFalse(self.deploy_cache.is_current('111122223333', REGION, 'vpc', digest))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import threading
+import unittest
+from unittest import mock
+from dreamchaser.aws_client import ClientRegistry
+from tests.aws_case import AwsTestCase, REGION
+
+
+class ClientRegistryTest(AwsTestCase):
+    def test_clients_are_shared(self):
+        registry = ClientRegistry()
+        self.assertIs(registry.client('ssm', REGION), registry.client('ssm', REGION))
+        self.assertIsNot(registry.client('ssm', REGION), registry.client('ssm', 'us-east-1'))
+
+    def test_account_of_a_role_needs_no_request(self):
+        registry = ClientRegistry()
+        self.assertEqual(registry.account_id(REGION, role_arn='arn:aws:iam::111122223333:role/x'), '111122223333')
+        self.assertEqual(registry.accounts, {})
+
+    def test_account_lookup_does_not_block_other_clients(self):
+        registry = ClientRegistry()
+        sts = registry.client('sts', REGION)
+        started, release = threading.Event(), threading.Event()
+        get_caller_identity = sts.get_caller_identity
+
+        def slow_identity():
+            started.set()
+            release.wait(10)
+            return get_caller_identity()
+
+        accounts = []
+        with mock.patch.object(sts, 'get_caller_identity', side_effect=slow_identity) as identity:
+            lookups = [threading.Thread(target=lambda: accounts.append(registry.account_id(REGION))) for _ in range(2)]
+            for lookup in lookups:
+                lookup.start()
+            self.assertTrue(started.wait(10))
+            # the registry lock is free while the account is being resolved
+            registry.client('ec2', REGION)
+            release.set()
+            for lookup in lookups:
+                lookup.join()
+        self.assertEqual(accounts, ['123456789012', '123456789012'])
+        self.assertEqual(identity.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
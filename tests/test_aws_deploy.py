@@ -0,0 +1,158 @@
+import json
+import time
+import threading
+import unittest
+from unittest import mock
+from dreamchaser.aws_cache import DeployCache
+from dreamchaser.aws_client import get_client
+from dreamchaser.aws_deploy import StackDeployer, TaskGraph
+from dreamchaser.aws_events import TimingLog
+from tests.aws_case import AwsTestCase, REGION
+
+BUCKET = 'dreamchaser-templates'
+
+
+class TaskGraphTest(unittest.TestCase):
+    def test_order_respects_dependencies(self):
+        graph = TaskGraph()
+        graph.add_task('vpc', lambda: None)
+        graph.add_task('tgw', lambda: None)
+        graph.add_task('attach', lambda: None, depends_on=['vpc', 'tgw'])
+        graph.add_task('routes', lambda: None, depends_on=['attach'])
+
+        order = graph.order()
+        self.assertEqual(sorted(order), ['attach', 'routes', 'tgw', 'vpc'])
+        self.assertLess(order.index('vpc'), order.index('attach'))
+        self.assertLess(order.index('tgw'), order.index('attach'))
+        self.assertLess(order.index('attach'), order.index('routes'))
+
+    def test_order_rejects_cycles_and_unknown_tasks(self):
+        graph = TaskGraph()
+        graph.add_task('a', lambda: None, depends_on=['b'])
+        graph.add_task('b', lambda: None, depends_on=['a'])
+        with self.assertRaises(ValueError):
+            graph.order()
+
+        graph = TaskGraph()
+        graph.add_task('a', lambda: None, depends_on=['missing'])
+        with self.assertRaises(ValueError):
+            graph.order()
+
+    def test_run_starts_tasks_after_their_dependencies(self):
+        lock = threading.Lock()
+        finished = []
+
+        def task(name):
+            def run():
+                time.sleep(0.01)
+                with lock:
+                    finished.append(name)
+                return name
+            return run
+
+        graph = TaskGraph(max_workers=4)
+        graph.add_task('vpc', task('vpc'))
+        graph.add_task('tgw', task('tgw'))
+        graph.add_task('attach', task('attach'), depends_on=['vpc', 'tgw'])
+        report = graph.run()
+
+        self.assertEqual(finished[-1], 'attach')
+        tasks = report['tasks']
+        self.assertTrue(all(result['status'] == 'SUCCEEDED' for result in tasks.values()))
+        self.assertEqual(tasks['attach']['result'], 'attach')
+        self.assertGreaterEqual(tasks['attach']['start'], max(tasks['vpc']['end'], tasks['tgw']['end']))
+        self.assertEqual(report['critical_path'][-1], 'attach')
+
+    def test_run_skips_the_dependents_of_a_failed_task(self):
+        def fail():
+            raise RuntimeError('boom')
+
+        graph = TaskGraph()
+        graph.add_task('vpc', fail)
+        graph.add_task('attach', lambda: None, depends_on=['vpc'])
+        graph.add_task('routes', lambda: None, depends_on=['attach'])
+        graph.add_task('dns', lambda: 'ok')
+        tasks = graph.run()['tasks']
+
+        self.assertEqual(tasks['vpc']['status'], 'FAILED')
+        self.assertIsInstance(tasks['vpc']['error'], RuntimeError)
+        self.assertEqual(tasks['attach']['status'], 'SKIPPED')
+        self.assertEqual(tasks['routes']['status'], 'SKIPPED')
+        self.assertEqual(tasks['dns']['status'], 'SUCCEEDED')
+
+
+def _template(export: str=None, imports: str=None) -> str:
+    topic = {'Type': 'AWS::SNS::Topic'}
+    if imports:
+        topic['Properties'] = {'TopicName': {'Fn::ImportValue': imports}}
+    template = {'Resources': {'Topic': topic}}
+    if export:
+        template['Outputs'] = {'Name': {'Value': export, 'Export': {'Name': export}}}
+    return json.dumps(template)
+
+
+class StackDeployerTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.s3 = get_client('s3', REGION)
+        self.s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': REGION})
+        self.deployer = StackDeployer(
+            REGION, max_workers=4,
+            deploy_cache=DeployCache(self.path('deploy_cache.json')),
+            timing_log=TimingLog(self.path('timings.jsonl'))
+        )
+
+    def add_stack(self, stack_name: str, export: str=None, imports: str=None, upload: bool=True) -> None:
+        if upload:
+            self.s3.put_object(Bucket=BUCKET, Key=f"{stack_name}.json", Body=_template(export, imports))
+        self.deployer.add_stack(
+            stack_name, f"https://{BUCKET}.s3.{REGION}.amazonaws.com/{stack_name}.json",
+            exports=[export] if export else None, imports=[imports] if imports else None
+        )
+
+    def test_order_follows_exports_and_imports(self):
+        self.add_stack('app', imports='vpc-id')
+        self.add_stack('vpc', export='vpc-id')
+        self.add_stack('dns')
+        self.assertEqual(self.deployer.dependencies(), {'app': {'vpc'}, 'vpc': set(), 'dns': set()})
+
+        tasks = self.deployer.deploy()['tasks']
+        self.assertTrue(all(result['status'] == 'SUCCEEDED' for result in tasks.values()))
+        self.assertGreaterEqual(tasks['app']['start'], tasks['vpc']['end'])
+
+    def test_independent_stacks_deploy_concurrently(self):
+        self.add_stack('vpc', export='vpc-id')
+        self.add_stack('dns')
+        self.add_stack('app', imports='vpc-id')
+        # vpc and dns only get past the barrier when both are in flight
+        barrier = threading.Barrier(2, timeout=10)
+        create_update_stack = self.deployer.cfn.create_update_stack
+
+        def deploy(stack_name, **kwargs):
+            if stack_name in ('vpc', 'dns'):
+                barrier.wait()
+            return create_update_stack(stack_name=stack_name, **kwargs)
+
+        with mock.patch.object(self.deployer.cfn, 'create_update_stack', side_effect=deploy):
+            tasks = self.deployer.deploy()['tasks']
+        self.assertEqual({name: result['status'] for name, result in tasks.items()},
+                            {'vpc': 'SUCCEEDED', 'dns': 'SUCCEEDED', 'app': 'SUCCEEDED'})
+
+    def test_failed_stack_skips_its_dependents(self):
+        self.add_stack('vpc', export='vpc-id', upload=False)
+        self.add_stack('app', imports='vpc-id')
+        self.add_stack('web', imports='app-id')
+        self.deployer.stacks['web']['depends_on'].add('app')
+        self.add_stack('dns')
+
+        tasks = self.deployer.deploy()['tasks']
+        self.assertEqual(tasks['vpc']['status'], 'FAILED')
+        self.assertEqual(tasks['app']['status'], 'SKIPPED')
+        self.assertEqual(tasks['web']['status'], 'SKIPPED')
+        self.assertEqual(tasks['dns']['status'], 'SUCCEEDED')
+        stacks = [stack['StackName'] for stack in get_client('cloudformation', REGION).describe_stacks()['Stacks']]
+        self.assertEqual(stacks, ['dns'])
+
+
+if __name__ == '__main__':
+    unittest.main()
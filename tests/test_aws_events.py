@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from botocore.exceptions import ClientError
+from dreamchaser.aws_events import StackEventTailer, TimingLog, STACK_TYPE
+
+PARENT = 'arn:aws:cloudformation:ap-southeast-2:123456789012:stack/parent/1'
+NESTED = 'arn:aws:cloudformation:ap-southeast-2:123456789012:stack/parent-VPC/2'
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def event(stack_id: str, logical_id: str, status: str, seconds: int,
+            resource_type: str='AWS::EC2::Subnet', physical_id: str='') -> dict:
+    return {
+        'EventId': f"{logical_id}-{status}-{seconds}",
+        'StackId': stack_id,
+        'StackName': stack_id.split('/')[1],
+        'LogicalResourceId': logical_id,
+        'PhysicalResourceId': physical_id,
+        'ResourceType': resource_type,
+        'ResourceStatus': status,
+        'Timestamp': T0 + timedelta(seconds=seconds)
+    }
+
+
+class StubCloudFormation():
+    """
+    describe_stack_events of a set of stacks, one event per page
+    """
+    exceptions = mock.Mock(ClientError=ClientError)
+
+    def __init__(self) -> None:
+        self.events = {PARENT: [], NESTED: []}
+        self.pages = 0
+
+    def add(self, *events) -> None:
+        for e in events:
+            self.events[e['StackId']].insert(0, e)
+
+    def get_paginator(self, name: str):
+        assert name == 'describe_stack_events'
+        return self
+
+    def paginate(self, StackName: str):
+        stack_id = next(key for key in self.events if StackName in (key, key.split('/')[1]))
+        for e in list(self.events[stack_id]):
+            self.pages += 1
+            yield {'StackEvents': [e]}
+
+
+class StackEventTailerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = StubCloudFormation()
+        self.batches = []
+        self.delays = []
+        sleep = mock.patch('dreamchaser.aws_events.time.sleep', side_effect=self.sleep)
+        sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def sleep(self, delay: float) -> None:
+        self.delays.append(delay)
+        if self.batches:
+            self.client.add(*self.batches.pop(0))
+
+    def test_tail_reads_only_the_new_events(self):
+        self.client.add(
+            event(PARENT, 'parent', 'CREATE_IN_PROGRESS', 0, STACK_TYPE, PARENT),
+            event(PARENT, 'parent', 'CREATE_COMPLETE', 10, STACK_TYPE, PARENT)
+        )
+        tailer = StackEventTailer(self.client, 'parent', min_delay=1, max_delay=4)
+        tailer.mark()
+        self.client.add(event(PARENT, 'parent', 'UPDATE_IN_PROGRESS', 20, STACK_TYPE, PARENT))
+        self.batches = [[], [], [], [event(PARENT, 'Subnet', 'UPDATE_COMPLETE', 30)],
+                        [event(PARENT, 'parent', 'UPDATE_COMPLETE', 40, STACK_TYPE, PARENT)]]
+        self.client.pages = 0
+
+        events = list(tailer.tail())
+
+        self.assertEqual([(e['LogicalResourceId'], e['ResourceStatus']) for e in events], [
+            ('parent', 'UPDATE_IN_PROGRESS'), ('Subnet', 'UPDATE_COMPLETE'), ('parent', 'UPDATE_COMPLETE')
+        ])
+        self.assertEqual(tailer.status, 'UPDATE_COMPLETE')
+        # each poll stops at the last event already seen
+        self.assertEqual(self.client.pages, 2 + 1 + 1 + 1 + 2 + 2)
+        # the poll interval backs off while the stack is quiet
+        self.assertEqual(self.delays, [1, 2, 4, 4, 1])
+
+    def test_tail_follows_the_nested_stacks(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        timing_log = TimingLog(os.path.join(directory, 'timings.jsonl'))
+        self.client.add(
+            event(PARENT, 'parent', 'CREATE_IN_PROGRESS', 0, STACK_TYPE, PARENT),
+            event(PARENT, 'VPC', 'CREATE_IN_PROGRESS', 1, STACK_TYPE, NESTED)
+        )
+        self.client.add(
+            # left over from an earlier deployment of the nested stack
+            event(NESTED, 'Subnet', 'DELETE_COMPLETE', -60),
+            event(NESTED, 'parent-VPC', 'CREATE_IN_PROGRESS', 1, STACK_TYPE, NESTED),
+            event(NESTED, 'Subnet', 'CREATE_IN_PROGRESS', 2),
+            event(NESTED, 'Subnet', 'CREATE_COMPLETE', 5)
+        )
+        self.batches = [[], [
+            event(PARENT, 'VPC', 'CREATE_COMPLETE', 6, STACK_TYPE, NESTED),
+            event(PARENT, 'parent', 'CREATE_COMPLETE', 7, STACK_TYPE, PARENT)
+        ]]
+        tailer = StackEventTailer(self.client, 'parent', timing_log=timing_log)
+
+        events = list(tailer.tail())
+
+        self.assertEqual([(e['StackName'], e['LogicalResourceId'], e['ResourceStatus']) for e in events], [
+            ('parent', 'parent', 'CREATE_IN_PROGRESS'),
+            ('parent', 'VPC', 'CREATE_IN_PROGRESS'),
+            ('parent-VPC', 'parent-VPC', 'CREATE_IN_PROGRESS'),
+            ('parent-VPC', 'Subnet', 'CREATE_IN_PROGRESS'),
+            ('parent-VPC', 'Subnet', 'CREATE_COMPLETE'),
+            ('parent', 'VPC', 'CREATE_COMPLETE'),
+            ('parent', 'parent', 'CREATE_COMPLETE')
+        ])
+        self.assertEqual(tailer.stack_id, PARENT)
+        self.assertEqual(tailer.status, 'CREATE_COMPLETE')
+        slowest = timing_log.slowest(resource_type='AWS::EC2::Subnet')
+        self.assertEqual([(r['StackName'], r['Seconds']) for r in slowest], [('parent-VPC', 3.0)])
+        self.assertEqual(timing_log.slowest(1)[0]['LogicalResourceId'], 'parent')
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+from dreamchaser.aws_cache import JsonCache
+from dreamchaser.aws_client import get_client
+from dreamchaser.aws_init import AWSOrg, AWSSsm
+from dreamchaser.errors import ParameterError
+from tests.aws_case import AwsTestCase, REGION
+
+
+class AWSSsmTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.client = get_client('ssm', REGION)
+        for i in range(25):
+            self.client.put_parameter(Name=f"/dc/p{i:02}", Value=f"v{i}", Type='String')
+        self.ssm = AWSSsm(REGION, ttl=300, cache_path=self.path('ssm_cache.json'))
+        self.calls = []
+        handler = lambda model, params, **kwargs: self.calls.append((model.name, len(params.get('Names', []))))
+        self.client.meta.events.register('provide-client-params.ssm', handler)
+        self.addCleanup(self.client.meta.events.unregister, 'provide-client-params.ssm', handler)
+
+    def test_get_paras_batches_by_ten(self):
+        names = [f"/dc/p{i:02}" for i in range(25)] + ['/dc/missing']
+        values = self.ssm.get_paras(names)
+
+        self.assertEqual(len(values), 25)
+        self.assertEqual(values['/dc/p07'], 'v7')
+        self.assertEqual(self.calls, [('GetParameters', 10), ('GetParameters', 10), ('GetParameters', 6)])
+
+    def test_values_are_served_from_the_cache_until_they_expire(self):
+        with mock.patch('dreamchaser.aws_init.time.time', return_value=1000.0):
+            self.ssm.get_paras(['/dc/p01', '/dc/p02'])
+        with mock.patch('dreamchaser.aws_init.time.time', return_value=1299.0):
+            self.assertEqual(self.ssm.get_para('/dc/p01'), 'v1')
+        self.assertEqual(len(self.calls), 1)
+
+        with mock.patch('dreamchaser.aws_init.time.time', return_value=1301.0):
+            self.assertEqual(self.ssm.get_para('/dc/p01'), 'v1')
+        self.assertEqual(self.calls[-1], ('GetParameters', 1))
+
+    def test_put_writes_through_the_cache(self):
+        self.ssm.get_para('/dc/p01')
+        self.ssm.put_str_para('/dc/p01', 'new')
+        self.calls.clear()
+
+        self.assertEqual(AWSSsm(REGION, cache_path=self.path('ssm_cache.json')).get_para('/dc/p01'), 'new')
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.client.get_parameter(Name='/dc/p01')['Parameter']['Value'], 'new')
+
+    def test_delete_drops_the_cached_value(self):
+        self.ssm.get_para('/dc/p01')
+        self.ssm.delete_para('/dc/p01')
+        with self.assertRaises(ParameterError):
+            self.ssm.get_para('/dc/p01')
+
+    def test_values_are_cached_per_account(self):
+        cache = JsonCache(self.path('ssm_cache.json'))
+        AWSSsm(REGION, cache=cache).put_str_para('/dc/shared', 'management')
+        member = AWSSsm(REGION, cache=cache, role_arn='arn:aws:iam::111122223333:role/dc')
+        self.assertEqual(member.get_paras(['/dc/shared']), {})
+
+
+class AWSOrgTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.org = AWSOrg(REGION, org_unit='dreamchaser')
+        self.org.create_organization()
+        self.org.create_ou()
+        # an account named after the OU, under the same parent
+        self.org.client.create_account(AccountName='dreamchaser', Email='dreamchaser@example.com')
+
+    def test_get_ou_arn_skips_accounts_of_the_same_name(self):
+        ou_arn = self.org.get_ou_arn()
+        self.assertIn(':ou/', ou_arn)
+        self.assertEqual(ou_arn, self.org.index.find('dreamchaser', 'ORGANIZATIONAL_UNIT')[0]['Arn'])
+
+    def test_index_keeps_accounts_and_units_apart(self):
+        index = self.org.index
+        root_id = self.org.root_id()
+        self.assertEqual(index.child(root_id, 'dreamchaser', 'ACCOUNT')['Type'], 'ACCOUNT')
+        self.assertEqual(index.child(root_id, 'dreamchaser')['Type'], 'ORGANIZATIONAL_UNIT')
+        self.assertEqual(index.find_path('/Root/dreamchaser', 'ACCOUNT')['Type'], 'ACCOUNT')
+        self.assertEqual(index.find_path('/Root/dreamchaser')['Type'], 'ORGANIZATIONAL_UNIT')
+        self.assertEqual(len(index.find('dreamchaser')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
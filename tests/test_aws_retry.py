@@ -0,0 +1,222 @@
+import os
+import json
+import unittest
+from unittest import mock
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from dreamchaser.aws_client import ClientRegistry
+from dreamchaser.aws_retry import TokenBucket, RetryBudget, RetryPolicy
+from dreamchaser.errors import (
+    DreamChaserError, OrganizationError, OrganizationalUnitError, PolicyTypeError,
+    OrganizationalUnitLookupError, ParameterError, ResourceSharingError, StackError
+)
+from tests.aws_case import REGION
+
+
+class FakeClock():
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+class ClockTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        for target in ('dreamchaser.aws_retry.time', 'botocore.endpoint.time'):
+            patcher = mock.patch(target, self.clock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(ClockTestCase):
+    def test_acquire_waits_for_a_token(self):
+        bucket = TokenBucket(rate=2)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.5)
+        self.clock.now += 2
+        # the bucket holds at most one second of tokens
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.5])
+        self.assertEqual(bucket.stats, {'requests': 5, 'throttled': 0, 'waited': 1.0})
+
+    def test_throttling_decreases_the_rate_once_per_interval(self):
+        bucket = TokenBucket(rate=10, min_rate=2)
+        bucket.throttled()
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 5)
+        self.assertEqual(bucket.tokens, 0.0)
+
+        self.clock.now += 0.2
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 2.5)
+        self.clock.now += 1
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 2)
+        self.assertEqual(bucket.stats['throttled'], 4)
+
+    def test_success_increases_the_rate_up_to_the_ceiling(self):
+        bucket = TokenBucket(rate=1, increase=0.5)
+        for _ in range(3):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 2.5)
+        for _ in range(10):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 5)
+
+
+class RetryBudgetTest(unittest.TestCase):
+    def test_withdraw_until_exhausted(self):
+        budget = RetryBudget(capacity=12, retry_cost=5, timeout_cost=10, refund=1)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw(timeout=True))
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        for _ in range(3):
+            budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertEqual(budget.available, 0)
+
+    def test_deposit_is_capped(self):
+        budget = RetryBudget(capacity=10)
+        budget.deposit()
+        self.assertEqual(budget.available, 10)
+
+
+class Raw():
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class RetryPolicyTest(ClockTestCase):
+    """
+    The requests of an SSM client are answered by canned HTTP responses
+
+    The rate and delays are powers of two, hence the fake clock refills whole
+    tokens.
+    """
+    def setUp(self) -> None:
+        super().setUp()
+        env = mock.patch.dict(os.environ, {
+            'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing', 'AWS_DEFAULT_REGION': REGION
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        # the longest backoff of each retry
+        uniform = mock.patch('dreamchaser.aws_retry.random.uniform', side_effect=lambda low, high: high)
+        uniform.start()
+        self.addCleanup(uniform.stop)
+        self.responses = []
+        self.sent = 0
+
+    def client(self, **kwargs):
+        self.policy = RetryPolicy(rate=8, base_delay=0.25, **kwargs)
+        client = ClientRegistry(retry_policy=self.policy).client('ssm', REGION)
+        client.meta.events.register('before-send.ssm', self.send)
+        return client
+
+    def send(self, request, **kwargs):
+        status_code, body = self.responses[min(self.sent, len(self.responses) - 1)]
+        self.sent += 1
+        return AWSResponse(request.url, status_code, {'x-amzn-requestid': 'id'}, Raw(json.dumps(body).encode()))
+
+    def respond(self, *codes) -> None:
+        for code in codes:
+            if code == 200:
+                self.responses.append((200, {'Parameters': [], 'InvalidParameters': ['/dc/p']}))
+            else:
+                self.responses.append((400 if code.startswith('T') or code == 'ValidationException' else 503,
+                                      {'__type': code, 'message': code}))
+
+    def test_throttled_requests_are_retried_with_backoff(self):
+        client = self.client()
+        self.respond('ThrottlingException', 'ThrottlingException', 200)
+
+        self.assertEqual(client.get_parameters(Names=['/dc/p'])['InvalidParameters'], ['/dc/p'])
+        self.assertEqual(self.sent, 3)
+        self.assertEqual(self.clock.sleeps, [0.25, 0.5])
+        stats = self.policy.stats()[f"ssm:{REGION}"]
+        self.assertEqual((stats['requests'], stats['throttled']), (3, 2))
+        self.assertAlmostEqual(stats['rate'], 8 * 0.5 * 0.5 + 0.2)
+
+    def test_transient_errors_are_retried(self):
+        client = self.client()
+        self.respond('ServiceUnavailable', 200)
+        client.get_parameters(Names=['/dc/p'])
+        self.assertEqual(self.sent, 2)
+
+    def test_other_errors_are_not_retried(self):
+        client = self.client()
+        self.respond('ValidationException')
+        with self.assertRaises(ClientError):
+            client.get_parameters(Names=['/dc/p'])
+        self.assertEqual(self.sent, 1)
+        self.assertEqual(self.policy.budget.available, self.policy.budget.capacity)
+
+    def test_retries_stop_at_max_attempts(self):
+        client = self.client(max_attempts=4)
+        self.respond('ThrottlingException')
+        with self.assertRaises(ClientError) as e:
+            client.get_parameters(Names=['/dc/p'])
+        self.assertEqual(e.exception.response['Error']['Code'], 'ThrottlingException')
+        self.assertEqual(self.sent, 4)
+
+    def test_retries_stop_when_the_budget_is_exhausted(self):
+        client = self.client(budget=RetryBudget(capacity=12, retry_cost=5))
+        self.respond('ThrottlingException')
+        with self.assertRaises(ClientError):
+            client.get_parameters(Names=['/dc/p'])
+        self.assertEqual(self.sent, 3)
+        self.assertEqual(self.policy.budget.available, 2)
+
+        # a successful request refunds the budget
+        self.responses.clear()
+        self.respond(200)
+        self.sent = 0
+        client.get_parameters(Names=['/dc/p'])
+        self.assertEqual(self.policy.budget.available, 3)
+
+    def test_client_errors_map_to_typed_errors(self):
+        client = self.client(max_attempts=1)
+        self.respond('ThrottlingException')
+        try:
+            client.get_parameters(Names=['/dc/p'])
+        except ClientError as e:
+            error = ParameterError.from_client_error(e)
+        self.assertTrue(error.throttled)
+        self.assertEqual(error.error_code, 'ThrottlingException')
+        self.assertEqual(error.exit_code, 197)
+        self.assertEqual(str(error), 'ThrottlingException Error Code: ThrottlingException')
+
+
+class ErrorTest(unittest.TestCase):
+    def test_exit_codes(self):
+        codes = {
+            DreamChaserError: 1,
+            OrganizationError: 127,
+            OrganizationalUnitError: 137,
+            PolicyTypeError: 157,
+            OrganizationalUnitLookupError: 177,
+            ParameterError: 197,
+            ResourceSharingError: 217,
+            StackError: 1
+        }
+        for cls, exit_code in codes.items():
+            with self.subTest(cls.__name__):
+                error = cls('failed', error_code='ValidationError')
+                self.assertIsInstance(error, DreamChaserError)
+                self.assertEqual(error.exit_code, exit_code)
+                self.assertFalse(error.throttled)
+
+    def test_exit_code_override(self):
+        error = StackError('failed', exit_code=400)
+        self.assertEqual(error.exit_code, 400)
+        self.assertEqual(StackError('failed').exit_code, 1)
@@ -0,0 +1,77 @@
+import json
+from unittest import mock
+from dreamchaser.aws_cache import JsonCache
+from dreamchaser.aws_events import TimingLog
+from dreamchaser.aws_stack import CfnStack
+from tests.aws_case import AwsTestCase, REGION
+
+TEMPLATE = json.dumps({
+    'Resources': {'Topic': {'Type': 'AWS::SNS::Topic'}},
+    'Outputs': {'TopicName': {'Value': {'Fn::GetAtt': ['Topic', 'TopicName']}}}
+})
+
+
+class StacksPaginator():
+    # describe_stacks of moto returns every stack in a single page
+    def __init__(self, client, page_size: int) -> None:
+        self.client = client
+        self.page_size = page_size
+        self.pages = 0
+
+    def paginate(self, **kwargs):
+        stacks = self.client.describe_stacks()['Stacks']
+        for i in range(0, len(stacks), self.page_size):
+            self.pages += 1
+            yield {'Stacks': stacks[i:i + self.page_size]}
+
+
+class ExportOutputsTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cfn = CfnStack(REGION, timing_log=TimingLog(self.path('timings.jsonl')))
+        for stack_name in ('dc-a', 'dc-b', 'dc-c', 'other'):
+            self.cfn.client.create_stack(StackName=stack_name, TemplateBody=TEMPLATE)
+        self.paginator = StacksPaginator(self.cfn.client, page_size=2)
+        patcher = mock.patch.object(self.cfn.client, 'get_paginator', return_value=self.paginator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.outputs = JsonCache(self.path('outputs.json'))
+
+    def topic(self, stack_name: str) -> dict:
+        return {'TopicName': self.cfn.client.describe_stacks(StackName=stack_name)['Stacks'][0]['Outputs'][0]['OutputValue']}
+
+    def test_pages_are_merged_into_the_outputs(self):
+        self.outputs.put(f"{REGION}:dc-a", self.topic('dc-a'))
+        self.outputs.put(f"{REGION}:dc-deleted", {'TopicName': 'gone'})
+        self.outputs.put(f"{REGION}:other-deleted", {'TopicName': 'kept'})
+        self.outputs.put('us-east-1:dc-a', {'TopicName': 'kept'})
+
+        report = self.cfn.export_outputs(self.path('outputs.json'), prefix='dc-')
+
+        self.assertEqual(report, {'stacks': 3, 'changed': 2, 'removed': 1})
+        self.assertEqual(self.paginator.pages, 2)
+        self.assertEqual(self.outputs.load(), {
+            f"{REGION}:dc-a": self.topic('dc-a'),
+            f"{REGION}:dc-b": self.topic('dc-b'),
+            f"{REGION}:dc-c": self.topic('dc-c'),
+            f"{REGION}:other-deleted": {'TopicName': 'kept'},
+            'us-east-1:dc-a': {'TopicName': 'kept'}
+        })
+
+    def test_deleted_stacks_are_dropped(self):
+        self.cfn.export_outputs(self.path('outputs.json'))
+        self.assertEqual(self.cfn.get_output('dc-b', 'TopicName'), self.topic('dc-b')['TopicName'])
+        self.cfn.client.delete_stack(StackName='dc-b')
+
+        report = self.cfn.export_outputs(self.path('outputs.json'))
+
+        self.assertEqual(report, {'stacks': 3, 'changed': 0, 'removed': 1})
+        self.assertEqual(sorted(self.outputs.load()), [f"{REGION}:{name}" for name in ('dc-a', 'dc-c', 'other')])
+        self.assertNotIn('dc-b', self.cfn.outputs)
+
+    def test_unchanged_outputs_are_not_rewritten(self):
+        self.cfn.export_outputs(self.path('outputs.json'))
+        with mock.patch.object(JsonCache, 'modify') as modify:
+            report = self.cfn.export_outputs(self.path('outputs.json'))
+        self.assertEqual(report, {'stacks': 4, 'changed': 0, 'removed': 0})
+        modify.assert_not_called()
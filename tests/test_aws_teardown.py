@@ -0,0 +1,91 @@
+import json
+import unittest
+from unittest import mock
+from botocore.exceptions import ClientError
+from dreamchaser.aws_client import get_client
+from dreamchaser.aws_events import TimingLog
+from dreamchaser.aws_teardown import Teardown
+from tests.aws_case import AwsTestCase, REGION
+
+PREFIX = 'DC-TEST-'
+
+
+def _template(export: str=None, imports: str=None) -> str:
+    topic = {'Type': 'AWS::SNS::Topic'}
+    if imports:
+        topic['Properties'] = {'TopicName': {'Fn::ImportValue': imports}}
+    template = {'Resources': {'Topic': topic}}
+    if export:
+        template['Outputs'] = {'Name': {'Value': export, 'Export': {'Name': export}}}
+    return json.dumps(template)
+
+
+class ImportsPaginator():
+    # list_imports is not implemented by moto
+    def __init__(self, imports: dict) -> None:
+        self.imports = imports
+
+    def paginate(self, ExportName: str, **kwargs):
+        if not self.imports.get(ExportName):
+            raise ClientError({'Error': {
+                'Code': 'ValidationError',
+                'Message': f"Export '{ExportName}' is not imported by any stack."
+            }}, 'ListImports')
+        return iter([{'Imports': self.imports[ExportName]}])
+
+
+class TeardownTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        # the app stack imports the export of the vpc stack, the web stack
+        # imports the export of the app stack
+        cfn = get_client('cloudformation', REGION)
+        cfn.create_stack(StackName=f"{PREFIX}VPC", TemplateBody=_template(export='vpc-id'))
+        cfn.create_stack(StackName=f"{PREFIX}APP", TemplateBody=_template(export='app-id', imports='vpc-id'))
+        cfn.create_stack(StackName=f"{PREFIX}WEB", TemplateBody=_template(imports='app-id'))
+        cfn.create_stack(StackName=f"{PREFIX}DNS", TemplateBody=_template(export='zone-id'))
+        cfn.create_stack(StackName='OTHER-VPC', TemplateBody=_template())
+        imports = ImportsPaginator({'vpc-id': [f"{PREFIX}APP"], 'app-id': [f"{PREFIX}WEB"]})
+
+        self.teardown = Teardown(REGION, PREFIX)
+        self.teardown.cfn.timing_log = TimingLog(self.path('timings.jsonl'))
+        get_paginator = self.teardown.cfn.client.get_paginator
+        patcher = mock.patch.object(
+            self.teardown.cfn.client, 'get_paginator',
+            side_effect=lambda name: imports if name == 'list_imports' else get_paginator(name)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dependencies_follow_the_imports(self):
+        self.teardown.discover()
+        self.assertEqual(self.teardown.dependencies(), {
+            f"{PREFIX}VPC": {f"{PREFIX}APP"},
+            f"{PREFIX}APP": {f"{PREFIX}WEB"},
+            f"{PREFIX}WEB": set(),
+            f"{PREFIX}DNS": set()
+        })
+
+    def test_importers_are_deleted_before_exporters(self):
+        order = self.teardown.run(dry_run=True)['order']
+        self.assertEqual(sorted(order), [f"{PREFIX}APP", f"{PREFIX}DNS", f"{PREFIX}VPC", f"{PREFIX}WEB"])
+        self.assertLess(order.index(f"{PREFIX}WEB"), order.index(f"{PREFIX}APP"))
+        self.assertLess(order.index(f"{PREFIX}APP"), order.index(f"{PREFIX}VPC"))
+
+    def test_run_deletes_the_stacks_of_the_prefix(self):
+        report = self.teardown.run()
+        tasks = report['tasks']
+        self.assertTrue(all(result['status'] == 'SUCCEEDED' for result in tasks.values()))
+        self.assertGreaterEqual(tasks[f"{PREFIX}APP"]['start'], tasks[f"{PREFIX}WEB"]['end'])
+        self.assertGreaterEqual(tasks[f"{PREFIX}VPC"]['start'], tasks[f"{PREFIX}APP"]['end'])
+
+        remaining = [
+            stack['StackName'] for stack in self.teardown.cfn.client.describe_stacks()['Stacks']
+            if stack['StackStatus'] != 'DELETE_COMPLETE'
+        ]
+        self.assertEqual(remaining, ['OTHER-VPC'])
+
+
+if __name__ == '__main__':
+    unittest.main()
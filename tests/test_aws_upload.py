@@ -0,0 +1,67 @@
+import os
+import unittest
+from dreamchaser.aws_client import get_client
+from dreamchaser.aws_upload import AssetUploader, parse_s3_url, is_content_addressed
+from tests.aws_case import AwsTestCase, REGION
+
+BUCKET = 'dreamchaser-assets'
+
+
+class AssetUploaderTest(AwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        get_client('s3', REGION).create_bucket(
+            Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': REGION}
+        )
+        for name, content in (('a.json', 'same'), ('b.json', 'same'), ('c.zip', 'other')):
+            with open(os.path.join(self.directory, name), 'w') as fasset:
+                fasset.write(content)
+
+    def uploader(self):
+        uploader = AssetUploader(BUCKET, REGION)
+        calls = []
+        handler = lambda model, **kwargs: calls.append(model.name)
+        uploader.client.meta.events.register('before-call.s3', handler)
+        self.addCleanup(uploader.client.meta.events.unregister, 'before-call.s3', handler)
+        return uploader, calls
+
+    def test_identical_files_are_uploaded_once(self):
+        uploader, calls = self.uploader()
+        keys = uploader.upload_dir(self.directory)
+
+        self.assertEqual(keys['a.json'], keys['b.json'])
+        self.assertNotEqual(keys['a.json'], keys['c.zip'])
+        self.assertEqual(calls.count('PutObject'), 2)
+        self.assertEqual(uploader.stats['uploaded'], 2)
+
+    def test_existing_objects_are_skipped(self):
+        uploader, _ = self.uploader()
+        uploader.upload_dir(self.directory)
+
+        uploader, calls = self.uploader()
+        uploader.upload_dir(self.directory)
+        self.assertEqual(calls, ['ListObjectsV2'])
+        self.assertEqual(uploader.stats['uploaded'], 0)
+
+    def test_keys_are_computed_without_requests(self):
+        uploader, calls = self.uploader()
+        keys = uploader.dir_keys(self.directory)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(keys, uploader.upload_dir(self.directory))
+        self.assertTrue(all(is_content_addressed(uploader.url(key)) for key in keys.values()))
+
+
+class S3UrlTest(unittest.TestCase):
+    def test_parse_s3_url(self):
+        self.assertEqual(parse_s3_url('https://bucket.s3.ap-southeast-2.amazonaws.com/a/b.json'), ('bucket', 'a/b.json'))
+        self.assertEqual(parse_s3_url('https://s3.ap-southeast-2.amazonaws.com/bucket/a/b.json'), ('bucket', 'a/b.json'))
+        self.assertEqual(parse_s3_url('s3://bucket/a%20b.json'), ('bucket', 'a b.json'))
+
+    def test_is_content_addressed(self):
+        self.assertTrue(is_content_addressed(f"https://s3.amazonaws.com/bucket/assets/{'0' * 64}.json"))
+        self.assertFalse(is_content_addressed('https://s3.amazonaws.com/bucket/vpc.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import gzip
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from dreamchaser.flow_logs import HeavyHitters, TopTalkers, read_text, analyze, log_format
+
+# version account-id interface-id srcaddr dstaddr srcport dstport protocol
+# packets bytes start end action log-status
+DEFAULT_LINES = [
+    '2 123456789012 eni-1 10.0.1.10 10.64.0.5 443 50000 6 10 1000 1700000000 1700000060 ACCEPT OK',
+    '2 123456789012 eni-1 10.0.1.10 8.8.8.8 50001 53 17 2 200 1700000000 1700000060 ACCEPT OK',
+    '2 123456789012 eni-2 10.0.2.20 10.64.0.5 50002 443 6 5 500 1700000000 1700000060 REJECT OK',
+    '2 123456789012 eni-3 - - - - - - - 1700000000 1700000060 - NODATA',
+    '2 123456789012 eni-3 truncated',
+    '2 123456789012 eni-1 10.0.1.10 10.64.0.5 443 50000 6 10 3000 1700000060 1700000120 ACCEPT OK'
+]
+
+
+def stream(seed: int, length: int=5000) -> list:
+    # a few heavy keys over a long tail of light ones
+    rng = random.Random(seed)
+    return [
+        (f"heavy{rng.randrange(5)}", rng.randrange(50, 100)) if rng.random() < 0.3
+        else (f"light{rng.randrange(2000)}", rng.randrange(1, 10))
+        for _ in range(length)
+    ]
+
+
+def totals(items: list) -> Counter:
+    counts = Counter()
+    for key, weight in items:
+        counts[key] += weight
+    return counts
+
+
+class HeavyHittersTest(unittest.TestCase):
+    def test_counts_are_exact_without_pruning(self):
+        items = stream(1, 200)
+        hitters = HeavyHitters(capacity=2000)
+        for key, weight in items:
+            hitters.add(key, weight)
+
+        self.assertEqual(hitters.error, 0)
+        self.assertEqual(hitters.counts, dict(totals(items)))
+        self.assertEqual(hitters.top(5), totals(items).most_common(5))
+
+    def test_error_bounds_the_undercount(self):
+        items = stream(2)
+        hitters = HeavyHitters(capacity=20)
+        for key, weight in items:
+            hitters.add(key, weight)
+
+        self.assertGreater(hitters.error, 0)
+        self.assertLessEqual(len(hitters.counts), 40)
+        for key, total in totals(items).items():
+            count = hitters.counts.get(key, 0)
+            self.assertLessEqual(count, total)
+            self.assertGreaterEqual(count, total - hitters.error)
+            if total > hitters.error:
+                self.assertIn(key, hitters.counts)
+        self.assertEqual([key for key, _ in hitters.top(5)], [key for key, _ in totals(items).most_common(5)])
+
+    def test_merge_equals_a_single_pass(self):
+        items = stream(3, 400)
+        single, first, second = HeavyHitters(2000), HeavyHitters(2000), HeavyHitters(2000)
+        for index, (key, weight) in enumerate(items):
+            single.add(key, weight)
+            (first if index % 2 else second).add(key, weight)
+        first.merge(second)
+
+        self.assertEqual(first.counts, single.counts)
+        self.assertEqual(first.error, 0)
+
+    def test_merge_keeps_the_error_bound(self):
+        items = stream(4)
+        first, second = HeavyHitters(20), HeavyHitters(20)
+        for index, (key, weight) in enumerate(items):
+            (first if index % 2 else second).add(key, weight)
+        first.merge(second)
+
+        for key, total in totals(items).items():
+            self.assertGreaterEqual(first.counts.get(key, 0), total - first.error)
+
+
+class FlowLogTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name: str, lines: list) -> str:
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt') as flog:
+            flog.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_read_text_without_header(self):
+        for name in ('default.log', 'default.log.gz'):
+            with self.subTest(name):
+                batches = list(read_text(self.write(name, DEFAULT_LINES), chunk_size=64))
+                records = [record for batch in batches for record in batch]
+
+                self.assertGreater(len(batches), 2)
+                # the NODATA record has no addresses, the truncated one is skipped
+                self.assertEqual(len(records), 5)
+                self.assertEqual(records[0], ('10.0.1.10', '10.64.0.5', '1000', None, None, None, None))
+                self.assertEqual(records[3], (None, None, None, None, None, None, None))
+
+    def test_read_text_with_header(self):
+        fields = log_format().replace('${', '').replace('}', '')
+        line = ('5 123456789012 eni-1 10.0.1.10 52.95.0.1 443 50000 6 10 1000 1700000000 1700000060 '
+                'ACCEPT OK vpc-1 subnet-1 apse2-az1 egress 10.0.9.9 52.95.0.1')
+        records = next(read_text(self.write('custom.log', [fields, line])))
+        self.assertEqual(records, [('10.0.1.10', '52.95.0.1', '1000', 'subnet-1', 'apse2-az1', '10.0.9.9', '52.95.0.1')])
+
+    def test_top_talkers(self):
+        talkers = TopTalkers(dest_cidrs=['10.64.0.0/16', '0.0.0.0/0'])
+        for records in read_text(self.write('default.log', DEFAULT_LINES)):
+            talkers.add(records)
+
+        self.assertEqual((talkers.records, talkers.bytes), (4, 4700))
+        report = talkers.report()
+        self.assertEqual(list(report['dest']), ['10.64.0.0/16', '0.0.0.0/0'])
+        self.assertEqual(report['dest']['10.64.0.0/16']['talkers'], [
+            (('10.0.1.10', '10.64.0.5'), 4000), (('10.0.2.20', '10.64.0.5'), 500)
+        ])
+        self.assertEqual(report['subnet']['unknown']['bytes'], 4700)
+        self.assertEqual(talkers.destination('not-an-address'), 'unknown')
+
+    def test_analyze_merges_the_files(self):
+        paths = [self.write(f"part{i}.log", DEFAULT_LINES[i::2]) for i in range(2)]
+        single = analyze(paths)
+        merged = analyze([self.directory], max_workers=2)
+
+        self.assertEqual((merged.records, merged.bytes), (single.records, single.bytes))
+        self.assertEqual(merged.report(), single.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
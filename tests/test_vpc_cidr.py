@@ -0,0 +1,96 @@
+import ipaddress
+import unittest
+from vpc.vpc_cidr import CidrIndex, CidrPlanner, collapse_cidrs
+
+
+class CidrPlannerTest(unittest.TestCase):
+    def test_allocate_takes_the_lowest_free_block(self):
+        planner = CidrPlanner('10.0.0.0/16')
+        self.assertEqual(str(planner.allocate(24, 'a')), '10.0.0.0/24')
+        self.assertEqual(str(planner.allocate(20, 'b')), '10.0.16.0/20')
+        self.assertEqual(str(planner.allocate(24, 'c')), '10.0.1.0/24')
+        self.assertEqual(planner.index.get('10.0.16.0/20'), 'b')
+
+    def test_allocate_raises_when_exhausted(self):
+        planner = CidrPlanner('10.0.0.0/24')
+        blocks = [planner.allocate(26) for _ in range(4)]
+        self.assertEqual([str(block) for block in blocks],
+                            ['10.0.0.0/26', '10.0.0.64/26', '10.0.0.128/26', '10.0.0.192/26'])
+        with self.assertRaises(ValueError):
+            planner.allocate(28)
+        with self.assertRaises(ValueError):
+            planner.allocate(16)
+
+    def test_reserve_rejects_overlaps_and_outside_blocks(self):
+        planner = CidrPlanner('10.0.0.0/16')
+        planner.reserve('10.0.4.0/22', 'db')
+        with self.assertRaisesRegex(ValueError, 'overlaps 10.0.4.0/22 \\(db\\)'):
+            planner.reserve('10.0.5.0/24', 'app')
+        with self.assertRaisesRegex(ValueError, 'overlaps'):
+            planner.reserve('10.0.0.0/20', 'app')
+        with self.assertRaisesRegex(ValueError, 'not within'):
+            planner.reserve('10.1.0.0/24', 'app')
+        # allocations skip the reserved block
+        self.assertEqual(str(planner.allocate(22)), '10.0.0.0/22')
+        self.assertEqual(str(planner.allocate(22)), '10.0.8.0/22')
+
+    def test_plan_packs_blocks_without_gaps(self):
+        planner = CidrPlanner('10.0.0.0/16')
+        blocks = planner.plan([('small', 26), ('large', 24), ('medium', 25)])
+        self.assertEqual([str(block) for block in blocks], ['10.0.1.128/26', '10.0.0.0/24', '10.0.1.0/25'])
+
+    def test_ipv6_ranges(self):
+        planner = CidrPlanner('2001:db8::/56')
+        self.assertEqual(str(planner.allocate(64, 'a')), '2001:db8::/64')
+        planner.reserve('2001:db8:0:80::/57', 'b')
+        self.assertEqual(str(planner.allocate(60)), '2001:db8:0:10::/60')
+        with self.assertRaises(ValueError):
+            planner.reserve('10.0.0.0/24')
+        with self.assertRaises(ValueError):
+            planner.allocate(56)
+
+
+class CidrIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = CidrIndex()
+        for cidr in ('10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24', '192.168.0.0/16', '2001:db8::/32', '2001:db8:1::/48'):
+            self.index.add(cidr, cidr)
+
+    def test_overlaps(self):
+        self.assertEqual(sorted(map(str, self.index.overlaps('10.1.0.0/20'))),
+                            ['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24'])
+        self.assertEqual(self.index.overlaps('172.16.0.0/12'), [])
+        self.assertEqual(sorted(map(str, self.index.subnets('10.0.0.0/8'))), ['10.1.0.0/16', '10.1.2.0/24'])
+        self.assertEqual(list(map(str, self.index.overlaps('2001:db8:1:1::/64'))), ['2001:db8::/32', '2001:db8:1::/48'])
+
+    def test_longest_match(self):
+        self.assertEqual(str(self.index.longest_match('10.1.2.3')), '10.1.2.0/24')
+        self.assertEqual(str(self.index.longest_match('10.1.3.3')), '10.1.0.0/16')
+        self.assertEqual(str(self.index.longest_match('10.2.0.0/16')), '10.0.0.0/8')
+        self.assertEqual(str(self.index.longest_match('2001:db8:1::1')), '2001:db8:1::/48')
+        self.assertIsNone(self.index.longest_match('172.16.0.1'))
+
+    def test_remove(self):
+        self.index.remove('10.1.2.0/24')
+        self.assertNotIn('10.1.2.0/24', self.index)
+        self.assertEqual(str(self.index.longest_match('10.1.2.3')), '10.1.0.0/16')
+        self.assertEqual(len(self.index), 5)
+
+
+class CollapseCidrsTest(unittest.TestCase):
+    def test_collapse_merges_adjacent_nested_and_duplicated_blocks(self):
+        self.assertEqual(
+            collapse_cidrs(['10.0.1.0/24', '10.0.0.0/24', '10.0.0.128/25', '10.0.1.0/24', '192.168.0.0/24']),
+            ['10.0.0.0/23', '192.168.0.0/24']
+        )
+
+    def test_collapse_lists_ipv4_before_ipv6(self):
+        self.assertEqual(
+            collapse_cidrs(['2001:db8::/49', '10.0.0.0/24', '2001:db8:0:8000::/49']),
+            ['10.0.0.0/24', '2001:db8::/48']
+        )
+        self.assertEqual(collapse_cidrs([ipaddress.ip_network('10.0.0.0/24')]), ['10.0.0.0/24'])
+
+
+if __name__ == '__main__':
+    unittest.main()
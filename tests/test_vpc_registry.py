@@ -0,0 +1,65 @@
+import unittest
+from dreamchaser.aws_client import get_client
+from vpc.vpc_registry import CidrRegistry, FileRegistryStore, SsmRegistryStore
+from tests.aws_case import AwsTestCase, REGION
+
+
+class RegistryBackendTest():
+    # the behaviour shared by every registry store, mixed into a test case
+    # providing store()
+
+    def test_register_and_reload(self):
+        registry = CidrRegistry(store=self.store())
+        registry.register('111', REGION, 'hub', '10.0.0.0/16')
+        registry.register('222', REGION, 'spoke', '10.1.0.0/16')
+
+        reloaded = CidrRegistry(store=self.store())
+        self.assertEqual(reloaded.lookup('10.1.2.3'), (f"222/{REGION}/spoke", '10.1.0.0/16'))
+        self.assertEqual(reloaded.overlaps('10.0.0.0/15'), {
+            f"111/{REGION}/hub": '10.0.0.0/16', f"222/{REGION}/spoke": '10.1.0.0/16'
+        })
+
+    def test_register_rejects_overlaps(self):
+        registry = CidrRegistry(store=self.store())
+        registry.register('111', REGION, 'hub', '10.0.0.0/16')
+        with self.assertRaisesRegex(ValueError, 'overlaps 10.0.0.0/16'):
+            registry.register('222', REGION, 'spoke', '10.0.128.0/17')
+        # registering a VPC again replaces its own CIDR
+        registry.register('111', REGION, 'hub', '10.0.0.0/17')
+        self.assertEqual(CidrRegistry(store=self.store()).cidrs[f"111/{REGION}/hub"].prefixlen, 17)
+
+    def test_release(self):
+        registry = CidrRegistry(store=self.store())
+        registry.register('111', REGION, 'hub', '2001:db8::/56')
+        registry.release('111', REGION, 'hub')
+        self.assertIsNone(CidrRegistry(store=self.store()).lookup('2001:db8::1'))
+
+    def test_check_route(self):
+        registry = CidrRegistry(store=self.store())
+        local = registry.register('111', REGION, 'hub', '10.0.0.0/16')
+        registry.register('222', REGION, 'spoke', '10.1.0.0/16')
+        self.assertEqual(registry.check_route('10.1.0.0/24', local_key=local), {f"222/{REGION}/spoke": '10.1.0.0/16'})
+        self.assertEqual(registry.contained('10.0.0.0/8'), {
+            f"111/{REGION}/hub": '10.0.0.0/16', f"222/{REGION}/spoke": '10.1.0.0/16'
+        })
+        with self.assertRaisesRegex(ValueError, 'local VPC'):
+            registry.check_route('10.0.1.0/24', local_key=local)
+
+
+class FileRegistryTest(RegistryBackendTest, AwsTestCase):
+    def store(self):
+        return FileRegistryStore(self.path('cidr_registry.json'))
+
+
+class SsmRegistryTest(RegistryBackendTest, AwsTestCase):
+    def store(self):
+        return SsmRegistryStore(REGION, path='/dreamchaser/cidr-registry', cache_path=self.path('ssm_cache.json'))
+
+    def test_vpcs_are_parameters_under_the_path(self):
+        CidrRegistry(store=self.store()).register('111', REGION, 'hub', '10.0.0.0/16')
+        value = get_client('ssm', REGION).get_parameter(Name=f"/dreamchaser/cidr-registry/111/{REGION}/hub")
+        self.assertEqual(value['Parameter']['Value'], '10.0.0.0/16')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION', '1')
+
+from aws_cdk import App, Environment, Fn
+from aws_cdk.assertions import Template
+from vpc.vpc_core import VPCStack, MainStack
+from vpc.vpc_registry import CidrRegistry
+
+
+class AddRoutesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = App()
+        main = MainStack(self.app, 'Main', env=Environment(account='111111111111', region='ap-southeast-2'))
+        self.vpc_stack = VPCStack(main, 'Vpc')
+
+    def template(self) -> Template:
+        return Template.from_stack(self.vpc_stack)
+
+    def test_mixed_families_get_one_prefix_list_each(self):
+        report = self.vpc_stack.add_routes('Route', ['rtb-1'], [
+            '10.0.0.0/16', '172.16.0.0/16', '2001:db8::/48', '2001:db8:1::/48', '2001:db9::/48'
+        ], prefix_list=True, gateway_id='igw-1')
+
+        template = self.template()
+        prefix_lists = template.find_resources('AWS::EC2::PrefixList')
+        self.assertEqual(
+            sorted(resource['Properties']['AddressFamily'] for resource in prefix_lists.values()),
+            ['IPv4', 'IPv6']
+        )
+        template.resource_count_is('AWS::EC2::Route', 2)
+        self.assertEqual(report['resources'], 4)
+
+    def test_mixed_families_without_prefix_list(self):
+        self.vpc_stack.add_routes('Route', ['rtb-1'], ['10.0.0.0/16', '2001:db8::/48'],
+                                    prefix_list=True, gateway_id='igw-1')
+
+        template = self.template()
+        template.resource_count_is('AWS::EC2::PrefixList', 0)
+        routes = template.find_resources('AWS::EC2::Route').values()
+        self.assertEqual(
+            sorted(key for route in routes for key in route['Properties'] if key.startswith('Destination')),
+            ['DestinationCidrBlock', 'DestinationIpv6CidrBlock']
+        )
+
+    def test_prefix_list_rejects_mixed_families(self):
+        with self.assertRaises(ValueError):
+            self.vpc_stack.prefix_list(['10.0.0.0/16', '2001:db8::/48'])
+
+
+class CheckTgwRouteTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        main = MainStack(App(), 'Main', env=Environment(account='111111111111', region='ap-southeast-2'))
+        self.vpc_stack = VPCStack(main, 'Vpc')
+        self.vpc_stack.cidr_registry = CidrRegistry(path=os.path.join(self.directory, 'registry.json'))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def test_tokenized_destination_is_not_checked(self):
+        self.assertEqual(self.vpc_stack.check_tgw_route(Fn.import_value('SpokeCidr')), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import unittest
+
+os.environ.setdefault('JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION', '1')
+
+from aws_cdk import App, Environment
+from vpc.vpc_core import VPCStack, MainStack
+from vpc.vpc_routing import RoutingPolicy, CrossAzError
+
+ZONES = ['ap-southeast-2a', 'ap-southeast-2b', 'ap-southeast-2c']
+
+
+class RoutingPolicyTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.messages = []
+
+    def policy(self, **kwargs) -> RoutingPolicy:
+        policy = RoutingPolicy(on_cross_az=self.messages.append, **kwargs)
+        for zone in ZONES:
+            policy.add_route_table(f"rtb-{zone[-1]}", f"Private {zone}", zone)
+        policy.add_target('nat-a', 'nat', ZONES[:1], name='NatGateway a')
+        policy.add_target('tgw-attach', 'tgw', ZONES)
+        return policy
+
+    def test_strict_mode_raises_on_cross_az_hops(self):
+        policy = self.policy(strict=True)
+        self.assertFalse(policy.route('rtb-a', 'nat-a')['cross_az'])
+        with self.assertRaisesRegex(CrossAzError, 'Private ap-southeast-2b in ap-southeast-2b reaches nat'):
+            policy.route('rtb-b', 'nat-a')
+        self.assertEqual(policy.cross_az(), [])
+
+    def test_strict_mode_accepts_the_allowed_kinds(self):
+        policy = self.policy(strict=True, allow=['nat'])
+        hop = policy.route('rtb-b', 'nat-a')
+
+        self.assertEqual(hop['target_zone'], 'ap-southeast-2a')
+        self.assertEqual(policy.cross_az(), [hop])
+        self.assertEqual(self.messages, [
+            'Route table Private ap-southeast-2b in ap-southeast-2b reaches nat NatGateway a in ap-southeast-2a'
+        ])
+
+    def test_hops_are_recorded_once(self):
+        policy = self.policy()
+        policy.route('rtb-c', 'nat-a')
+        policy.route('rtb-c', 'nat-a')
+        self.assertEqual(len(policy.hops), 1)
+        self.assertEqual(len(self.messages), 1)
+
+    def test_untracked_hops_are_not_checked(self):
+        policy = self.policy(strict=True)
+        self.assertIsNone(policy.route('rtb-b', 'nat-other-stack'))
+        self.assertIsNone(policy.route('rtb-other-stack', 'nat-a'))
+
+    def test_endpoints_are_reached_from_every_route_table(self):
+        policy = self.policy()
+        policy.add_target('endpoints', 'endpoint', ZONES[:2])
+        policy.add_route_table('rtb-d', 'Isolated ap-southeast-2c', 'ap-southeast-2c')
+
+        cross_az = policy.cross_az()
+        self.assertEqual([(hop['route_table'], hop['target_zone']) for hop in cross_az], [
+            ('Private ap-southeast-2c', 'ap-southeast-2a'), ('Isolated ap-southeast-2c', 'ap-southeast-2a')
+        ])
+
+    def test_matrix(self):
+        policy = self.policy()
+        for zone in ZONES:
+            policy.route(f"rtb-{zone[-1]}", 'nat-a')
+            policy.route(f"rtb-{zone[-1]}", 'tgw-attach')
+        self.assertEqual(policy.matrix()['Private ap-southeast-2c'], {
+            'zone': 'ap-southeast-2c', 'nat': ['ap-southeast-2a'], 'tgw': ['ap-southeast-2c']
+        })
+
+    def test_unknown_kinds(self):
+        with self.assertRaises(ValueError):
+            RoutingPolicy(allow=['peering'])
+        with self.assertRaises(ValueError):
+            RoutingPolicy().add_target('pcx-1', 'peering', ZONES)
+
+
+class VpcRoutingTest(unittest.TestCase):
+    def vpc_stack(self, vpc_ha: bool=False, **context) -> VPCStack:
+        app = App(context=dict({
+            'DC_VPC_CIDR': '10.10.0.0/16',
+            'DC_VPC_HA': vpc_ha,
+            'DC_DEST_CIDR': '10.64.0.0/16',
+            'availability-zones:account=111111111111:region=ap-southeast-2': ZONES
+        }, **context))
+        main = MainStack(app, 'Main', env=Environment(account='111111111111', region='ap-southeast-2'))
+        vpc_stack = VPCStack(main, 'Vpc')
+        vpc_stack.easy_vpc()
+        return vpc_stack
+
+    def nat_zones(self, vpc_stack: VPCStack) -> dict:
+        return {
+            name: entry['nat'] for name, entry in vpc_stack.routing.matrix().items() if 'nat' in entry
+        }
+
+    def test_single_nat_gateway_without_vpc_ha(self):
+        vpc_stack = self.vpc_stack()
+
+        # the private and the transit gateway attachment subnets of every zone
+        # egress via the Nat Gateway of the first zone
+        nat_zones = self.nat_zones(vpc_stack)
+        self.assertEqual(sorted(name.split()[0] for name in nat_zones), ['DCPrivateSubnets'] * 3 + ['TGWAttach'] * 3)
+        self.assertEqual({tuple(zones) for zones in nat_zones.values()}, {('ap-southeast-2a',)})
+        self.assertEqual(vpc_stack.routing.matrix()['DCPrivateSubnets ap-southeast-2b'], {
+            'zone': 'ap-southeast-2b', 'nat': ['ap-southeast-2a'], 'tgw': ['ap-southeast-2b']
+        })
+        warnings = [
+            entry.data for entry in vpc_stack.node.metadata
+            if entry.type == 'aws:cdk:warning' and ' reaches nat ' in entry.data
+        ]
+        self.assertEqual(len(warnings), 4)
+
+    def test_nat_gateway_per_zone_with_vpc_ha(self):
+        vpc_stack = self.vpc_stack(vpc_ha=True)
+
+        nat_zones = self.nat_zones(vpc_stack)
+        self.assertEqual(len(nat_zones), 6)
+        for name, zones in nat_zones.items():
+            self.assertEqual(zones, [vpc_stack.routing.matrix()[name]['zone']])
+        self.assertFalse([hop for hop in vpc_stack.routing.cross_az() if hop['kind'] == 'nat'])
+
+    def test_strict_routing(self):
+        with self.assertRaises(CrossAzError):
+            self.vpc_stack(DC_ROUTING_STRICT=True)
+        vpc_stack = self.vpc_stack(DC_ROUTING_STRICT=True, DC_ROUTING_ALLOW=['nat', 'endpoint'])
+        self.assertTrue(vpc_stack.routing.strict)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION', '1')
+
+from aws_cdk import App, Environment, aws_ec2 as ec2
+from aws_cdk.assertions import Template
+from vpc.vpc_core import VPCStack, MainStack
+from vpc.vpc_tgw import RouteDomains
+
+SPEC = {
+    'domains': {
+        'shared': {'reach': ['prod', 'non-prod', 'egress']},
+        'prod': {
+            'reach': ['shared', 'egress'], 'isolated': True,
+            'routes': {'0.0.0.0/0': 'egress', '10.9.0.0/16': None}
+        },
+        'non-prod': {'reach': ['shared', 'egress']},
+        'egress': {'reach': ['shared', 'prod', 'non-prod'], 'isolated': True},
+        'monitoring': {'reach': ['prod']}
+    },
+    'attachments': {
+        'egress': {'domain': 'egress', 'cidrs': ['10.0.0.0/16']},
+        'shared': {'domain': 'shared', 'cidrs': ['10.1.0.0/16']},
+        'app1': {'domain': 'prod', 'cidrs': ['10.2.0.0/16'], 'attachment_id': 'tgw-attach-1'},
+        'app2': {'domain': 'prod', 'cidrs': ['10.3.0.0/16']},
+        'dev1': {'domain': 'non-prod', 'cidrs': ['10.4.0.0/16']},
+        'dev2': {'domain': 'non-prod', 'cidrs': ['10.5.0.0/16']},
+        'monitor': {'domain': 'monitoring', 'cidrs': ['10.6.0.0/16']}
+    }
+}
+
+
+class RouteDomainsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.domains = RouteDomains.from_dict(SPEC)
+
+    def test_effective_routes(self):
+        self.assertEqual(self.domains.effective_routes()['prod'], {
+            '10.1.0.0/16': {'attachments': ['shared'], 'origin': 'propagated'},
+            '10.0.0.0/16': {'attachments': ['egress'], 'origin': 'propagated'},
+            '0.0.0.0/0': {'attachments': ['egress'], 'origin': 'static'},
+            '10.9.0.0/16': {'attachments': [], 'origin': 'static'}
+        })
+        self.assertEqual(
+            sorted(self.domains.effective_routes()['non-prod']),
+            ['10.0.0.0/16', '10.1.0.0/16', '10.4.0.0/16', '10.5.0.0/16']
+        )
+
+    def test_propagations(self):
+        # one propagation per domain reaching the domain of a spoke
+        self.assertEqual(
+            sorted(domain for name, domain in self.domains.propagations() if name == 'app1'),
+            ['egress', 'monitoring', 'shared']
+        )
+        self.assertIn(('app1', 'prod'), self.domains.associations())
+
+    def test_reachable_in_both_directions(self):
+        self.assertEqual(self.domains.reachable('app1', 'shared'),
+                            {'forward': True, 'return': True, 'reachable': True})
+        self.assertTrue(self.domains.reachable('dev1', 'dev2')['reachable'])
+        # the spokes of an isolated domain are kept apart
+        self.assertEqual(self.domains.reachable('app1', 'app2'),
+                            {'forward': False, 'return': False, 'reachable': False})
+
+    def test_return_traffic_is_checked(self):
+        # monitoring reaches prod, whereas prod routes monitoring to egress
+        self.assertEqual(self.domains.reachable('monitor', 'app1'),
+                            {'forward': True, 'return': False, 'reachable': False})
+        self.assertEqual(self.domains.lookup('prod', '10.6.0.0/16'), ['egress'])
+
+    def test_blackhole(self):
+        self.assertEqual(self.domains.lookup('prod', '10.9.1.1'), [])
+        self.assertEqual(self.domains.lookup('prod', '10.8.1.1'), ['egress'])
+
+    def test_egress_default_route(self):
+        self.assertEqual(self.domains.lookup('prod', '8.8.8.8'), ['egress'])
+        self.assertEqual(self.domains.lookup('prod', '10.1.2.3'), ['shared'])
+        self.assertEqual(self.domains.lookup('non-prod', '8.8.8.8'), [])
+
+    def test_conflicts(self):
+        self.assertEqual(self.domains.conflicts(), [])
+        self.domains.add_attachment('app3', 'prod', ['10.2.0.0/16'])
+        self.assertEqual(
+            [(domain, cidr) for domain, cidr, attachments in self.domains.conflicts()],
+            [('shared', '10.2.0.0/16'), ('egress', '10.2.0.0/16'), ('monitoring', '10.2.0.0/16')]
+        )
+        self.assertEqual(self.domains.lookup('shared', '10.2.0.1'), ['app1', 'app3'])
+
+        # a static route takes precedence over the propagated ones
+        self.domains.add_static_route('shared', '10.2.0.0/16', 'app1')
+        self.assertNotIn('shared', [domain for domain, _, _ in self.domains.conflicts()])
+        self.assertEqual(self.domains.lookup('shared', '10.2.0.1'), ['app1'])
+
+    def test_check(self):
+        failed = self.domains.check([('app1', 'shared', True), ('app1', 'app2', True), ('dev1', 'app1', False)])
+        self.assertEqual([(source, destination) for source, destination, _, _ in failed], [('app1', 'app2')])
+
+    def test_invalid_specifications(self):
+        with self.assertRaises(ValueError):
+            self.domains.add_domain('prod')
+        with self.assertRaises(ValueError):
+            self.domains.add_attachment('app1', 'prod', ['10.7.0.0/16'])
+        with self.assertRaises(ValueError):
+            self.domains.add_attachment('app4', 'staging', ['10.7.0.0/16'])
+        with self.assertRaises(ValueError):
+            self.domains.add_static_route('prod', '0.0.0.0/0', 'unknown')
+
+    def test_load_a_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'domains.json')
+        with open(path, 'w') as fspec:
+            json.dump(SPEC, fspec)
+        self.assertEqual(RouteDomains.load(path).effective_routes(), self.domains.effective_routes())
+
+
+class VpnAttachmentsTest(unittest.TestCase):
+    CONNECTIONS = [
+        {'name': 'Sydney', 'ip_address': '203.0.113.10', 'bgp_asn': 65010},
+        {'name': 'Melbourne', 'ip_address': '203.0.113.20', 'bgp_asn': 65020,
+         'tunnel_options': [{'tunnel_inside_cidr': '169.254.10.0/30'}, {'tunnel_inside_cidr': '169.254.11.0/30'}]},
+        {'name': 'Perth', 'ip_address': '203.0.113.30', 'bgp_asn': 65030, 'static_routes_only': True}
+    ]
+
+    def setUp(self) -> None:
+        main = MainStack(App(), 'Main', env=Environment(account='111111111111', region='ap-southeast-2'))
+        self.vpc_stack = VPCStack(main, 'Vpc')
+        self.vpc_stack.create_tgw(scope_id='TGW')
+        self.route_table = ec2.CfnTransitGatewayRouteTable(self.vpc_stack, 'OnPremRt',
+            transit_gateway_id=self.vpc_stack.tgw.ref)
+        self.spoke_route_table = ec2.CfnTransitGatewayRouteTable(self.vpc_stack, 'SpokeRt',
+            transit_gateway_id=self.vpc_stack.tgw.ref)
+
+    def add_vpn_attachments(self, connections: list=CONNECTIONS) -> dict:
+        return self.vpc_stack.add_vpn_attachments('OnPrem', connections, route_table=self.route_table,
+                                                    propagate_to=[self.route_table, self.spoke_route_table])
+
+    def ref(self, construct) -> dict:
+        return {'Ref': self.vpc_stack.get_logical_id(construct)}
+
+    def test_customer_gateway_and_connection_per_connection(self):
+        self.add_vpn_attachments()
+        template = Template.from_stack(self.vpc_stack)
+
+        gateways = template.find_resources('AWS::EC2::CustomerGateway')
+        self.assertEqual(
+            sorted((gateway['Properties']['IpAddress'], gateway['Properties']['BgpAsn']) for gateway in gateways.values()),
+            [('203.0.113.10', 65010), ('203.0.113.20', 65020), ('203.0.113.30', 65030)]
+        )
+        connections = {
+            gateways[connection['Properties']['CustomerGatewayId']['Ref']]['Properties']['IpAddress']: connection['Properties']
+            for connection in template.find_resources('AWS::EC2::VPNConnection').values()
+        }
+        self.assertEqual(len(connections), 3)
+        self.assertEqual(connections['203.0.113.10']['TransitGatewayId'], self.ref(self.vpc_stack.tgw))
+        self.assertEqual(
+            [connection['StaticRoutesOnly'] for _, connection in sorted(connections.items())], [False, False, True]
+        )
+        self.assertEqual(connections['203.0.113.20']['VpnTunnelOptionsSpecifications'], [
+            {'TunnelInsideCidr': '169.254.10.0/30'}, {'TunnelInsideCidr': '169.254.11.0/30'}
+        ])
+        self.assertNotIn('VpnTunnelOptionsSpecifications', connections['203.0.113.10'])
+
+    def test_attachments_are_looked_up_associated_and_propagated(self):
+        attachment_ids = self.add_vpn_attachments()
+        template = Template.from_stack(self.vpc_stack)
+
+        lookups = template.find_resources('Custom::AWS')
+        self.assertEqual(len(lookups), 3)
+        for logical_id, lookup in lookups.items():
+            create = json.dumps(lookup['Properties']['Create'])
+            self.assertIn('describeTransitGatewayAttachments', create)
+            self.assertIn('resource-type', create)
+
+        attachments = [
+            {'Fn::GetAtt': [logical_id, 'TransitGatewayAttachments.0.TransitGatewayAttachmentId']}
+            for logical_id in lookups
+        ]
+        self.assertEqual(sorted(attachment_ids), ['Melbourne', 'Perth', 'Sydney'])
+        self.assertCountEqual([self.vpc_stack.resolve(attachment_id) for attachment_id in attachment_ids.values()],
+                                attachments)
+
+        associations = template.find_resources('AWS::EC2::TransitGatewayRouteTableAssociation')
+        self.assertCountEqual(
+            [association['Properties']['TransitGatewayAttachmentId'] for association in associations.values()],
+            attachments
+        )
+        self.assertEqual(
+            {json.dumps(association['Properties']['TransitGatewayRouteTableId']) for association in associations.values()},
+            {json.dumps(self.ref(self.route_table))}
+        )
+
+        propagations = template.find_resources('AWS::EC2::TransitGatewayRouteTablePropagation')
+        self.assertCountEqual(
+            [(json.dumps(propagation['Properties']['TransitGatewayAttachmentId'], sort_keys=True),
+              propagation['Properties']['TransitGatewayRouteTableId']['Ref'])
+             for propagation in propagations.values()],
+            [(json.dumps(attachment, sort_keys=True), self.ref(route_table)['Ref'])
+             for attachment in attachments for route_table in (self.route_table, self.spoke_route_table)]
+        )
+
+    def test_static_routes_only_warning(self):
+        self.add_vpn_attachments()
+        warnings = [entry.data for entry in self.vpc_stack.node.metadata if entry.type == 'aws:cdk:warning']
+        self.assertEqual(warnings, [
+            'VPN connection OnPrem Perth uses static routes, which are not load balanced by ECMP'
+        ])
+
+    def test_vpn_report(self):
+        self.add_vpn_attachments()
+        self.assertEqual(self.vpc_stack.vpn_report(), {
+            'connections': 3, 'tunnels': 6, 'ecmp_tunnels': 4, 'gbps': 5.0
+        })
+
+    def test_vpn_report_without_ecmp(self):
+        self.add_vpn_attachments([dict(self.CONNECTIONS[0], static_routes_only=True)])
+        self.assertEqual(self.vpc_stack.vpn_report(), {
+            'connections': 1, 'tunnels': 2, 'ecmp_tunnels': 0, 'gbps': 1.25
+        })
+
+    def test_route_table_required(self):
+        with self.assertRaises(ValueError):
+            self.vpc_stack.add_vpn_attachments('OnPrem', self.CONNECTIONS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+import bisect
+import heapq
+import ipaddress
+
+
+def _network(cidr):
+    if isinstance(cidr, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return cidr
+    return ipaddress.ip_network(cidr)
+
+
+def collapse_cidrs(cidrs: list) -> list:
+    """
+    Collapse CIDRs into the smallest equivalent list of supernets
+
+    Notes:
+        Duplicated, nested and adjacent blocks are merged, e.g. 10.0.0.0/24
+        and 10.0.1.0/24 collapse into 10.0.0.0/23. IPv4 blocks are listed
+        before IPv6 ones.
+    """
+    nets = [_network(cidr) for cidr in cidrs]
+    return [
+        str(net)
+        for version in (4, 6)
+        for net in ipaddress.collapse_addresses(n for n in nets if n.version == version)
+    ]
+
+
+class CidrIndex():
+    def __init__(self) -> None:
+        """
+        An index of CIDR blocks for overlap and longest-prefix-match queries
+
+        Notes:
+            Two CIDR blocks overlap only when one contains the other. The blocks
+            containing a query are found by masking the query to every prefix
+            length present in the index and looking the result up in a hash
+            map, the blocks contained in a query by a range search over the
+            sorted block start addresses. Both run in O(W + log n), W being the
+            address width.
+        """
+        self.entries = {}
+        self.by_prefix = {}
+        self.prefixlens = {4: [], 6: []}
+        self.starts = {4: [], 6: []}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, cidr) -> bool:
+        return _network(cidr) in self.entries
+
+    def items(self):
+        return self.entries.items()
+
+    def get(self, cidr, default=None):
+        return self.entries.get(_network(cidr), default)
+
+    def add(self, cidr, value=None) -> None:
+        net = _network(cidr)
+        key = (net.version, net.prefixlen)
+        if key not in self.by_prefix:
+            self.by_prefix[key] = {}
+            bisect.insort(self.prefixlens[net.version], net.prefixlen)
+        if net not in self.entries:
+            bisect.insort(self.starts[net.version], (int(net.network_address), net.prefixlen))
+        self.by_prefix[key][int(net.network_address)] = net
+        self.entries[net] = value
+
+    def remove(self, cidr) -> None:
+        net = _network(cidr)
+        if net not in self.entries:
+            return
+        del self.entries[net]
+        del self.by_prefix[(net.version, net.prefixlen)][int(net.network_address)]
+        starts = self.starts[net.version]
+        starts.pop(bisect.bisect_left(starts, (int(net.network_address), net.prefixlen)))
+
+    def supernets(self, cidr) -> list:
+        """
+        Return the indexed blocks which contain, or are equal to, the block
+        """
+        net = _network(cidr)
+        start = int(net.network_address)
+        found = []
+        for prefixlen in self.prefixlens[net.version]:
+            if prefixlen > net.prefixlen:
+                break
+            shift = net.max_prefixlen - prefixlen
+            match = self.by_prefix[(net.version, prefixlen)].get((start >> shift) << shift)
+            if match is not None:
+                found.append(match)
+        return found
+
+    def subnets(self, cidr) -> list:
+        """
+        Return the indexed blocks strictly contained in the block
+        """
+        net = _network(cidr)
+        starts = self.starts[net.version]
+        first = bisect.bisect_left(starts, (int(net.network_address), net.prefixlen + 1))
+        last = bisect.bisect_right(starts, (int(net.broadcast_address), net.max_prefixlen))
+        return [
+            self.by_prefix[(net.version, prefixlen)][start]
+            for start, prefixlen in starts[first:last] if prefixlen > net.prefixlen
+        ]
+
+    def overlaps(self, cidr) -> list:
+        return self.supernets(cidr) + self.subnets(cidr)
+
+    def longest_match(self, address):
+        """
+        Return the most specific indexed block which contains an address or a
+        block, or None
+        """
+        net = _network(address)
+        start = int(net.network_address)
+        for prefixlen in reversed(self.prefixlens[net.version]):
+            if prefixlen > net.prefixlen:
+                continue
+            shift = net.max_prefixlen - prefixlen
+            match = self.by_prefix[(net.version, prefixlen)].get((start >> shift) << shift)
+            if match is not None:
+                return match
+        return None
+
+
+class CidrPlanner():
+    def __init__(self, cidr: str) -> None:
+        """
+        Allocate subnets of any prefix length out of an IPv4 or IPv6 block
+
+        Notes:
+            Free space is kept as power-of-two blocks per prefix length, like
+            a buddy allocator. An allocation takes the lowest free block of
+            the smallest size which fits and splits it, hence allocating and
+            reserving take O(W log n). Allocated blocks are recorded in a
+            CidrIndex, which is used to report overlaps.
+
+        Args:
+            cidr (str): the CIDR of the block to allocate subnets from, e.g.
+            the CIDR of a VPC.
+        """
+        self.network = ipaddress.ip_network(cidr)
+        self.bits = self.network.max_prefixlen
+        self.index = CidrIndex()
+        self.free = {}
+        self.heaps = {}
+        self._push(self.network.prefixlen, int(self.network.network_address))
+
+    def _push(self, prefixlen: int, start: int) -> None:
+        self.free.setdefault(prefixlen, set()).add(start)
+        heapq.heappush(self.heaps.setdefault(prefixlen, []), start)
+
+    def _pop_lowest(self, prefixlen: int):
+        heap = self.heaps.get(prefixlen, [])
+        while heap:
+            start = heapq.heappop(heap)
+            if start in self.free[prefixlen]:
+                self.free[prefixlen].remove(start)
+                return start
+        return None
+
+    def _split(self, start: int, prefixlen: int, target: int, keep: int) -> None:
+        # halve the block down to the target size, freeing the halves which do
+        # not contain the address to keep
+        while prefixlen < target:
+            prefixlen += 1
+            half = 1 << (self.bits - prefixlen)
+            if keep >= start + half:
+                self._push(prefixlen, start)
+                start += half
+            else:
+                self._push(prefixlen, start + half)
+
+    def _check_prefixlen(self, prefixlen: int) -> None:
+        if not self.network.prefixlen <= prefixlen <= self.bits:
+            raise ValueError(f"Prefix length /{prefixlen} does not fit in {self.network}")
+
+    def allocate(self, prefixlen: int, owner: str=None):
+        """
+        Allocate the lowest free block of the given prefix length
+
+        Raises ValueError when the block is exhausted.
+        """
+        self._check_prefixlen(prefixlen)
+        for size in range(prefixlen, self.network.prefixlen - 1, -1):
+            start = self._pop_lowest(size)
+            if start is not None:
+                self._split(start, size, prefixlen, start)
+                net = ipaddress.ip_network((start, prefixlen))
+                self.index.add(net, owner)
+                return net
+        raise ValueError(f"No free /{prefixlen} block left in {self.network}")
+
+    def reserve(self, cidr: str, owner: str=None):
+        """
+        Reserve a given block
+
+        Raises ValueError when the block is outside of the planner block or
+        overlaps an allocated one.
+        """
+        net = ipaddress.ip_network(cidr)
+        if net.version != self.network.version or not net.subnet_of(self.network):
+            raise ValueError(f"{net} is not within {self.network}")
+        conflicts = self.index.overlaps(net)
+        if conflicts:
+            raise ValueError("{} ({}) overlaps {}".format(
+                net, owner, ', '.join(f"{c} ({self.index.get(c)})" for c in conflicts)
+            ))
+
+        start = int(net.network_address)
+        for size in range(net.prefixlen, self.network.prefixlen - 1, -1):
+            shift = self.bits - size
+            block = (start >> shift) << shift
+            if block in self.free.get(size, ()):
+                self.free[size].remove(block)
+                self._split(block, size, net.prefixlen, start)
+                self.index.add(net, owner)
+                return net
+        raise ValueError(f"{net} is not free in {self.network}")
+
+    def plan(self, requests: list) -> list:
+        """
+        Allocate many blocks at once without fragmentation
+
+        Notes:
+            Blocks are allocated from the largest to the smallest, hence every
+            block starts right after the previous one on an aligned boundary
+            and no space is left between them. Sorting makes it O(n log n).
+
+        Args:
+            requests (list): a list of (owner, prefixlen) tuples.
+
+        Returns:
+            the allocated blocks, in the order of the requests.
+        """
+        for _, prefixlen in requests:
+            self._check_prefixlen(prefixlen)
+        allocated = [None] * len(requests)
+        for i in sorted(range(len(requests)), key=lambda i: requests[i][1]):
+            allocated[i] = self.allocate(requests[i][1], owner=requests[i][0])
+        return allocated
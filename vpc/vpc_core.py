@@ -1,24 +1,141 @@
-import sys
-import uuid
-import time
-import hashlib
 from constructs import Construct
 from aws_cdk import (
     aws_ec2 as ec2,
-    aws_iam as iam,
-    aws_ram as ram,
-    Stack, NestedStack, CfnOutput, Tags, CfnJson, IResolvable
+    Stack, NestedStack, CfnOutput, CfnResource, Annotations, Token
+)
+from vpc.vpc_cidr import CidrPlanner, collapse_cidrs
+from vpc.vpc_registry import CidrRegistry
+from vpc.vpc_routing import RoutingPolicy
+from vpc.vpc_tgw import RouteDomains, VPN_TUNNEL_GBPS, VPN_TUNNELS
+from vpc.vpc_endpoint import (
+    GATEWAY_SERVICES, DEFAULT_INTERFACE_SERVICES, WILDCARD_DNS,
+    service_name, dns_name, endpoint_policy
 )
 class MainStack(Stack):
     pass
 
 class VPCStack(NestedStack):
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, shard: bool=None,
+                az_cache: 'AzCache'=None, routing_strict: bool=None, **kwargs) -> None:
+        """
+        DreamChaser VPC
+
+        Args:
+            shard (bool): set to True to split the resources into nested
+            stacks along their dependency boundaries, see the shard method.
+            Defaults to the context "DC_VPC_SHARD".
+            az_cache (AzCache): the cache to serve the availability zones of
+            the stack from, see the use_az_cache method. Defaults to the cache
+            file set by the context "DC_AZ_CACHE", or else
+            .dreamchaser/az_cache.json.
+            routing_strict (bool): set to True to fail synth on any cross-AZ
+            hop of a route table to a Nat Gateway, a transit gateway attachment
+            or an interface endpoint, except for the kinds of hops allowed by
+            the context "DC_ROUTING_ALLOW", e.g. ["nat"], see RoutingPolicy.
+            Defaults to the context "DC_ROUTING_STRICT".
+        """
         super().__init__(scope, construct_id, **kwargs)
+        self.use_az_cache(az_cache)
+        if shard is None:
+            shard = bool(self.node.try_get_context('DC_VPC_SHARD'))
+        self.sharded = shard
+        self.shards = {}
+        self.cidr_registry = None
+        self.registry_key = None
+        self.prefix_lists = {}
+        self.route_reports = []
+        self.interface_endpoints = {}
+        self.endpoint_profile = None
+        self.nat_pools = {}
+        self.nat_loads = {}
+        self.vpn_connections = {}
+        if routing_strict is None:
+            routing_strict = bool(self.node.try_get_context('DC_ROUTING_STRICT'))
+        self.routing = RoutingPolicy(
+            strict=routing_strict,
+            allow=self.node.try_get_context('DC_ROUTING_ALLOW'),
+            on_cross_az=Annotations.of(self).add_warning
+        )
+
+    def use_az_cache(self, az_cache: 'AzCache'=None) -> None:
+        """
+        Serve the availability zones of the stack from a local cache
+
+        Args:
+            az_cache (AzCache): the cache of availability zones. Defaults to the
+            cache file set by the context "DC_AZ_CACHE".
+
+        Notes:
+            The cached zones of the account and region of the stack are set as
+            the context of the CDK availability zones lookup, hence synth never
+            looks them up from AWS. Without a cached entry, e.g. for an
+            environment agnostic stack, CDK resolves the zones as usual. A stale
+            entry is still used and reported as a synth warning; refresh it via
+            `python -m dreamchaser.aws_az refresh`.
+        """
+        if Token.is_unresolved(self.account) or Token.is_unresolved(self.region):
+            return
+        if az_cache is None:
+            from dreamchaser.aws_az import AzCache
+            az_cache = AzCache(path=self.node.try_get_context('DC_AZ_CACHE'))
+        names = az_cache.names(self.account, self.region)
+        if not names:
+            return
+        self.node.set_context(
+            f"availability-zones:account={self.account}:region={self.region}", names
+        )
+        if az_cache.is_stale(self.account, self.region):
+            Annotations.of(self).add_warning(
+                f"Cached availability zones of {self.account}:{self.region} are stale"
+            )
+
+    def shard(self, name: str) -> Construct:
+        """
+        Return the scope of a group of resources
+
+        Notes:
+            Without sharding, every resource is defined in the VPCStack itself.
+            With sharding, each group of resources is defined in its own nested
+            stack, so that a large topology stays under the CloudFormation
+            resource limit per stack:
+                - Core: the VPC, its Internet Gateway and the Nat Gateways
+                - Tgw: the transit gateway and its resource share
+                - Subnets: the subnets, their route tables and default routes
+                - Attach: the transit gateway attachments and route tables
+                - Routing: the routes, prefix lists and VPC endpoints
+            The references between shards are wired by CDK via nested stack
+            parameters and outputs, hence CloudFormation creates the shards
+            which do not depend on each other, e.g. Core and Tgw, in parallel.
+
+        Args:
+            name (str): the name of the shard.
+        """
+        if not self.sharded:
+            return self
+        if name not in self.shards:
+            self.shards[name] = NestedStack(self, f"{name}Shard")
+        return self.shards[name]
+
+    def shard_report(self) -> dict:
+        """
+        Return the number of CloudFormation resources per shard
+        """
+        scopes = {'VPCStack': self}
+        scopes.update(self.shards)
+        report = {}
+        for name, scope in scopes.items():
+            report[name] = len([
+                construct for construct in scope.node.find_all()
+                if CfnResource.is_cfn_resource(construct)
+                and Stack.of(construct).node.path == scope.node.path
+            ])
+        return report
 
     def add_vpc(self, vpc_cidr: str, enable_internet: bool, enable_nat: bool, 
-                vpc_ha: bool=False, vpc_endpoint: bool=False) -> None:
+                vpc_ha: bool=False, vpc_endpoint: bool=False,
+                cidr_registry: CidrRegistry=None, gateway_endpoints: list=None,
+                nat_per_az: int=1, flow_logs: str=None) -> None:
         """
         Add an AWS VPC
 
@@ -55,15 +172,42 @@ class VPCStack(NestedStack):
             high availability.
             vpc_endpoint: set to True to connect to supported AWS services via
             AWS PrivateLink.
+            cidr_registry (CidrRegistry): the registry of the VPC CIDRs of the
+            organization. The VPC CIDR is registered, and the routes via
+            transit gateway are checked, against it. Defaults to the registry
+            file set by the context "DC_CIDR_REGISTRY", if any.
+            gateway_endpoints (list): the services of the gateway endpoints
+            added to each subnet tier when vpc_endpoint is set, among 's3' and
+            'dynamodb'. Defaults to ['s3'].
+            nat_per_az (int): the number of Nat Gateways, each with its own
+            EIP, in each availability zone having Nat Gateways. The private
+            subnets of a zone are spread across its pool of Nat Gateways, see
+            add_nat_route, which scales the egress bandwidth and connections
+            beyond the limits of a single Nat Gateway.
+            flow_logs (str): the S3 bucket, as 'bucket', 'bucket/prefix' or an
+            S3 arn, to deliver the flow logs of the VPC to, see add_flow_logs.
         """
         self.vpc_cidr = vpc_cidr
-        self.oct_1 = self.vpc_cidr.split('.')[0]
-        self.oct_2 = self.vpc_cidr.split('.')[1]
+        self.cidr_planner = CidrPlanner(self.vpc_cidr)
+        self.subnet_plan = {}
+        if cidr_registry is None and self.node.try_get_context('DC_CIDR_REGISTRY'):
+            cidr_registry = CidrRegistry(path=self.node.try_get_context('DC_CIDR_REGISTRY'))
+        self.cidr_registry = cidr_registry
+        if self.cidr_registry:
+            self.registry_key = self.cidr_registry.register(
+                account='unknown' if Token.is_unresolved(self.account) else self.account,
+                region='unknown' if Token.is_unresolved(self.region) else self.region,
+                vpc=self.node.path,
+                cidr=self.vpc_cidr
+            )
         self.enable_internet = enable_internet
         self.enable_nat = enable_nat
         self.vpc_ha = vpc_ha
         self.vpc_endpoint = vpc_endpoint
+        self.gateway_endpoints = list(gateway_endpoints or ['s3'])
         self.nat_gateway_ids = []
+        self.nat_pools = {}
+        self.nat_loads = {}
         if self.enable_internet or self.enable_nat:
             subnet_configuration=[
                 ec2.SubnetConfiguration(
@@ -75,7 +219,7 @@ class VPCStack(NestedStack):
         else:
             subnet_configuration=[]
 
-        self.vpc = ec2.Vpc(self, 'VPC',
+        self.vpc = ec2.Vpc(self.shard('Core'), 'VPC',
             cidr=self.vpc_cidr,
             max_azs=len(self.availability_zones),
             enable_dns_hostnames=True,
@@ -84,38 +228,145 @@ class VPCStack(NestedStack):
             nat_gateways=None
         )
 
+        # the subnets created by ec2.Vpc take the lowest blocks of the VPC CIDR
+        for subnet in self.vpc.public_subnets:
+            self.cidr_planner.reserve(subnet.ipv4_cidr_block, owner=subnet.node.path)
+
         # output vpc id as stack output
         CfnOutput(self, 'VpcId', value=self.vpc.vpc_id, description='VPC ID')
 
+        if flow_logs:
+            self.add_flow_logs(flow_logs)
+
 
         # add AWS Nat Gateways if Nat Gateway is demanded, and there is internet
         # connectivity for the VPC
         if self.enable_nat:
-            if self.vpc_ha:
-                for zone_index in range(len(self.availability_zones)):
-                    eip = ec2.CfnEIP(self,
-                        f"NatGateway EIP {self.availability_zones[zone_index]}"
+            zone_indexes = range(len(self.availability_zones)) if self.vpc_ha else [0]
+            for zone_index in zone_indexes:
+                zone = self.availability_zones[zone_index]
+                self.nat_pools[zone_index] = []
+                for pool_index in range(nat_per_az):
+                    suffix = f" {pool_index}" if pool_index else ''
+                    eip = ec2.CfnEIP(self.shard('Core'),
+                        f"NatGateway EIP {zone}{suffix}"
                     )
-                    nat_gateway = ec2.CfnNatGateway(self, 
-                        f"NatGateway {self.availability_zones[zone_index]}",
+                    nat_gateway = ec2.CfnNatGateway(self.shard('Core'), 
+                        f"NatGateway {zone}{suffix}",
                         subnet_id=self.vpc.public_subnets[zone_index].subnet_id,
                         allocation_id=eip.attr_allocation_id,
                         connectivity_type="public"
                     )
-                    self.nat_gateway_ids.append(nat_gateway.ref)
+                    if not pool_index:
+                        self.nat_gateway_ids.append(nat_gateway.ref)
+                    self.nat_pools[zone_index].append(nat_gateway)
+                    self.nat_loads[nat_gateway.node.id] = {
+                        'zone': zone, 'subnets': [], 'weight': 0.0
+                    }
+                    self.routing.add_target(nat_gateway.ref, 'nat', [zone], name=nat_gateway.node.id)
+
+    def add_flow_logs(self, destination: str, traffic_type: str='ALL',
+                        max_aggregation_interval: int=600) -> ec2.CfnFlowLog:
+        """
+        Deliver the flow logs of the VPC to S3 as Parquet
+
+        Notes:
+            The logs are partitioned per hour with Hive compatible prefixes,
+            e.g. '.../aws-service=vpcflowlogs/aws-region=.../year=2024/month=05/
+            day=01/hour=13/', hence Athena queries on a time range only scan
+            the matching partitions and columns. Besides the default fields,
+            the subnet, the zone and the packet level addresses are logged, so
+            that the traffic behind the Nat Gateways and the transit gateway
+            attachments is attributed to its subnets, see
+            `python -m dreamchaser.flow_logs`.
+
+        Args:
+            destination (str): the S3 bucket as 'bucket', 'bucket/prefix' or
+            an S3 arn.
+            traffic_type (str): 'ALL', 'ACCEPT' or 'REJECT'.
+            max_aggregation_interval (int): 60 or 600 seconds.
+        """
+        from dreamchaser.flow_logs import log_format
+        if not destination.startswith('arn:'):
+            destination = f"arn:aws:s3:::{destination}"
+        return ec2.CfnFlowLog(self.shard('Core'), 'FlowLog',
+            resource_id=self.vpc.vpc_id,
+            resource_type='VPC',
+            traffic_type=traffic_type,
+            log_destination_type='s3',
+            log_destination=destination,
+            log_format=log_format(),
+            max_aggregation_interval=max_aggregation_interval,
+            destination_options={
+                'FileFormat': 'parquet',
+                'HiveCompatiblePartitions': True,
+                'PerHourPartition': True
+            }
+        )
+
+    def plan_subnets(self, tiers: dict) -> dict:
+        """
+        Plan the CIDRs of several subnet tiers at once
+
+        Notes:
+            The subnets of all the tiers are allocated from the largest to the
+            smallest, which packs them into the VPC CIDR without leaving
+            unusable gaps. The subnet adding methods then use the planned
+            CIDRs of their scope id.
+
+        Args:
+            tiers (dict): map the scope id of each subnet tier to the mask of
+            its subnets, e.g. {'DCPrivateSubnets': 22, 'TGWAttach': 28}.
+
+        Returns:
+            the planned CIDRs of each tier, one per availability zone.
+        """
+        requests = [
+            (f"{scope_id} {zone}", mask)
+            for scope_id, mask in tiers.items()
+            for zone in self.availability_zones
+        ]
+        cidrs = iter(self.cidr_planner.plan(requests))
+        for scope_id in tiers:
+            self.subnet_plan[scope_id] = [
+                str(next(cidrs)) for _ in self.availability_zones
+            ]
+        return self.subnet_plan
+
+    def _subnet_cidrs(self, scope_id: str, subnet_oct3: int=None, mask: int=24) -> list:
+        """
+        Return the CIDR of the subnet of a tier in each availability zone
+
+        Notes:
+            The CIDRs are, by order of precedence, derived from subnet_oct3
+            like 'x.y.(subnet_oct3 + zone index).0/mask' in a /16 VPC, taken
+            from the plan of the scope id, or allocated from the lowest free
+            block of the VPC CIDR. Overlapping CIDRs raise ValueError.
+        """
+        if subnet_oct3 is None and scope_id in self.subnet_plan:
+            return self.subnet_plan[scope_id]
+
+        cidrs = []
+        vpc_network = self.cidr_planner.network
+        for index, zone in enumerate(self.availability_zones):
+            owner = f"{scope_id} {zone}"
+            if subnet_oct3 is None:
+                cidr = self.cidr_planner.allocate(mask, owner=owner)
             else:
-                eip = ec2.CfnEIP(self,
-                    f"NatGateway EIP {self.availability_zones[0]}"
-                )
-                nat_gateway = ec2.CfnNatGateway(self, 
-                    f"NatGateway {self.availability_zones[0]}",
-                    subnet_id=self.vpc.public_subnets[0].subnet_id,
-                    allocation_id=eip.attr_allocation_id,
-                    connectivity_type="public"
-                )
-                self.nat_gateway_ids.append(nat_gateway.ref)
+                start = vpc_network.network_address + ((subnet_oct3 + index) << 8)
+                cidr = self.cidr_planner.reserve(f"{start}/{mask}", owner=owner)
+            cidrs.append(str(cidr))
+        return cidrs
+
+    def track_route_table(self, isubnet) -> None:
+        """
+        Track the route table of a subnet with its zone in the routing policy
+        """
+        self.routing.add_route_table(
+            isubnet.route_table.route_table_id, isubnet.node.id, isubnet.availability_zone
+        )
 
-    def add_public_subnets(self, scope_id: str, subnet_oct3: int, mask: int=24) -> list:
+    def add_public_subnets(self, scope_id: str, subnet_oct3: int=None, mask: int=24) -> list:
         """
         Add a VPC public subnet
         
@@ -128,19 +379,20 @@ class VPCStack(NestedStack):
             scope_id (str): a string value which is used to construct a unique
             scope id for the public subnet to create.
             subnet_oct3 (int): specify a value (in the range of 0 to 255) for
-            the octet 3 of the CIDR for the subnet in zone A.
+            the octet 3 of the CIDR for the subnet in zone A. Leave it unset to
+            use the planned CIDRs of the scope id, or else the next free blocks
+            of the VPC CIDR.
             mask (int): set the mask value for the CIDR of the subnets to create
         """
         if not self.enable_internet:
             raise ValueError('Internet Gateway required for adding public subnets')
 
+        cidrs = self._subnet_cidrs(scope_id, subnet_oct3, mask)
         isubnets = []
         for index in range(len(self.availability_zones)):
-            public_subnet = ec2.PublicSubnet(self, 
+            public_subnet = ec2.PublicSubnet(self.shard('Subnets'), 
                 f"{scope_id} {self.availability_zones[index]}",
-                cidr_block='.'.join(
-                    (self.oct_1, self.oct_2, str(subnet_oct3 + index), "0")
-                    ) + "/" + str(mask),
+                cidr_block=cidrs[index],
                 vpc_id=self.vpc.vpc_id,
                 availability_zone=self.availability_zones[index]
             )
@@ -149,6 +401,7 @@ class VPCStack(NestedStack):
                 self.vpc.internet_connectivity_established
             )
             isubnets.append(public_subnet)
+            self.track_route_table(public_subnet)
 
         if self.vpc_endpoint:
             self.apply_endpoint(
@@ -158,7 +411,8 @@ class VPCStack(NestedStack):
 
         return isubnets
 
-    def add_private_subnets(self, scope_id: str, subnet_oct3: int, mask: int=24) -> list:
+    def add_private_subnets(self, scope_id: str, subnet_oct3: int=None, mask: int=24,
+                            nat_weight: float=1) -> list:
         """
         Add a VPC private subnet
         
@@ -171,23 +425,27 @@ class VPCStack(NestedStack):
             scope_id (str): a string value which is used to construct a unique
             scope id for the private subnet to create.
             subnet_oct3 (int): specify a value (in the range of 0 to 255) for
-            the octet 3 of the CIDR for the subnet in zone A.
+            the octet 3 of the CIDR for the subnet in zone A. Leave it unset to
+            use the planned CIDRs of the scope id, or else the next free blocks
+            of the VPC CIDR.
             mask (int): set the mask value for the CIDR of the subnets to create
+            nat_weight (float): the expected egress load of each subnet, used to
+            balance the subnets across a pool of Nat Gateways.
         """
+        cidrs = self._subnet_cidrs(scope_id, subnet_oct3, mask)
         isubnets = []
         for index in range(len(self.availability_zones)):
-            private_subnet = ec2.PrivateSubnet(self,
+            private_subnet = ec2.PrivateSubnet(self.shard('Subnets'),
                 f"{scope_id} {self.availability_zones[index]}",
-                cidr_block='.'.join(
-                    (self.oct_1, self.oct_2, str(subnet_oct3 + index), "0")
-                    ) + "/" + str(mask),
+                cidr_block=cidrs[index],
                 vpc_id=self.vpc.vpc_id,
                 availability_zone=self.availability_zones[index]
             )
             isubnets.append(private_subnet)
+            self.track_route_table(private_subnet)
 
         if self.enable_nat:
-            self.add_nat_route(isubnets=isubnets)
+            self.add_nat_route(isubnets=isubnets, weight=nat_weight)
         
         if self.vpc_endpoint:
             self.apply_endpoint(
@@ -197,7 +455,7 @@ class VPCStack(NestedStack):
 
         return isubnets
 
-    def add_isolated_subnets(self, scope_id: str, subnet_oct3: int, mask: int=24) -> list:
+    def add_isolated_subnets(self, scope_id: str, subnet_oct3: int=None, mask: int=24) -> list:
         """
         Add a VPC isolated subnet
         
@@ -209,24 +467,26 @@ class VPCStack(NestedStack):
             scope_id (str): a string value which is used to construct a unique
             scope id for the public subnet to create.
             subnet_oct3 (int): specify a value (in the range of 0 to 255) for
-            the octet 3 of the CIDR for the subnet in zone A.
+            the octet 3 of the CIDR for the subnet in zone A. Leave it unset to
+            use the planned CIDRs of the scope id, or else the next free blocks
+            of the VPC CIDR.
             mask (int): set the mask value for the CIDR of the subnets to create
         """
+        cidrs = self._subnet_cidrs(scope_id, subnet_oct3, mask)
         isubnets = []
         for index in range(len(self.availability_zones)):
-            subnet = ec2.Subnet(self,
+            subnet = ec2.Subnet(self.shard('Subnets'),
                 f"{scope_id} {self.availability_zones[index]}",
-                cidr_block='.'.join(
-                    (self.oct_1, self.oct_2, str(subnet_oct3 + index), "0")
-                    ) + "/" + str(mask),
+                cidr_block=cidrs[index],
                 vpc_id=self.vpc.vpc_id,
                 availability_zone=self.availability_zones[index]
             )
             isubnets.append(subnet)
+            self.track_route_table(subnet)
         
         return isubnets
 
-    def apply_endpoint(self, scope_id: str, rt_ids: list) -> None:
+    def apply_endpoint(self, scope_id: str, rt_ids: list, services: list=None) -> dict:
         """
         Apply VPC Endpoint Policy
 
@@ -234,55 +494,403 @@ class VPCStack(NestedStack):
             For environments with requirements for enhanced network security,
             VPC endpoint policy has to be enforced.
 
+            A gateway endpoint is added per service, with the policy generated
+            for the service by vpc_endpoint.endpoint_policy.
+
         Args:
             scope_id (str): a string value which is used to construct a unique
             scope id for the resource to add.
             rt_ids (list): specify a list of VPC route table IDs to which VPC
             endpoint policy will be applied.
+            services (list): the services of the gateway endpoints, among 's3'
+            and 'dynamodb'. Defaults to the gateway_endpoints of add_vpc.
+
+        Returns:
+            the gateway endpoints, by service.
+        """
+        endpoints = {}
+        for service in services or self.gateway_endpoints:
+            if service not in GATEWAY_SERVICES:
+                raise ValueError(f"No gateway endpoint for service {service}")
+            endpoints[service] = ec2.CfnVPCEndpoint(self.shard('Routing'),
+                f"{scope_id} VPCEndpoint" if service == 's3' else f"{scope_id} {service.capitalize()}Endpoint",
+                service_name=service_name(self.region, service),
+                vpc_id=self.vpc.vpc_id,
+                route_table_ids=rt_ids,
+                vpc_endpoint_type="Gateway",
+                policy_document=endpoint_policy(service, self.region, self.account)
+            )
+        return endpoints
+
+    def add_interface_endpoints(self, scope_id: str, isubnets: list, services: list=None,
+                                private_dns: bool=True, allowed_cidrs: list=None,
+                                org_id: str=None) -> dict:
+        """
+        Add interface VPC endpoints
+
+        Notes:
+            AWS API calls to the services of the endpoints stay in the VPC
+            instead of going through the Nat Gateways. The endpoints accept
+            HTTPS from the VPC CIDR and from allowed_cidrs, via a security
+            group shared by the endpoints.
+
+            For an endpoint hub serving spoke VPCs over the transit gateway,
+            set private_dns to False, set allowed_cidrs to the CIDRs of the
+            spokes, and create the DNS of the endpoints via
+            create_endpoint_hub.
+
+        Args:
+            scope_id (str): a string value which is used to construct a unique
+            scope id for the resources to add.
+            isubnets (list): the subnets of the endpoints, one per availability
+            zone.
+            services (list): the endpoint services, e.g. 'ssm' or 'ecr.dkr'.
+            Defaults to vpc_endpoint.DEFAULT_INTERFACE_SERVICES.
+            private_dns (bool): set to False to not resolve the service DNS
+            names to the endpoints in the VPC.
+            allowed_cidrs (list): the CIDRs allowed to reach the endpoints on
+            top of the VPC CIDR.
+            org_id (str): the id of the AWS Organization whose principals are
+            allowed by the endpoint policies, instead of the account only.
+
+        Returns:
+            the interface endpoints, by service.
         """
-        ec2.CfnVPCEndpoint(self, f"{scope_id} VPCEndpoint",
-            service_name="com.amazonaws." + self.region + ".s3",
+        security_group = ec2.CfnSecurityGroup(self.shard('Routing'), f"{scope_id} SecurityGroup",
+            group_description=f"HTTPS to the interface endpoints {scope_id}",
             vpc_id=self.vpc.vpc_id,
-            route_table_ids=rt_ids,
-            vpc_endpoint_type="Gateway",
-            policy_document = {
-                    "Version": "2012-10-17",
-                    "Statement": [
-                        {
-                            "Effect": "Allow",
-                            "Principal": "*",
-                            "Action": [
-                                "s3:GetObject",
-                                "s3:ListBucket",
-                                "s3:ListObjects"
-                            ],
-                            "Resource": [
-                                f"arn:aws:s3:::amazoncloudwatch-agent-{self.region}/*",
-                                f"arn:aws:s3:::patch-baseline-snapshot-{self.region}/*",
-                                f"arn:aws:s3:::amazon-ssm-{self.region}/*",
-                                f"arn:aws:s3:::aws-ssm-{self.region}/*",
-                                f"arn:aws:s3:::{self.region}-birdwatcher-prod/*",
-                                f"arn:aws:s3:::prod-{self.region}-starport-layer-bucket/*"
-                            ]
-                        }
-                    ]
-                }
+            security_group_ingress=[
+                ec2.CfnSecurityGroup.IngressProperty(
+                    ip_protocol='tcp', from_port=443, to_port=443, cidr_ip=cidr
+                )
+                for cidr in dict.fromkeys([self.vpc_cidr] + list(allowed_cidrs or []))
+            ]
+        )
+
+        endpoints = {}
+        for service in services or DEFAULT_INTERFACE_SERVICES:
+            endpoints[service] = ec2.CfnVPCEndpoint(self.shard('Routing'),
+                f"{scope_id} {service}",
+                service_name=service_name(self.region, service),
+                vpc_id=self.vpc.vpc_id,
+                vpc_endpoint_type="Interface",
+                subnet_ids=[isubnet.subnet_id for isubnet in isubnets],
+                security_group_ids=[security_group.attr_group_id],
+                private_dns_enabled=private_dns,
+                policy_document=endpoint_policy(service, self.region, self.account, org_id=org_id)
+            )
+        self.interface_endpoints.update(endpoints)
+        self.routing.add_target(
+            scope_id, 'endpoint', [isubnet.availability_zone for isubnet in isubnets]
         )
+        return endpoints
+
+    def create_endpoint_hub(self, scope_id: str, endpoints: dict=None, ou_id: str=None):
+        """
+        Serve the interface endpoints of this VPC to the VPCs of the organization
+
+        Notes:
+            A private hosted zone per service resolves the service DNS name,
+            e.g. ssm.ap-southeast-2.amazonaws.com, to its endpoint. The zones
+            are grouped in a Route 53 profile, shared with the organization unit
+            like the transit gateway, hence the spoke VPCs associating the
+            profile via use_endpoint_hub resolve the services to the hub. The
+            spokes reach the endpoints over the transit gateway, and need a
+            route to the hub VPC CIDR via add_tgw_route.
+
+        Args:
+            scope_id (str): a string value which is used to construct a unique
+            scope id for the resources to add.
+            endpoints (dict): the interface endpoints by service, defaults to
+            the ones added by add_interface_endpoints.
+            ou_id (str): the arn of the organization unit to share the profile
+            with.
+
+        Returns:
+            the Route 53 profile.
+        """
+        from aws_cdk import Fn, aws_route53 as route53, aws_route53profiles as route53profiles
+
+        scope = self.shard('Routing')
+        self.endpoint_profile = route53profiles.CfnProfile(scope, f"{scope_id} Profile",
+            name=f"{self.node.id}-{scope_id}"
+        )
+        for service, endpoint in (endpoints or self.interface_endpoints).items():
+            name = dns_name(self.region, service)
+            zone = route53.CfnHostedZone(scope, f"{scope_id} {service} Zone",
+                name=name,
+                vpcs=[route53.CfnHostedZone.VPCProperty(vpc_id=self.vpc.vpc_id, vpc_region=self.region)]
+            )
+            # the first DNS entry of an endpoint is its regional name, as
+            # 'hosted zone id:dns name'
+            dns_entry = Fn.split(':', Fn.select(0, endpoint.attr_dns_entries))
+            for index, record in enumerate([name] + ([f"*.{name}"] if service in WILDCARD_DNS else [])):
+                route53.CfnRecordSet(scope, f"{scope_id} {service} Alias{index}",
+                    hosted_zone_id=zone.attr_id,
+                    name=record,
+                    type='A',
+                    alias_target=route53.CfnRecordSet.AliasTargetProperty(
+                        dns_name=Fn.select(1, dns_entry),
+                        hosted_zone_id=Fn.select(0, dns_entry)
+                    )
+                )
+            route53profiles.CfnProfileResourceAssociation(scope, f"{scope_id} {service} Association",
+                name=f"{scope_id}-{service}".replace('.', '-'),
+                profile_id=self.endpoint_profile.attr_id,
+                resource_arn=f"arn:aws:route53:::hostedzone/{zone.attr_id}"
+            )
+
+        if ou_id:
+            from aws_cdk import aws_ram as ram
+
+            ram.CfnResourceShare(scope, f"RAM{scope_id}",
+                name='dc_one_endpoint_hub_' + scope_id.lower(),
+                principals=[ou_id],
+                resource_arns=[self.endpoint_profile.attr_arn]
+            )
+        return self.endpoint_profile
+
+    def use_endpoint_hub(self, scope_id: str, profile_id: str):
+        """
+        Resolve the AWS services to the interface endpoints of an endpoint hub
+
+        Args:
+            scope_id (str): a string value which is used to construct a unique
+            scope id for the resource to add.
+            profile_id (str): the id of the Route 53 profile shared by the hub,
+            see create_endpoint_hub.
+        """
+        from aws_cdk import aws_route53profiles as route53profiles
+
+        return route53profiles.CfnProfileAssociation(self.shard('Routing'), scope_id,
+            name=f"{self.node.id}-{scope_id}",
+            profile_id=profile_id,
+            resource_id=self.vpc.vpc_id
+        )
+
+    def assign_nat_gateway(self, zone_index: int, subnet: str, weight: float=1) -> str:
+        """
+        Return the Nat Gateway of the pool serving a zone to route a subnet to
+
+        Notes:
+            The pool of the zone of the subnet serves it wherever there is one,
+            or else the pool of the first zone having Nat Gateways, e.g. without
+            vpc_ha, which is a cross-AZ hop reported by the routing policy.
+
+            The subnet is assigned to the Nat Gateway of the pool with the least
+            weight assigned so far, the first one of the pool on a tie, hence
+            the assignment is balanced and the same on every synth.
 
-    def add_nat_route(self, isubnets: list) -> None:
+        Args:
+            zone_index (int): the index of the availability zone of the subnet.
+            subnet (str): the name of the subnet, for the load report.
+            weight (float): the expected egress load of the subnet relative to
+            the other subnets, e.g. 4 for a subnet of busy workloads.
+        """
+        pool = self.nat_pools.get(zone_index) or self.nat_pools[min(self.nat_pools)]
+        nat_gateway = min(pool, key=lambda nat: self.nat_loads[nat.node.id]['weight'])
+        load = self.nat_loads[nat_gateway.node.id]
+        load['subnets'].append(subnet)
+        load['weight'] += weight
+        return nat_gateway.ref
+
+    def nat_report(self) -> dict:
+        """
+        Return the expected load of each Nat Gateway
+
+        Returns:
+            the zone, the subnets, the total weight of the subnets and the
+            share of the egress load of its pool, by Nat Gateway.
+        """
+        report = {}
+        for zone_index, pool in self.nat_pools.items():
+            pool_weight = sum(self.nat_loads[nat.node.id]['weight'] for nat in pool)
+            for nat in pool:
+                load = self.nat_loads[nat.node.id]
+                report[nat.node.id] = dict(load,
+                    subnets=list(load['subnets']),
+                    share=load['weight'] / pool_weight if pool_weight else 0.0
+                )
+        return report
+
+    def add_nat_route(self, isubnets: list, dest_cidr=None, prefix_list: bool=False,
+                        weight: float=1) -> None:
         """
         Add a default NAT route to VPC route tables
 
         Notes:
-            The NAT resource id specified here is AWS Nat Gateway.
+            The NAT resource id specified here is AWS Nat Gateway. With several
+            Nat Gateways per zone, see the nat_per_az argument of add_vpc, each
+            subnet is routed to one of the pool, see assign_nat_gateway.
 
         Args:
             isubnets (list): specify a list of subnet interface type
+            dest_cidr (str|list): specify the cidr, or a list of cidrs, of the
+            destinations via NAT instead of the default route.
+            prefix_list (bool): set to True to route to the destinations via a
+            single managed prefix list.
+            weight (float): the expected egress load of each of the subnets.
         """
         for i in range(len(self.availability_zones)):
-            isubnets[i].add_default_nat_route(
-                self.nat_gateway_ids[i] if self.vpc_ha else self.nat_gateway_ids[0]
+            nat_gateway_id = self.assign_nat_gateway(i, isubnets[i].node.id, weight)
+            self.routing.route(isubnets[i].route_table.route_table_id, nat_gateway_id)
+            if dest_cidr is None:
+                isubnets[i].add_default_nat_route(nat_gateway_id)
+            else:
+                self.add_routes(
+                    scope_id=f"{isubnets[i].node.id} NatRoute",
+                    route_tables=[isubnets[i].route_table.route_table_id],
+                    dest_cidr=dest_cidr,
+                    prefix_list=prefix_list,
+                    nat_gateway_id=nat_gateway_id
+                )
+
+    def add_igw_route(self, isubnets: list, dest_cidr, prefix_list: bool=False) -> None:
+        """
+        Add routes via the VPC Internet Gateway to VPC route tables
+
+        Notes:
+            Public subnets already have a default route via the Internet
+            Gateway. This method serves route tables which only reach some
+            destinations, e.g. partner networks, via the Internet Gateway.
+
+        Args:
+            isubnets (list): specify a list of subnet interface type
+            dest_cidr (str|list): specify the cidr, or a list of cidrs, of the
+            destinations.
+            prefix_list (bool): set to True to route to the destinations via a
+            single managed prefix list.
+        """
+        for isubnet in isubnets:
+            self.add_routes(
+                scope_id=f"{isubnet.node.id} IgwRoute",
+                route_tables=[isubnet.route_table.route_table_id],
+                dest_cidr=dest_cidr,
+                prefix_list=prefix_list,
+                depends_on=self.vpc.internet_connectivity_established,
+                gateway_id=self.vpc.internet_gateway_id
+            )
+
+    def prefix_list(self, cidrs: list) -> ec2.CfnPrefixList:
+        """
+        Return the managed prefix list of a set of cidrs
+
+        Notes:
+            A single prefix list is created per set of cidrs, hence every
+            route table routing to the same destinations references it. A
+            prefix list holds a single address family, hence mixed IPv4 and
+            IPv6 cidrs raise ValueError.
+        """
+        families = {'IPv6' if ':' in cidr else 'IPv4' for cidr in cidrs}
+        if len(families) > 1:
+            raise ValueError(f"A prefix list cannot mix IPv4 and IPv6 cidrs: {', '.join(cidrs)}")
+        key = tuple(cidrs)
+        if key not in self.prefix_lists:
+            scope_id = f"PrefixList{len(self.prefix_lists)}"
+            self.prefix_lists[key] = ec2.CfnPrefixList(self.shard('Routing'), scope_id,
+                address_family=families.pop(),
+                max_entries=len(cidrs),
+                prefix_list_name=f"{self.node.id}-{scope_id}",
+                entries=[ec2.CfnPrefixList.EntryProperty(cidr=cidr) for cidr in cidrs]
             )
+        return self.prefix_lists[key]
+
+    def add_routes(self, scope_id: str, route_tables: list, dest_cidr,
+                    prefix_list: bool=False, depends_on=None, **target) -> dict:
+        """
+        Add routes to one or many destinations into VPC route tables
+
+        Notes:
+            The destination cidrs are collapsed into the smallest equivalent
+            list of supernets. With prefix_list, each route table gets a single
+            route per address family to a managed prefix list holding the
+            supernets of the family, instead of a route per supernet.
+
+        Args:
+            scope_id (str): a string value which is used to construct a unique
+            scope id for the route resources to add.
+            route_tables (list): a list of route table ids.
+            dest_cidr (str|list): specify the cidr, or a list of cidrs, of the
+            destinations.
+            prefix_list (bool): set to True to route via managed prefix lists.
+            depends_on: a construct the routes depend on, e.g. the transit
+            gateway attachment.
+            target: the next hop of the routes, e.g. transit_gateway_id.
+
+        Returns:
+            a report of the number of destinations, routes and resources,
+            including the number of resources saved by the aggregation.
+        """
+        destinations = [dest_cidr] if isinstance(dest_cidr, str) or dest_cidr is None else list(dest_cidr)
+        if any(cidr is None or Token.is_unresolved(cidr) for cidr in destinations):
+            aggregated = destinations
+        else:
+            aggregated = collapse_cidrs(destinations)
+
+        families = {}
+        for cidr in aggregated:
+            ipv6 = bool(cidr) and not Token.is_unresolved(cidr) and ':' in cidr
+            families.setdefault(ipv6, []).append(cidr)
+
+        resources = 0
+        route_destinations = []
+        for ipv6, cidrs in families.items():
+            if prefix_list and len(cidrs) > 1:
+                if tuple(cidrs) not in self.prefix_lists:
+                    resources += 1
+                res_prefix_list = self.prefix_list(cidrs)
+                route_destinations.append({'destination_prefix_list_id': res_prefix_list.attr_prefix_list_id})
+            else:
+                route_destinations.extend(
+                    {'destination_ipv6_cidr_block' if ipv6 else 'destination_cidr_block': cidr}
+                    for cidr in cidrs
+                )
+
+        for i in range(len(route_tables)):
+            for j, destination in enumerate(route_destinations):
+                res_route = ec2.CfnRoute(self.shard('Routing'), f"{scope_id}{i}" if j == 0 else f"{scope_id}{i}-{j}",
+                                route_table_id=route_tables[i],
+                                **target,
+                                **destination
+                )
+                if depends_on:
+                    res_route.node.add_dependency(depends_on)
+                resources += 1
+
+        report = {
+            'scope_id': scope_id,
+            'destinations': len(destinations),
+            'aggregated': len(aggregated),
+            'resources': resources,
+            'saved': len(destinations) * len(route_tables) - resources
+        }
+        self.route_reports.append(report)
+        return report
+
+    def check_tgw_route(self, dest_cidr: str, local: bool=True) -> dict:
+        """
+        Check a route destination via transit gateway against the CIDR registry
+
+        Notes:
+            A destination which overlaps the local VPC raises ValueError when
+            local is True. A destination which matches no registered VPC is
+            reported as a synth warning since its traffic is likely to be
+            blackholed. A tokenized destination, e.g. the CIDR of a VPC of the
+            same app, is resolved at deploy time and cannot be checked.
+
+        Returns:
+            the registered VPCs reached via the destination, keyed by VPC.
+        """
+        if not self.cidr_registry or not dest_cidr or Token.is_unresolved(dest_cidr):
+            return {}
+        owners = self.cidr_registry.check_route(
+            dest_cidr, local_key=self.registry_key if local else None
+        )
+        if not owners:
+            Annotations.of(self).add_warning(
+                f"Route destination {dest_cidr} matches no VPC in the CIDR registry"
+            )
+        return owners
 
     def create_tgw(self, scope_id: str=None, bgp_asn: int=65000) -> None:
         """
@@ -293,7 +901,7 @@ class VPCStack(NestedStack):
             system in your TCP/IP network.
         """
         self.tgw_scope_id = scope_id
-        self.tgw = ec2.CfnTransitGateway(self, scope_id,
+        self.tgw = ec2.CfnTransitGateway(self.shard('Tgw'), scope_id,
             amazon_side_asn=bgp_asn,
             auto_accept_shared_attachments='enable',
             default_route_table_association='disable',
@@ -311,14 +919,16 @@ class VPCStack(NestedStack):
             ou_id (str): specify the arn of the organization unit to share
             transit gateway with.
         """
-        ram.CfnResourceShare(self, 'RAM{self.tgw_scope_id}',
+        from aws_cdk import aws_ram as ram
+
+        ram.CfnResourceShare(self.shard('Tgw'), 'RAM{self.tgw_scope_id}',
             name='dc_one_tgw_id_' + self.tgw_scope_id.lower(),
             principals=[ou_id],
             resource_arns=[f"arn:aws:ec2:{self.region}:{self.account}:transit-gateway/{self.tgw.ref}"]
         )
 
     def create_tgw_attach(self, scope_id: str, vpc_id: str, tgw_id: str,
-                        subnet_oct3: int, mask: int) -> list:
+                        subnet_oct3: int=None, mask: int=24) -> list:
         """
         Create Transit Gateway Attachment
 
@@ -353,12 +963,16 @@ class VPCStack(NestedStack):
                 scope_id=scope_id
             )
 
-        self.tgw_attach = ec2.CfnTransitGatewayAttachment(self,
+        self.tgw_attach = ec2.CfnTransitGatewayAttachment(self.shard('Attach'),
             scope_id,
             subnet_ids=[isubnet.subnet_id for isubnet in res_isubnets],
             transit_gateway_id=tgw_id,
             vpc_id=vpc_id
         )
+        self.routing.add_target(
+            self.tgw_attach.ref, 'tgw', [isubnet.availability_zone for isubnet in res_isubnets],
+            name=scope_id
+        )
         return res_isubnets
 
     def tgw_route_table(self, tgw_id: str, asso_tgw_attach_id: str, 
@@ -367,8 +981,9 @@ class VPCStack(NestedStack):
         Implement Flat Transit Gateway route domains
 
         Notes:
-            The tgw_route_table method doesn't support implementing Hub-Spoke 
-            route domains.
+            The tgw_route_table method implements a single route table with a
+            static route. For Hub-Spoke route domains, e.g. shared-services,
+            prod, non-prod and egress, see add_route_domains.
 
             This method creates transit gateway route table which differs from
             VPC route table.
@@ -383,19 +998,20 @@ class VPCStack(NestedStack):
             the next hop of the route to add.
             dest_cidr (str): specify the cidr of destination.
         """
+        self.check_tgw_route(dest_cidr, local=False)
 
-        self.tgw_rt = ec2.CfnTransitGatewayRouteTable(self,
+        self.tgw_rt = ec2.CfnTransitGatewayRouteTable(self.shard('Attach'),
             f"{self.tgw_scope_id}Rt",
             transit_gateway_id=tgw_id
         )
 
-        self.tgw_rt_asso = ec2.CfnTransitGatewayRouteTableAssociation(self,
+        self.tgw_rt_asso = ec2.CfnTransitGatewayRouteTableAssociation(self.shard('Attach'),
             f"{self.tgw_scope_id}RtAssociation",
             transit_gateway_attachment_id=asso_tgw_attach_id,
             transit_gateway_route_table_id=self.tgw_rt.ref
         )
 
-        self.tgw_route = ec2.CfnTransitGatewayRoute(self, 
+        self.tgw_route = ec2.CfnTransitGatewayRoute(self.shard('Attach'), 
             f"{self.tgw_scope_id}TGWRoute",
             transit_gateway_route_table_id=self.tgw_rt.ref,
             destination_cidr_block=dest_cidr,
@@ -403,8 +1019,214 @@ class VPCStack(NestedStack):
 
         )
 
+    def add_route_domains(self, scope_id: str, tgw_id: str, route_domains: RouteDomains,
+                            attachment_ids: dict=None) -> dict:
+        """
+        Implement Hub-Spoke transit gateway route domains
+
+        Notes:
+            A transit gateway route table is created per domain. Each attachment
+            is associated with the route table of its domain and propagated to
+            the route tables of the domains reaching it, hence the number of
+            resources grows linearly with the number of attachments, and only
+            the static routes of the domains are added as routes.
+
+            The transit gateway of create_tgw disables the default route table
+            association and propagation, so that the domains are the only route
+            tables of the attachments.
+
+        Args:
+            scope_id (str): a string value which is used to construct a unique
+            scope id for the resources to add.
+            tgw_id (str): specify the id of transit gateway.
+            route_domains (RouteDomains): the domains and their attachments.
+            attachment_ids (dict): the ids of the attachments by name, e.g.
+            {'TGWAttach': self.tgw_attach.ref}, for the attachments without
+            attachment_id in route_domains.
+
+        Returns:
+            the transit gateway route tables, by domain.
+        """
+        attachment_ids = dict(attachment_ids or {})
+        for name, attachment in route_domains.attachments.items():
+            attachment_ids.setdefault(name, attachment['attachment_id'])
+            if not attachment_ids[name]:
+                raise ValueError(f"No attachment id for attachment {name}")
+
+        for domain, cidr, attachments in route_domains.conflicts():
+            Annotations.of(self).add_warning(
+                f"Route domain {domain} gets {cidr} propagated by {', '.join(attachments)}"
+            )
+
+        scope = self.shard('Attach')
+        route_tables = {}
+        for domain, entry in route_domains.domains.items():
+            route_tables[domain] = ec2.CfnTransitGatewayRouteTable(scope,
+                f"{scope_id} {domain} Rt",
+                transit_gateway_id=tgw_id
+            )
+            for index, (cidr, attachment) in enumerate(entry['routes'].items()):
+                self.check_tgw_route(cidr, local=False)
+                ec2.CfnTransitGatewayRoute(scope, f"{scope_id} {domain} Route{index}",
+                    transit_gateway_route_table_id=route_tables[domain].ref,
+                    destination_cidr_block=cidr,
+                    blackhole=True if attachment is None else None,
+                    transit_gateway_attachment_id=attachment_ids[attachment] if attachment else None
+                )
+
+        for name, domain in route_domains.associations():
+            ec2.CfnTransitGatewayRouteTableAssociation(scope, f"{scope_id} {name} Association",
+                transit_gateway_attachment_id=attachment_ids[name],
+                transit_gateway_route_table_id=route_tables[domain].ref
+            )
+        for name, domain in route_domains.propagations():
+            ec2.CfnTransitGatewayRouteTablePropagation(scope, f"{scope_id} {name} {domain} Propagation",
+                transit_gateway_attachment_id=attachment_ids[name],
+                transit_gateway_route_table_id=route_tables[domain].ref
+            )
+        return route_tables
+
+    def add_vpn_attachments(self, scope_id: str, connections: list, tgw_id: str=None,
+                            route_table=None, propagate_to: list=None) -> dict:
+        """
+        Attach site-to-site VPN connections to the transit gateway
+
+        Notes:
+            The transit gateway of create_tgw enables VPN ECMP support, hence
+            the traffic to the on-premises prefixes learned via BGP over the
+            tunnels of every connection is spread across all of them, and the
+            on-premises bandwidth adds up beyond the throughput of a single
+            tunnel. Connections with static routes only are excluded from ECMP
+            and reported as a synth warning.
+
+            CloudFormation does not return the transit gateway attachment of a
+            VPN connection, hence it is looked up by a custom resource before
+            associating it with route_table and propagating its routes.
+
+        Args:
+            scope_id (str): a string value which is used to construct a unique
+            scope id for the resources to add.
+            connections (list): the VPN connections, each a dict like
+            {'ip_address': '203.0.113.10', 'bgp_asn': 65010} with the optional
+            keys 'name', 'static_routes_only', 'enable_acceleration' and
+            'tunnel_options', a list of dicts of
+            CfnVPNConnection.VpnTunnelOptionsSpecificationProperty, e.g.
+            [{'tunnel_inside_cidr': '169.254.10.0/30'}].
+            tgw_id (str): specify the id of transit gateway, defaults to the
+            transit gateway of create_tgw.
+            route_table: the transit gateway route table to associate the
+            attachments with, defaults to the one of tgw_route_table.
+            propagate_to (list): the transit gateway route tables the on-premises
+            routes are propagated to, defaults to route_table.
+
+        Returns:
+            the transit gateway attachment ids of the VPN connections, by name.
+        """
+        from aws_cdk import custom_resources as cr
+
+        tgw_id = tgw_id or self.tgw.ref
+        route_table = route_table or getattr(self, 'tgw_rt', None)
+        if route_table is None:
+            raise ValueError('Transit gateway route table required for VPN attachments')
+        scope = self.shard('Attach')
+        attachment_ids = {}
+        for index, connection in enumerate(connections):
+            name = connection.get('name', f"Vpn{index}")
+            static_routes_only = connection.get('static_routes_only', False)
+            customer_gateway = ec2.CfnCustomerGateway(scope, f"{scope_id} {name} CustomerGateway",
+                bgp_asn=connection['bgp_asn'],
+                ip_address=connection['ip_address'],
+                type='ipsec.1'
+            )
+            tunnel_options = connection.get('tunnel_options')
+            vpn_connection = ec2.CfnVPNConnection(scope, f"{scope_id} {name}",
+                customer_gateway_id=customer_gateway.ref,
+                transit_gateway_id=tgw_id,
+                type='ipsec.1',
+                static_routes_only=static_routes_only,
+                enable_acceleration=connection.get('enable_acceleration'),
+                vpn_tunnel_options_specifications=[
+                    ec2.CfnVPNConnection.VpnTunnelOptionsSpecificationProperty(**options)
+                    for options in tunnel_options
+                ] if tunnel_options else None
+            )
+
+            sdk_call = cr.AwsSdkCall(
+                service='EC2',
+                action='describeTransitGatewayAttachments',
+                parameters={
+                    'Filters': [
+                        {'Name': 'resource-id', 'Values': [vpn_connection.ref]},
+                        {'Name': 'resource-type', 'Values': ['vpn']}
+                    ]
+                },
+                physical_resource_id=cr.PhysicalResourceId.from_response(
+                    'TransitGatewayAttachments.0.TransitGatewayAttachmentId'
+                ),
+                output_paths=['TransitGatewayAttachments.0.TransitGatewayAttachmentId']
+            )
+            lookup = cr.AwsCustomResource(scope, f"{scope_id} {name} Attachment",
+                on_create=sdk_call,
+                on_update=sdk_call,
+                policy=cr.AwsCustomResourcePolicy.from_sdk_calls(
+                    resources=cr.AwsCustomResourcePolicy.ANY_RESOURCE
+                )
+            )
+            attachment_id = lookup.get_response_field(
+                'TransitGatewayAttachments.0.TransitGatewayAttachmentId'
+            )
+
+            ec2.CfnTransitGatewayRouteTableAssociation(scope, f"{scope_id} {name} Association",
+                transit_gateway_attachment_id=attachment_id,
+                transit_gateway_route_table_id=route_table.ref
+            )
+            for rt_index, propagation_table in enumerate(propagate_to or [route_table]):
+                ec2.CfnTransitGatewayRouteTablePropagation(scope,
+                    f"{scope_id} {name} Propagation{rt_index}",
+                    transit_gateway_attachment_id=attachment_id,
+                    transit_gateway_route_table_id=propagation_table.ref
+                )
+
+            if static_routes_only:
+                Annotations.of(self).add_warning(
+                    f"VPN connection {scope_id} {name} uses static routes, which are not load balanced by ECMP"
+                )
+            self.vpn_connections[f"{scope_id} {name}"] = {
+                'ip_address': connection['ip_address'],
+                'bgp_asn': connection['bgp_asn'],
+                'tunnels': VPN_TUNNELS,
+                'ecmp': not static_routes_only
+            }
+            attachment_ids[name] = attachment_id
+        return attachment_ids
+
+    def vpn_report(self) -> dict:
+        """
+        Return the aggregate capacity of the VPN tunnels
+
+        Notes:
+            The capacity is the nominal throughput of a tunnel, about 1.25 Gbps,
+            times the number of tunnels load balanced by ECMP, or of a single
+            tunnel without ECMP. A single flow never exceeds the throughput of
+            one tunnel.
+
+        Returns:
+            the number of connections, of tunnels and of ECMP tunnels, and the
+            aggregate ECMP capacity in Gbps.
+        """
+        tunnels = sum(entry['tunnels'] for entry in self.vpn_connections.values())
+        ecmp_tunnels = sum(
+            entry['tunnels'] for entry in self.vpn_connections.values() if entry['ecmp']
+        )
+        return {
+            'connections': len(self.vpn_connections),
+            'tunnels': tunnels,
+            'ecmp_tunnels': ecmp_tunnels,
+            'gbps': (ecmp_tunnels or min(tunnels, 1)) * VPN_TUNNEL_GBPS
+        }
+
     def add_tgw_route(self, scope_id: str, route_tables: list, tgw_id: str,
-                        tgw_attach: str, dest_cidr: str) -> None:
+                        tgw_attach: str, dest_cidr, prefix_list: bool=False) -> dict:
         """
         Add a route to VPC route tables via transit gateway
 
@@ -415,21 +1237,37 @@ class VPCStack(NestedStack):
             A transit gateway attachment has to be attached to the VPC of which
             its route table is to be updated with routes via transit gateway.
 
+            Several destinations are collapsed into the smallest equivalent
+            list of supernets, see add_routes.
+
+            The transit gateway forwards the traffic of a route table to the
+            attachment subnet in its own zone, if any. A route table in a zone
+            without attachment subnet is reported as a cross-AZ hop by the
+            routing policy.
+
         Args:
             scope_id (str): a string value which is used to construct a unique
             scope id for the route resource to add.
             route_tables (list): a list of route table ids.
             tgw_id (str): specify the id of transit gateway.
             tgw_attach (str): specify the id of transit gateway attachment.
-            dest_cidr (str): specify the cidr of destination.
+            dest_cidr (str|list): specify the cidr, or a list of cidrs, of
+            destination.
+            prefix_list (bool): set to True to route to the destinations via a
+            single managed prefix list.
         """
-        for i in range(len(route_tables)):
-            res_tgw_route=ec2.CfnRoute(self, f"{scope_id}{i}",
-                            route_table_id=route_tables[i],
-                            transit_gateway_id=tgw_id,
-                            destination_cidr_block=dest_cidr
-            )
-            res_tgw_route.add_depends_on(tgw_attach)
+        for cidr in ([dest_cidr] if isinstance(dest_cidr, str) or dest_cidr is None else dest_cidr):
+            self.check_tgw_route(cidr)
+        for route_table in route_tables:
+            self.routing.route(route_table, getattr(tgw_attach, 'ref', tgw_attach))
+        return self.add_routes(
+            scope_id=scope_id,
+            route_tables=route_tables,
+            dest_cidr=dest_cidr,
+            prefix_list=prefix_list,
+            depends_on=tgw_attach,
+            transit_gateway_id=tgw_id
+        )
 
     # create vpc in dreamchaser way easily
     def easy_vpc(self) -> None:
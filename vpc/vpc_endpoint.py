@@ -0,0 +1,122 @@
+GATEWAY_SERVICES = ('s3', 'dynamodb')
+
+DEFAULT_INTERFACE_SERVICES = [
+    'ssm', 'ssmmessages', 'ec2messages', 'ecr.api', 'ecr.dkr', 'logs', 'monitoring', 'sts'
+]
+
+# the IAM action prefix of the services whose endpoint name differs from it
+IAM_PREFIXES = {
+    'ecr.api': 'ecr',
+    'ecr.dkr': 'ecr',
+    'monitoring': 'cloudwatch',
+    'execute-api': 'execute-api'
+}
+
+# the private DNS names of the services which do not follow
+# '<service>.<region>.amazonaws.com'
+DNS_NAMES = {
+    'ecr.api': 'api.ecr.{region}.amazonaws.com',
+    'ecr.dkr': 'dkr.ecr.{region}.amazonaws.com'
+}
+
+# the services whose private DNS covers the subdomains of their DNS name too
+WILDCARD_DNS = {'ecr.dkr'}
+
+
+def service_name(region: str, service: str) -> str:
+    return f"com.amazonaws.{region}.{service}"
+
+
+def dns_name(region: str, service: str) -> str:
+    return DNS_NAMES.get(service, '{service}.{region}.amazonaws.com').format(
+        service=service, region=region
+    )
+
+
+def s3_policy(region: str, **kwargs) -> dict:
+    """
+    Allow the S3 buckets of the AWS agents and of ECR image layers only
+    """
+    return {
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Principal": "*",
+                "Action": [
+                    "s3:GetObject",
+                    "s3:ListBucket",
+                    "s3:ListObjects"
+                ],
+                "Resource": [
+                    f"arn:aws:s3:::amazoncloudwatch-agent-{region}/*",
+                    f"arn:aws:s3:::patch-baseline-snapshot-{region}/*",
+                    f"arn:aws:s3:::amazon-ssm-{region}/*",
+                    f"arn:aws:s3:::aws-ssm-{region}/*",
+                    f"arn:aws:s3:::{region}-birdwatcher-prod/*",
+                    f"arn:aws:s3:::prod-{region}-starport-layer-bucket/*"
+                ]
+            }
+        ]
+    }
+
+
+def dynamodb_policy(region: str, account: str, **kwargs) -> dict:
+    """
+    Allow the DynamoDB tables of the account only
+    """
+    return {
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Principal": "*",
+                "Action": "dynamodb:*",
+                "Resource": [
+                    f"arn:aws:dynamodb:{region}:{account}:table/*"
+                ]
+            }
+        ]
+    }
+
+
+def service_policy(service: str, account: str, org_id: str=None, **kwargs) -> dict:
+    """
+    Allow the actions of the service for the principals of the account, or of
+    the organization when org_id is set, e.g. for a shared endpoint hub
+    """
+    if org_id:
+        condition = {"StringEquals": {"aws:PrincipalOrgID": org_id}}
+    else:
+        condition = {"StringEquals": {"aws:PrincipalAccount": account}}
+    return {
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Principal": "*",
+                "Action": f"{IAM_PREFIXES.get(service, service.split('.')[0])}:*",
+                "Resource": "*",
+                "Condition": condition
+            }
+        ]
+    }
+
+
+POLICY_GENERATORS = {
+    's3': s3_policy,
+    'dynamodb': dynamodb_policy
+}
+
+
+def endpoint_policy(service: str, region: str, account: str, org_id: str=None) -> dict:
+    """
+    Return the endpoint policy of a service
+
+    Notes:
+        Services without a generator of their own in POLICY_GENERATORS get the
+        service_policy. Register a generator there to tighten the policy of a
+        service.
+    """
+    generator = POLICY_GENERATORS.get(service, service_policy)
+    return generator(service=service, region=region, account=account, org_id=org_id)
@@ -0,0 +1,153 @@
+import os
+import ipaddress
+from dreamchaser.aws_cache import JsonCache, CACHE_DIR
+from vpc.vpc_cidr import CidrIndex
+
+
+class FileRegistryStore():
+    def __init__(self, path: str=None) -> None:
+        self.cache = JsonCache(path or os.path.join(CACHE_DIR, 'cidr_registry.json'))
+
+    def load(self) -> dict:
+        return dict(self.cache.load())
+
+    def put(self, key: str, cidr: str) -> None:
+        self.cache.put(key, cidr)
+
+    def delete(self, key: str) -> None:
+        self.cache.delete(key)
+
+
+class SsmRegistryStore():
+    def __init__(self, region_name: str='ap-southeast-2', path: str='/dreamchaser/cidr-registry',
+                **kwargs) -> None:
+        """
+        Keep the CIDR registry in SSM parameter store
+
+        Notes:
+            Each VPC is a String parameter under the path, e.g.
+            '/dreamchaser/cidr-registry/111111111111/ap-southeast-2/vpc-a', so
+            the registry is shared by every account reading the path and is
+            not bound by the size limit of a single parameter.
+        """
+        from dreamchaser.aws_init import AWSSsm
+
+        # the registry is shared, hence it is never served from the SSM cache
+        kwargs.setdefault('ttl', 0)
+        self.ssm = AWSSsm(region_name, **kwargs)
+        self.path = path.rstrip('/')
+
+    def load(self) -> dict:
+        prefix = len(self.path) + 1
+        return {
+            name[prefix:]: cidr
+            for name, cidr in self.ssm.get_paras_by_path(self.path + '/').items()
+        }
+
+    def put(self, key: str, cidr: str) -> None:
+        self.ssm.put_str_para(name=f"{self.path}/{key}", value=cidr)
+
+    def delete(self, key: str) -> None:
+        self.ssm.delete_para(name=f"{self.path}/{key}")
+
+
+class CidrRegistry():
+    def __init__(self, path: str=None, store=None) -> None:
+        """
+        A registry of the CIDRs allocated to the VPCs of an organization
+
+        Notes:
+            VPCs are keyed by 'account/region/vpc'. Queries run against a
+            CidrIndex, hence overlap, containment and longest-prefix-match
+            lookups take O(W + log n) whatever the number of prefixes.
+
+        Args:
+            path (str): the JSON file of the registry, defaults to
+            .dreamchaser/cidr_registry.json.
+            store: a registry store, e.g. SsmRegistryStore, used instead of the
+            JSON file.
+        """
+        self.store = store or FileRegistryStore(path)
+        self.index = CidrIndex()
+        self.cidrs = {}
+        for key, cidr in self.store.load().items():
+            self.cidrs[key] = ipaddress.ip_network(cidr)
+            self.index.add(cidr, key)
+
+    @staticmethod
+    def key(account: str, region: str, vpc: str) -> str:
+        return f"{account}/{region}/{vpc}"
+
+    def register(self, account: str, region: str, vpc: str, cidr: str) -> str:
+        """
+        Register the CIDR of a VPC
+
+        Notes:
+            Registering a VPC again replaces its CIDR.
+
+        Raises ValueError when the CIDR overlaps the CIDR of another VPC.
+        """
+        key = self.key(account, region, vpc)
+        net = ipaddress.ip_network(cidr)
+        conflicts = [
+            f"{other} ({self.index.get(other)})" for other in self.index.overlaps(net)
+            if self.index.get(other) != key
+        ]
+        if conflicts:
+            raise ValueError(f"CIDR {net} of {key} overlaps {', '.join(conflicts)}")
+
+        if self.cidrs.get(key) != net:
+            if key in self.cidrs:
+                self.index.remove(self.cidrs[key])
+            self.cidrs[key] = net
+            self.index.add(net, key)
+            self.store.put(key, str(net))
+        return key
+
+    def release(self, account: str, region: str, vpc: str) -> None:
+        key = self.key(account, region, vpc)
+        if key in self.cidrs:
+            self.index.remove(self.cidrs.pop(key))
+            self.store.delete(key)
+
+    def overlaps(self, cidr: str) -> dict:
+        """
+        Return the VPCs whose CIDR overlaps the CIDR, keyed by VPC
+        """
+        return {self.index.get(net): str(net) for net in self.index.overlaps(cidr)}
+
+    def contained(self, cidr: str) -> dict:
+        """
+        Return the VPCs whose CIDR lies within the CIDR, keyed by VPC
+        """
+        net = ipaddress.ip_network(cidr)
+        return {
+            self.index.get(other): str(other)
+            for other in self.index.overlaps(net) if other.subnet_of(net)
+        }
+
+    def lookup(self, address: str):
+        """
+        Return the (vpc, cidr) owning an address or a CIDR, or None
+        """
+        net = self.index.longest_match(address)
+        if net is None:
+            return None
+        return self.index.get(net), str(net)
+
+    def check_route(self, dest_cidr: str, local_key: str=None) -> dict:
+        """
+        Check a route destination against the registered VPCs
+
+        Raises ValueError when the destination overlaps the CIDR of the local
+        VPC, since such traffic never leaves the VPC.
+
+        Returns:
+            the VPCs reached via the destination, keyed by VPC.
+        """
+        owners = self.overlaps(dest_cidr)
+        if local_key in owners:
+            raise ValueError(
+                f"Route destination {dest_cidr} overlaps {owners[local_key]} of the local VPC {local_key}"
+            )
+        return owners
@@ -0,0 +1,128 @@
+HOP_KINDS = ('nat', 'tgw', 'endpoint')
+
+
+class CrossAzError(ValueError):
+    pass
+
+
+class RoutingPolicy():
+    def __init__(self, strict: bool=False, allow: list=None, on_cross_az=None) -> None:
+        """
+        An availability zone affine routing policy
+
+        Notes:
+            Every route table is tracked with the zone of its subnet, and every
+            next hop with the zones it has a presence in: a Nat Gateway is in a
+            single zone, a transit gateway attachment or a group of interface
+            endpoints in the zones of their subnets. A next hop is picked in the
+            zone of the route table wherever possible, or else in the first of
+            its zones, which is recorded as a cross-AZ hop. Cross-AZ hops add
+            latency and inter-AZ data charges.
+
+            In strict mode, a cross-AZ hop raises CrossAzError unless its kind
+            is allowed, e.g. 'nat' for a VPC with a single Nat Gateway on
+            purpose.
+
+        Args:
+            strict (bool): set to True to raise on cross-AZ hops.
+            allow (list): the kinds of cross-AZ hops accepted in strict mode,
+            among 'nat', 'tgw' and 'endpoint'.
+            on_cross_az (callable): called with a message on every cross-AZ hop
+            which does not raise, e.g. to report it as a synth warning.
+        """
+        self.strict = strict
+        self.on_cross_az = on_cross_az
+        self.allow = set(allow or [])
+        unknown = self.allow - set(HOP_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown hop kinds: {', '.join(sorted(unknown))}")
+        self.route_tables = {}
+        self.targets = {}
+        self.hops = []
+
+    def add_route_table(self, route_table: str, name: str, zone: str) -> None:
+        """
+        Track a route table, and its hops to the interface endpoints
+        """
+        self.route_tables[route_table] = {'name': name, 'zone': zone}
+        for target, entry in self.targets.items():
+            if entry['kind'] == 'endpoint':
+                self.route(route_table, target)
+
+    def add_target(self, target: str, kind: str, zones: list, name: str=None) -> None:
+        """
+        Track a next hop and the zones it has a presence in
+
+        Notes:
+            The hops of the tracked route tables to a group of interface
+            endpoints are recorded right away, since any workload of the VPC
+            may resolve the endpoints.
+        """
+        if kind not in HOP_KINDS:
+            raise ValueError(f"Unknown hop kind: {kind}")
+        self.targets[target] = {'kind': kind, 'zones': list(zones), 'name': name or target}
+        if kind == 'endpoint':
+            for route_table in list(self.route_tables):
+                self.route(route_table, target)
+
+    def route(self, route_table: str, target: str) -> dict:
+        """
+        Record the hop of a route table to a next hop
+
+        Notes:
+            Route tables or targets which are not tracked, e.g. the ids of
+            resources of other stacks, are not checked.
+
+        Returns:
+            the hop, or None when it is not tracked.
+        """
+        if route_table not in self.route_tables or target not in self.targets:
+            return None
+        source = self.route_tables[route_table]
+        entry = self.targets[target]
+        target_zone = source['zone'] if source['zone'] in entry['zones'] else entry['zones'][0]
+        hop = {
+            'route_table': source['name'],
+            'zone': source['zone'],
+            'kind': entry['kind'],
+            'target': entry['name'],
+            'target_zone': target_zone,
+            'cross_az': target_zone != source['zone']
+        }
+        if hop in self.hops:
+            return hop
+        if hop['cross_az']:
+            message = (
+                f"Route table {hop['route_table']} in {hop['zone']} reaches "
+                f"{hop['kind']} {hop['target']} in {target_zone}"
+            )
+            if self.strict and hop['kind'] not in self.allow:
+                raise CrossAzError(message)
+            if self.on_cross_az:
+                self.on_cross_az(message)
+        self.hops.append(hop)
+        return hop
+
+    def cross_az(self) -> list:
+        """
+        Return the cross-AZ hops
+        """
+        return [hop for hop in self.hops if hop['cross_az']]
+
+    def matrix(self) -> dict:
+        """
+        Return the zones of the next hops of each route table
+
+        Returns:
+            the zone of the route table and the zones of its next hops by kind,
+            by route table name, e.g. {'zone': 'ap-southeast-2b',
+            'nat': ['ap-southeast-2a'], 'tgw': ['ap-southeast-2b']}.
+        """
+        matrix = {}
+        for entry in self.route_tables.values():
+            matrix[entry['name']] = {'zone': entry['zone']}
+        for hop in self.hops:
+            zones = matrix[hop['route_table']].setdefault(hop['kind'], [])
+            if hop['target_zone'] not in zones:
+                zones.append(hop['target_zone'])
+        return matrix
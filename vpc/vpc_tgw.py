@@ -0,0 +1,280 @@
+import json
+import ipaddress
+from vpc.vpc_cidr import CidrIndex
+
+# the nominal throughput of a site-to-site VPN tunnel
+VPN_TUNNEL_GBPS = 1.25
+VPN_TUNNELS = 2
+
+
+class RouteDomains():
+    def __init__(self) -> None:
+        """
+        The route domains of a transit gateway, e.g. shared-services, prod,
+        non-prod and egress
+
+        Notes:
+            Each domain is a transit gateway route table. Each attachment is
+            associated with the route table of its domain, and propagates its
+            CIDRs into the route tables of the domains reaching its domain.
+            Static routes are only needed for what propagation cannot express,
+            e.g. the default route of the spokes to the egress VPC, or
+            blackholes. Hence a spoke VPC costs one association plus one
+            propagation per domain reaching it, whatever the number of other
+            spokes.
+
+            The effective route tables are computed offline, so that the
+            reachability between attachments is checked before deploying.
+        """
+        self.domains = {}
+        self.attachments = {}
+        self._indexes = None
+
+    def add_domain(self, name: str, reach: list=None, isolated: bool=False) -> None:
+        """
+        Add a route domain
+
+        Args:
+            name (str): the name of the domain.
+            reach (list): the names of the domains whose attachments this
+            domain routes to via propagation.
+            isolated (bool): set to True to not route between the attachments
+            of the domain itself, e.g. for spokes which only reach shared
+            services.
+        """
+        if name in self.domains:
+            raise ValueError(f"Duplicate route domain: {name}")
+        reach = list(reach or [])
+        if not isolated and name not in reach:
+            reach.insert(0, name)
+        self.domains[name] = {'reach': reach, 'routes': {}}
+        self._indexes = None
+
+    def add_attachment(self, name: str, domain: str, cidrs: list, attachment_id: str=None,
+                        propagate: bool=True) -> None:
+        """
+        Add a transit gateway attachment to a route domain
+
+        Args:
+            name (str): the name of the attachment.
+            domain (str): the route domain the attachment is associated with.
+            cidrs (list): the CIDRs of the network behind the attachment,
+            e.g. the VPC CIDR.
+            attachment_id (str): the id of the attachment, see
+            VPCStack.add_route_domains.
+            propagate (bool): set to False to not propagate the CIDRs of the
+            attachment into the domains reaching its domain.
+        """
+        if name in self.attachments:
+            raise ValueError(f"Duplicate attachment: {name}")
+        self._check_domain(domain)
+        self.attachments[name] = {
+            'domain': domain,
+            'cidrs': [str(ipaddress.ip_network(cidr)) for cidr in cidrs],
+            'attachment_id': attachment_id,
+            'propagate': propagate
+        }
+        self._indexes = None
+
+    def add_static_route(self, domain: str, cidr: str, attachment: str=None) -> None:
+        """
+        Add a static route to a route domain
+
+        Notes:
+            A static route takes precedence over the propagated routes of the
+            same CIDR.
+
+        Args:
+            domain (str): the route domain.
+            cidr (str): the destination CIDR, e.g. '0.0.0.0/0'.
+            attachment (str): the name of the attachment of the next hop, or
+            None for a blackhole route.
+        """
+        self._check_domain(domain)
+        if attachment is not None and attachment not in self.attachments:
+            raise ValueError(f"Unknown attachment: {attachment}")
+        self.domains[domain]['routes'][str(ipaddress.ip_network(cidr))] = attachment
+        self._indexes = None
+
+    def _check_domain(self, domain: str) -> None:
+        if domain not in self.domains:
+            raise ValueError(f"Unknown route domain: {domain}")
+
+    @classmethod
+    def from_dict(cls, spec: dict):
+        """
+        Return the route domains of a specification like
+            {
+                "domains": {
+                    "shared": {"reach": ["prod", "non-prod", "egress"]},
+                    "prod": {"reach": ["shared"], "routes": {"0.0.0.0/0": "egress"}},
+                    "egress": {"reach": ["shared", "prod"], "isolated": true}
+                },
+                "attachments": {
+                    "egress": {"domain": "egress", "cidrs": ["10.0.0.0/16"]},
+                    "app1": {"domain": "prod", "cidrs": ["10.1.0.0/16"],
+                             "attachment_id": "tgw-attach-0123456789abcdef0"}
+                }
+            }
+        A route to null is a blackhole route.
+        """
+        domains = cls()
+        for name, domain in spec.get('domains', {}).items():
+            domains.add_domain(name, reach=domain.get('reach'), isolated=domain.get('isolated', False))
+        for name, attachment in spec.get('attachments', {}).items():
+            domains.add_attachment(name, **attachment)
+        for name, domain in spec.get('domains', {}).items():
+            for cidr, attachment in domain.get('routes', {}).items():
+                domains.add_static_route(name, cidr, attachment)
+        return domains
+
+    @classmethod
+    def load(cls, spec):
+        """
+        Return the route domains of a specification, or of a JSON file holding
+        it, see from_dict
+        """
+        if isinstance(spec, dict):
+            return cls.from_dict(spec)
+        with open(spec) as fspec:
+            return cls.from_dict(json.load(fspec))
+
+    def associations(self) -> list:
+        """
+        Return the (attachment, domain) associations
+        """
+        return [(name, attachment['domain']) for name, attachment in self.attachments.items()]
+
+    def propagations(self) -> list:
+        """
+        Return the (attachment, domain) propagations
+        """
+        members = {domain: [] for domain in self.domains}
+        for name, attachment in self.attachments.items():
+            if attachment['propagate']:
+                members[attachment['domain']].append(name)
+        propagations = []
+        for domain, entry in self.domains.items():
+            for reached in entry['reach']:
+                self._check_domain(reached)
+                propagations.extend((name, domain) for name in members[reached])
+        return propagations
+
+    def effective_routes(self) -> dict:
+        """
+        Return the effective route table of each domain
+
+        Returns:
+            the routes of each domain, by destination CIDR, as
+            {'attachments': [...], 'origin': 'static'|'propagated'}. A
+            blackhole route has no attachment, and a CIDR propagated by
+            several attachments lists all of them, see conflicts.
+        """
+        tables = {domain: {} for domain in self.domains}
+        for name, domain in self.propagations():
+            for cidr in self.attachments[name]['cidrs']:
+                route = tables[domain].setdefault(cidr, {'attachments': [], 'origin': 'propagated'})
+                route['attachments'].append(name)
+        for domain, entry in self.domains.items():
+            for cidr, attachment in entry['routes'].items():
+                tables[domain][cidr] = {
+                    'attachments': [attachment] if attachment else [],
+                    'origin': 'static'
+                }
+        return tables
+
+    def conflicts(self) -> list:
+        """
+        Return the propagated routes of a CIDR from several attachments, as
+        (domain, cidr, attachments)
+        """
+        return [
+            (domain, cidr, route['attachments'])
+            for domain, table in self.effective_routes().items()
+            for cidr, route in table.items()
+            if route['origin'] == 'propagated' and len(route['attachments']) > 1
+        ]
+
+    def _index(self, domain: str) -> CidrIndex:
+        if self._indexes is None:
+            self._indexes = {}
+            for name, table in self.effective_routes().items():
+                index = CidrIndex()
+                for cidr, route in table.items():
+                    index.add(cidr, route['attachments'])
+                self._indexes[name] = index
+        return self._indexes[domain]
+
+    def lookup(self, domain: str, address: str) -> list:
+        """
+        Return the attachments of the next hop of an address or a CIDR in the
+        route table of a domain, empty when it is blackholed or not routed
+        """
+        self._check_domain(domain)
+        index = self._index(domain)
+        net = index.longest_match(address)
+        return index.get(net) if net is not None else []
+
+    def reachable(self, source: str, destination: str) -> dict:
+        """
+        Check the reachability between two attachments
+
+        Notes:
+            The traffic of an attachment is routed by the route table of its
+            domain. The destination is reachable when every CIDR of the
+            destination is routed to it from the source, and the return traffic
+            to every CIDR of the source is routed back to the source.
+
+        Returns:
+            the forward and return verdicts, and whether both hold.
+        """
+        src, dst = self.attachments[source], self.attachments[destination]
+        forward = all(self.lookup(src['domain'], cidr) == [destination] for cidr in dst['cidrs'])
+        back = all(self.lookup(dst['domain'], cidr) == [source] for cidr in src['cidrs'])
+        return {'forward': forward, 'return': back, 'reachable': forward and back}
+
+    def check(self, expectations: list) -> list:
+        """
+        Check the reachability between attachments against expectations
+
+        Args:
+            expectations (list): a list of (source, destination, reachable)
+            tuples, e.g. ('app1', 'app2', False) to assert that two spokes are
+            kept apart.
+
+        Returns:
+            the failed expectations, as (source, destination, expected,
+            verdict) tuples.
+        """
+        failed = []
+        for source, destination, expected in expectations:
+            verdict = self.reachable(source, destination)
+            if verdict['reachable'] != expected:
+                failed.append((source, destination, expected, verdict))
+        return failed
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compute the effective transit gateway route tables')
+    parser.add_argument('spec', help='the JSON specification of the route domains')
+    parser.add_argument('--reach', nargs=2, action='append', default=[], metavar=('SOURCE', 'DESTINATION'),
+                        help='check the reachability between two attachments')
+    args = parser.parse_args()
+
+    route_domains = RouteDomains.load(args.spec)
+    for domain, table in route_domains.effective_routes().items():
+        print(f"{domain}:")
+        for cidr, route in sorted(table.items()):
+            print(f"  {cidr} -> {', '.join(route['attachments']) or 'blackhole'} ({route['origin']})")
+    for domain, cidr, attachments in route_domains.conflicts():
+        print(f"conflict: {domain} {cidr} propagated by {', '.join(attachments)}")
+
+    exit_code = 0
+    for source, destination in args.reach:
+        verdict = route_domains.reachable(source, destination)
+        print(f"{source} -> {destination}: forward {verdict['forward']}, return {verdict['return']}")
+        exit_code = exit_code or int(not verdict['reachable'])
+    sys.exit(exit_code)